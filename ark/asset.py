@@ -1,6 +1,7 @@
 from typing import *
 
 from ue.asset import ExportTableItem, UAsset
+from ue.summary import AssetSummary, ExportSummary
 
 
 def findComponentExports(asset: UAsset) -> Iterator[ExportTableItem]:
@@ -21,6 +22,16 @@ def findSubComponentExports(asset: UAsset, expectedklassname='BlueprintGenerated
             yield export
 
 
+def findSubComponentSummaries(summary: AssetSummary, expectedklassname='BlueprintGeneratedClass') -> Iterator[ExportSummary]:
+    '''Find sub-components that are used within a summarised asset, as `findSubComponentExports` does.'''
+    default_export = summary.default_export and f'{summary.assetname}.{summary.default_export}'
+    for export in summary.exports:
+        if default_export and export.outer == default_export:
+            yield export
+        elif export.klass_klass == expectedklassname:
+            yield export
+
+
 def findParentPackages(asset: UAsset) -> Iterator[str]:
     '''Find the parents of the main export components from the given asset.'''
     for export in findComponentExports(asset):
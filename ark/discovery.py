@@ -1,4 +1,7 @@
+import pickle
+from contextlib import ExitStack
 from logging import NullHandler, getLogger
+from multiprocessing.pool import Pool
 from pathlib import Path
 from typing import *
 
@@ -9,8 +12,9 @@ from ue.asset import ExportTableItem, UAsset
 from ue.context import ue_parsing_context
 from ue.loader import AssetLoader, AssetLoadException
 from utils.cachefile import cache_data
+from utils.tree import IndexedTree
 
-from .asset import findSubComponentExports, findSubComponentParentPackages
+from .asset import findSubComponentParentPackages, findSubComponentSummaries
 from .common import CHR_CLS, CHR_PKG, DCSC_CLS, DCSC_PKG
 from .overrides import get_overrides_for_species
 from .tree import inherits_from, walk_parents
@@ -34,21 +38,26 @@ def is_species(cls_name: str, loader: AssetLoader, *, skip_character_check=False
     if not skip_character_check and not ue.hierarchy.inherits_from(cls_name, CHR_CLS):
         return False
 
-    with ue_parsing_context(properties=False):
-        for parent_cls_name in ue.hierarchy.find_parent_classes(cls_name, include_self=True):
-            if not parent_cls_name.startswith('/Game'):
-                return False
-
-            parent_asset_name = parent_cls_name[:parent_cls_name.rfind('.')]
-            try:
-                parent_asset = loader[parent_asset_name]
-            except AssetLoadException:
-                logger.exception(f'Unexpected loading error while checking for DCSCs of {cls_name}')
-                return False  # no way to continue - abort
-
-            for cmp_export in findSubComponentExports(parent_asset):
-                if ue.hierarchy.inherits_from(cmp_export, DCSC_CLS):
-                    return True
+    for parent_cls_name in ue.hierarchy.find_parent_classes(cls_name, include_self=True):
+        if not parent_cls_name.startswith('/Game'):
+            return False
+
+        # Summaries are enough to find the components, and may be served from the summary store without parsing
+        parent_asset_name = parent_cls_name[:parent_cls_name.rfind('.')]
+        try:
+            summary = loader.get_summary(parent_asset_name)
+        except AssetLoadException:
+            logger.exception(f'Unexpected loading error while checking for DCSCs of {cls_name}')
+            return False  # no way to continue - abort
+
+        for cmp_export in findSubComponentSummaries(summary):
+            is_dcsc = ue.hierarchy.summary_inherits_from(cmp_export, DCSC_CLS)
+            if is_dcsc is None:
+                # Not decidable from the summary alone, so check the full export
+                with ue_parsing_context(properties=False):
+                    is_dcsc = ue.hierarchy.inherits_from(loader.load_class(f'{summary.assetname}.{cmp_export.name}'), DCSC_CLS)
+            if is_dcsc:
+                return True
 
     return False
 
@@ -97,43 +106,103 @@ class SpeciesDiscoverer:
 
 
 def initialise_hierarchy(arkman: ArkSteamManager, config: ConfigFile = get_global_config()):
+    '''
+    Build or load the asset hierarchy.
+
+    The hierarchy is cached in segments: a core segment covering the game and the official mods,
+    plus one segment per configured mod holding the classes it adds. Each is keyed by its own versions,
+    so a mod update only requires that mod to be re-scanned.
+    '''
     version_key = _gather_version_data(arkman, config)
     loader = arkman.getLoader()
-    gen_fn = lambda _: _generate_hierarchy(loader)
     output_path = f'{config.settings.DataDir}/asset_hierarchy'
-    data = cache_data(version_key, output_path, gen_fn, force_regenerate=config.dev.ClearHierarchyCache)
-    ue.hierarchy.tree = data
+    force_regenerate = config.dev.ClearHierarchyCache
+
+    with ExitStack() as stack:
+        pool: List[Optional[Pool]] = []
+
+        def get_pool() -> Optional[Pool]:
+            # Only start workers if a segment actually needs generating
+            if not pool:
+                workers = config.optimisation.DiscoveryWorkers
+                loader_factory = arkman.getLoaderFactory(workers)
+                pool.append(stack.enter_context(ue.hierarchy.discovery_pool(loader, workers, loader_factory)))
+            return pool[0]
+
+        core_key = dict(format=HIERARCHY_FORMAT, core=version_key['core'])
+        core_fn = lambda _: _generate_core_hierarchy(loader, get_pool())
+        core: IndexedTree[str] = cache_data(core_key, output_path, core_fn, force_regenerate=force_regenerate)
+
+        segments: List[List[Edge]] = []
+        for modid in config.mods:
+            mod_key = dict(format=HIERARCHY_FORMAT, core=version_key['core'], mod=modid, version=version_key['mods'][modid])
+            mod_fn = lambda _, modid=modid: _generate_mod_hierarchy(core, modid, loader, get_pool())
+            segments.append(cache_data(mod_key, f'{output_path}_{modid}', mod_fn, force_regenerate=force_regenerate))
+
+    # Graft the mod segments onto the core hierarchy, in the configured order
+    ue.hierarchy.tree = core
+    for edges in segments:
+        _graft_segment(core, edges)
+
+
+HIERARCHY_FORMAT = 5
+
+Edge = Tuple[str, str]
 
 
 def _gather_version_data(arkman: ArkSteamManager, config: ConfigFile):
     # Gather identities and versions of all involved components
-    key = dict(format=4,
+    key = dict(format=HIERARCHY_FORMAT,
                core=dict(version=arkman.getGameVersion(), buildid=arkman.getGameBuildId()),
                mods=dict((modid, arkman.getModData(modid)['version']) for modid in config.mods))  # type: ignore
     return key
 
 
-def _generate_hierarchy(loader: AssetLoader):
+def _generate_core_hierarchy(loader: AssetLoader, pool: Optional[Pool]) -> IndexedTree[str]:
     config = get_global_config()
 
     core_excludes = set(['/Game/Mods/.*', *config.optimisation.SearchIgnore])
     mod_excludes = set(config.optimisation.SearchIgnore)
 
     # Always load the internal hierarchy
-    ue.hierarchy.tree.clear()
+    ue.hierarchy.tree = IndexedTree[str](ue.hierarchy.ROOT_NAME)
     ue.hierarchy.load_internal_hierarchy(Path('config') / 'hierarchy.yaml')
 
     # Scan /Game, excluding /Game/Mods and any excludes from config
-    ue.hierarchy.explore_path('/Game', loader, core_excludes)
+    ue.hierarchy.explore_path('/Game', loader, core_excludes, pool=pool)
 
     # Scan /Game/Mods/<modid> for each of the official mods, skipping ones in SeparateOfficialMods
     official_modids = set(config.official_mods.ids())
     official_modids -= set(config.settings.SeparateOfficialMods)
     for modid in official_modids:
-        ue.hierarchy.explore_path(f'/Game/Mods/{modid}/', loader, mod_excludes)
-
-    # Scan /Game/Mods/<modid> for each configured mod
-    for modid in config.mods:
-        ue.hierarchy.explore_path(f'/Game/Mods/{modid}/', loader, mod_excludes)
+        ue.hierarchy.explore_path(f'/Game/Mods/{modid}/', loader, mod_excludes, pool=pool)
 
     return ue.hierarchy.tree
+
+
+def _generate_mod_hierarchy(core: IndexedTree[str], modid: str, loader: AssetLoader, pool: Optional[Pool]) -> List[Edge]:
+    '''Scan a single mod on top of a copy of the core hierarchy, returning the (class, parent) edges it added.'''
+    mod_excludes = set(get_global_config().optimisation.SearchIgnore)
+
+    # Work on a copy so the segment only depends on the core and this mod
+    ue.hierarchy.tree = pickle.loads(pickle.dumps(core, pickle.HIGHEST_PROTOCOL))
+    ue.hierarchy.explore_path(f'/Game/Mods/{modid}/', loader, mod_excludes, pool=pool)
+
+    tree = ue.hierarchy.tree
+    ue.hierarchy.tree = core
+
+    # New keys are registered parents-first, so the edges can be replayed in order
+    return [(key, tree[key].parent_data) for key in tree.keys() if key not in core]  # type: ignore
+
+
+def _graft_segment(tree: IndexedTree[str], edges: List[Edge]):
+    for fullname, parent_name in edges:
+        # Classes may already be present if another mod shares them
+        if fullname in tree:
+            continue
+
+        if parent_name not in tree:
+            logger.warning('Parent %s of %s missing while grafting hierarchy segment', parent_name, fullname)
+            continue
+
+        tree.add(parent_name, fullname)
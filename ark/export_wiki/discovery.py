@@ -1,11 +1,12 @@
 from logging import NullHandler, getLogger
-from typing import Iterable
+from typing import Iterable, Optional
 
 from automate.discovery import AssetTester, Discoverer
 from ue.asset import UAsset
 from ue.consts import SCRIPT_ENGINE_PKG
-from ue.hierarchy import MissingParent, inherits_from
+from ue.hierarchy import MissingParent, inherits_from, summary_inherits_from
 from ue.loader import AssetLoader, AssetLoadException
+from ue.summary import AssetSummary
 
 from .consts import LEVEL_SCRIPT_ACTOR_CLS, WORLD_CLS
 
@@ -41,3 +42,18 @@ class CompositionSublevelTester(AssetTester):
         except AssetLoadException:
             # This asset is more broken than it ever should be.
             return False
+
+    def is_a_summary_match(self, summary: AssetSummary) -> Optional[bool]:
+        if not summary.has_tile_info:
+            return False
+
+        export = summary.find_export(summary.default_export)
+        if not export:
+            return False
+
+        results = [summary_inherits_from(export, target) for target in (LEVEL_SCRIPT_ACTOR_CLS, WORLD_CLS)]
+        if any(results):
+            return True
+        if None in results:
+            return None  # undecided - load the asset
+        return False
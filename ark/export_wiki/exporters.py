@@ -2,7 +2,7 @@ from logging import NullHandler, getLogger
 
 from config import get_global_config
 from ue.asset import ExportTableItem
-from ue.hierarchy import MissingParent, inherits_from
+from ue.hierarchy import MissingParent, classify
 from ue.loader import AssetNotFound
 
 from .actor_lists import extract_actor_list
@@ -21,13 +21,10 @@ logger.addHandler(NullHandler())
 
 
 def is_export_extractable(export: ExportTableItem) -> bool:
-    for exportable_klass in PROXY_TYPE_MAP.keys():
-        try:
-            if inherits_from(export, exportable_klass):
-                return True
-        except (MissingParent, AssetNotFound):
-            continue
-    return False
+    try:
+        return classify(export, PROXY_TYPE_MAP.keys()) is not None
+    except (MissingParent, AssetNotFound):
+        return False
 
 
 def _export_npc_zone_manager(world: WorldData, proxy: NPCZoneManager):
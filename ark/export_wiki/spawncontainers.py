@@ -29,10 +29,10 @@ class SpawnGroupEntry:
         self.weight = data['EntryWeight']
         self.npcsToSpawn = data['NPCsToSpawn']
         self.npcsSpawnOffsets = [{
-            'x': offset.x.value,
-            'y': offset.y.value,
-            'z': offset.z.value
-        } for offset in data['NPCsSpawnOffsets'].values]
+            'x': x,
+            'y': y,
+            'z': z
+        } for x, y, z in data['NPCsSpawnOffsets'].iter_vectors()]
         self.npcsToSpawnPercentageChance = data['NPCsToSpawnPercentageChance']
         self.npcMinLevelOffset = data['NPCMinLevelOffset']
         self.npcMaxLevelOffset = data['NPCMaxLevelOffset']
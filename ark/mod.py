@@ -52,7 +52,7 @@ def get_species_from_mod(asset: UAsset, loader: AssetLoader = None) -> list:
 
 def is_mod(asset: UAsset) -> bool:
     if not asset.default_export: return False
-    if 'properties' not in asset.default_export.field_values: return False
+    if not asset.has_properties: return False
     if not get_property(asset.default_export, 'ModName'): return False
     return True
 
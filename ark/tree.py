@@ -1,8 +1,8 @@
 from collections import deque
-from functools import lru_cache
 from typing import *
 
 from ue.asset import ExportTableItem, ImportTableItem, UAsset
+from ue.tree import get_export_key, get_inheritance_table
 
 from .asset import findParentPackages
 
@@ -14,9 +14,28 @@ __all__ = [
 ]
 
 
-@lru_cache(maxsize=1024)
 def get_parent_of_export(export: ExportTableItem) -> Optional[ExportTableItem]:
     '''Return the parent of the given export. This will be an export, possibly from a different asset.'''
+    parents = get_inheritance_table(export, 'parent_export')
+    if parents is None:
+        return _find_parent_of_export(export)
+
+    # Only the parent's location is cached, so the asset holding it can still be evicted
+    # Exports are identified by their index as names are not always unique within an asset (e.g. in maps)
+    key = get_export_key(export)
+    if key in parents:
+        parent_key = parents[key]
+        if not parent_key:
+            return None
+        (parent_assetname, parent_index) = parent_key
+        return export.asset.loader[parent_assetname].exports[parent_index]
+
+    parent = _find_parent_of_export(export)
+    parents[key] = get_export_key(parent) if parent else None
+    return parent
+
+
+def _find_parent_of_export(export: ExportTableItem) -> Optional[ExportTableItem]:
     klassref = export.klass and export.klass.value
 
     # Ignore klass if it is a built-in type
@@ -49,7 +68,6 @@ def get_parent_of_export(export: ExportTableItem) -> Optional[ExportTableItem]:
     return parent
 
 
-@lru_cache(maxsize=1024)
 def export_inherits_from(export: ExportTableItem, target: ExportTableItem) -> bool:
     '''Test if the given export has the target export in its inheritance tree.'''
     assert isinstance(export, ExportTableItem)
@@ -60,19 +78,60 @@ def export_inherits_from(export: ExportTableItem, target: ExportTableItem) -> bo
     if export.fullname == target.fullname:
         return True
 
-    # Figure out where to go next, up the tree
+    results = get_inheritance_table(export, 'export_inherits_from')
+    key = (get_export_key(export), get_export_key(target))
+    if results is not None and key in results:
+        result, assetnames = results[key]
+        _note_dependencies(export.asset, assetnames)
+        return result
+
+    # Figure out where to go next, up the tree, and recurse up to the parent
     parent = get_parent_of_export(export)
-    if not parent:
-        return False
+    result = export_inherits_from(parent, target) if parent else False
 
-    # Recurse up to the parent
-    return export_inherits_from(parent, target)
+    if results is not None:
+        # Remember which assets the answer came from, so they are still dependencies when it is reused
+        assetnames = [export.asset.assetname]
+        if parent:
+            assetnames.append(parent.asset.assetname)
+            parent_entry = results.get((get_export_key(parent), key[1]), None)
+            if parent_entry:
+                assetnames.extend(parent_entry[1])
+        results[key] = (result, tuple(dict.fromkeys(assetnames)))
+
+    return result
 
 
-@lru_cache(maxsize=512)
 def inherits_from(asset: UAsset, targetname: str) -> bool:
     '''Check if the asset inherits from the given package.'''
-    return walk_parents(asset, lambda parentname: True if parentname == targetname else None) or False
+    assert asset.loader and asset.assetname
+    results = asset.loader.inheritance.table('asset_inherits_from')
+    key = (asset.assetname, targetname)
+    entry = results.get(key, None)
+    if entry is not None:
+        result, assetnames = entry
+        _note_dependencies(asset, assetnames)
+        return result
+
+    # Remember which assets the answer came from, so they are still dependencies when it is reused
+    walked = [asset.assetname]
+
+    def check(parentname: str) -> Optional[bool]:
+        if parentname == targetname:
+            return True
+        walked.append(parentname)
+        return None
+
+    result = walk_parents(asset, check) or False
+    results[key] = (result, tuple(assetname for assetname in walked if assetname.startswith('/Game')))
+    return result
+
+
+def _note_dependencies(asset: UAsset, assetnames: Iterable[str]):
+    # Assets behind a cached answer aren't loaded again, so record them as dependencies directly
+    assert asset.loader
+    for assetname in assetnames:
+        asset.loader.note_dependency(assetname)
 
 
 T = TypeVar('T')
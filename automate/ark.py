@@ -1,15 +1,24 @@
 import datetime
 import json
 import shutil
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from functools import partial
 from logging import NullHandler, getLogger
 from os import walk
 from pathlib import Path
 from typing import *
 
+from automate.config.sections import OptimisationSection
 from config import ConfigFile, get_global_config
-from ue.loader import AssetLoader, ModNotFound, ModResolver
+from ue.context import ue_parsing_context
+from ue.dependencies import DependencyStore
+from ue.loader import AssetLoader, ContextAwareCacheWrapper, ModNotFound, ModResolver, UsageBasedCacheManager
+from ue.summary import AssetSummaryStore
 
-from .modutils import readACFFile, readModInfo, readModMetaInfo, unpackModFile
+from .modutils import (UNPACK_THREADS, fingerprintFile, readACFFile, readModInfo, readModMetaInfo, readUnpackManifest,
+                       unpackModFile, writeUnpackManifest)
 from .steamapi import SteamApi
 from .steamcmd import Steamcmd
 from .version import createExportVersion
@@ -20,6 +29,8 @@ ARK_SERVER_APP_ID = 376030
 ARK_MAIN_APP_ID = 346110
 
 MODDATA_FILENAME = '_moddata.json'
+UNPACK_MANIFEST_FILENAME = '_unpackmanifest.json'
+ASSET_EXTENSIONS = ('.uasset', '.umap', '.uexp', '.ubulk')
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
@@ -39,10 +50,12 @@ class ArkSteamManager:
 
         self.steam_mod_details: Optional[Dict[str, Dict]] = None  # from steam
         self.mod_data_cache: Optional[Dict[str, Dict]] = None  # internal data
+        self.changed_assets: Set[str] = set()  # mod assets changed by unpacking this run
         self.game_version: Optional[str] = None
         self.game_buildid: Optional[str] = None
 
         self.loader: Optional[AssetLoader] = None
+        self.dependency_store: Optional[DependencyStore] = None
 
         self._sanityCheck()
 
@@ -52,11 +65,29 @@ class ArkSteamManager:
 
         return self.loader
 
+    def getDependencyStore(self) -> Optional[DependencyStore]:
+        '''Return the store of export dependencies, or None if dependency tracking is disabled.'''
+        if not self.dependency_store and self.config.optimisation.UseDependencyTracking:
+            self.dependency_store = DependencyStore(self.basepath / 'dependencies.sqlite')
+
+        return self.dependency_store
+
     def createLoader(self) -> AssetLoader:
         '''Create an asset loader pointing at the managed game install.'''
-        modresolver = ManagedModResolver(self)
-        loader = AssetLoader(modresolver, self.asset_path)
-        return loader
+        return self.getLoaderFactory()()
+
+    def getLoaderFactory(self, workers: int = 1) -> Callable[[], AssetLoader]:
+        '''
+        Return a picklable function creating loaders configured like `createLoader`, for use in worker processes.
+        The asset cache budget is split between the given number of workers.
+        '''
+        return partial(createConfiguredLoader,
+                       ManagedModResolver(self),
+                       self.asset_path,
+                       self.config.optimisation,
+                       self.basepath / 'summaries.sqlite',
+                       self.getGameBuildId(),
+                       cache_share=workers)
 
     def getInstalledMods(self) -> Optional[Dict[str, Dict]]:
         '''
@@ -96,6 +127,10 @@ class ArkSteamManager:
         '''
         return self.game_buildid
 
+    def getChangedAssets(self) -> Set[str]:
+        '''Return the names of mod assets that were added, changed or removed by updates during this run.'''
+        return self.changed_assets
+
     def getContentPath(self) -> Path:
         '''Return the Content directory of the game.'''
         return self.asset_path
@@ -119,6 +154,10 @@ class ArkSteamManager:
         self.game_version = fetchGameVersion(self.gamedata_path)
         self.game_buildid = getGameBuildId(self.gamedata_path)
 
+        # Stored asset summaries are only valid for the build they were made from
+        if self.loader and self.loader.summary_store:
+            self.loader.summary_store.set_build_id(self.game_buildid)
+
     def ensureModsUpdated(self, modids: Union[Sequence[str], Sequence[int]]):
         '''
         Ensure the listed mods are installed and updated to their latest versions.
@@ -175,6 +214,10 @@ class ArkSteamManager:
             else:
                 logger.info(f'No mods to remove')
 
+        # Make sure an existing loader sees the new mod files
+        if self.loader and (modids_update or (uninstallOthers and modids_remove)) and not dryRun:
+            self.loader.invalidate_file_index()
+
         # Delete all downloaded steamapps mods
         logger.info('Removing steam workshop cache')
         if not dryRun:
@@ -192,48 +235,74 @@ class ArkSteamManager:
             raise ValueError(f'There are mods with duplicate tag names present. Aborting.')
 
     def _installMods(self, modids):
-        # TODO: Consider doing the extractions in parallel with the installations (offset) to speed this up
-
-        for modid in modids:
-            # Get Steam to download the mod, compressed
-            logger.debug(f'Installing/updating mod {modid}')
-            self.steamcmd.install_workshopfiles(str(ARK_MAIN_APP_ID), modid, self.gamedata_path)
-            if not verifyModDownloaded(self.gamedata_path, modid):
-                raise FileNotFoundError("Mod was not downloaded despite successful retcode - is it still available?")
-
-            # Unpack the mod into the game directory proper
-            logger.debug(f'Unpacking mod {modid}')
-            unpackMod(self.gamedata_path, modid)
-
-            # Collection mod version number from workshop data file
-            newVersions = getSteamModVersions(self.gamedata_path, [modid])
-            newVersion = newVersions[modid]
-
-            # Save data on the installed mod
-            moddata = gatherModInfo(self.asset_path, modid)
-            moddata['version'] = str(newVersions[modid])
-
-            # See if we got a title for this mod from either the mod's PGD or the SteamAPI earlier
-            title = self._fetchModTitleFromPGD(moddata)
-            if not title and modid in self.steam_mod_details and 'title' in self.steam_mod_details[modid]:
-                title = self.steam_mod_details[modid]['title']  # ^ inefficient
-
-            moddata['title'] = title or moddata['name']
-
-            moddata_path = self.mods_path / modid / MODDATA_FILENAME
-            with open(moddata_path, 'w') as f:
-                json.dump(moddata, f, indent='\t')
-
-            # Save the data so we can refer to it later
-            self.mod_data_cache[modid] = moddata
+        # Each mod is unpacked in the background while SteamCMD downloads the next
+        timings: Dict[str, float] = dict(download=0.0, unpack=0.0, metadata=0.0)
+        workers = max(self.config.optimisation.ModUnpackWorkers, 1)
+
+        with ThreadPoolExecutor(1) as stage, ThreadPoolExecutor(workers) as unpack_pool:
+            previous: Optional[Future] = None
+            try:
+                for modid in modids:
+                    # Get Steam to download the mod, compressed
+                    logger.debug(f'Installing/updating mod {modid}')
+                    start = time.perf_counter()
+                    self.steamcmd.install_workshopfiles(str(ARK_MAIN_APP_ID), modid, self.gamedata_path)
+                    if not verifyModDownloaded(self.gamedata_path, modid):
+                        raise FileNotFoundError("Mod was not downloaded despite successful retcode - is it still available?")
+
+                    # Collect the mod version number from the workshop data file before SteamCMD touches it again
+                    newVersions = getSteamModVersions(self.gamedata_path, [modid])
+                    timings['download'] += time.perf_counter() - start
+
+                    # Surface any failure from the previous mod before queueing more work
+                    if previous:
+                        pending, previous = previous, None
+                        pending.result()
+                    previous = stage.submit(self._unpackAndRecordMod, modid, str(newVersions[modid]), unpack_pool, timings)
+            finally:
+                # Wait for the pending unpack even if a download failed, so its outcome is never lost
+                if previous:
+                    previous.result()
+
+        logger.info('Mod installation times: download %.1fs, unpack %.1fs, metadata %.1fs', timings['download'],
+                    timings['unpack'], timings['metadata'])
+
+    def _unpackAndRecordMod(self, modid: str, version: str, unpack_pool: Executor, timings: Dict[str, float]):
+        # Unpack the mod into the game directory proper
+        logger.debug(f'Unpacking mod {modid}')
+        start = time.perf_counter()
+        self.changed_assets |= unpackMod(self.gamedata_path, modid, unpack_pool)
+        timings['unpack'] += time.perf_counter() - start
+
+        # Save data on the installed mod
+        start = time.perf_counter()
+        moddata = gatherModInfo(self.asset_path, modid)
+        moddata['version'] = version
+
+        # See if we got a title for this mod from either the mod's PGD or the SteamAPI earlier
+        title = self._fetchModTitleFromPGD(moddata)
+        if not title and modid in self.steam_mod_details and 'title' in self.steam_mod_details[modid]:
+            title = self.steam_mod_details[modid]['title']  # ^ inefficient
+
+        moddata['title'] = title or moddata['name']
+
+        moddata_path = self.mods_path / modid / MODDATA_FILENAME
+        with open(moddata_path, 'w') as f:
+            json.dump(moddata, f, indent='\t')
+
+        # Save the data so we can refer to it later
+        self.mod_data_cache[modid] = moddata
+        timings['metadata'] += time.perf_counter() - start
 
     def _fetchModTitleFromPGD(self, moddata):
         resolver = FixedModResolver({moddata['name']: moddata['id']})
         loader = AssetLoader(resolver, self.asset_path)
         pkg = moddata['package']
         if pkg:
-            pgd_asset = loader[moddata['package']]
-            title = pgd_asset.default_export.properties.get_property('ModName').value
+            # Only the mod's name is needed from the PGD
+            with ue_parsing_context(property_filter=('ModName', )):
+                pgd_asset = loader[moddata['package']]
+                title = pgd_asset.default_export.properties.get_property('ModName').value
         else:
             title = moddata['id']
         return title
@@ -280,6 +349,12 @@ class ManagedModResolver(ModResolver):
             self.modNameToIds[name.lower()] = modid
         return self
 
+    def __getstate__(self):
+        # The manager isn't needed once initialised and can't be sent to other processes
+        state = dict(vars(self))
+        state['manager'] = None
+        return state
+
     def get_name_from_id(self, modid: str) -> str:
         data = self.dataCache.get(modid, None)
         if data is None:
@@ -309,6 +384,27 @@ class FixedModResolver(ModResolver):
         return self.idsToNames[modid]
 
 
+def createConfiguredLoader(modresolver: ModResolver,
+                           asset_path: Path,
+                           optimisation: OptimisationSection,
+                           summary_path: Path,
+                           build_id: Optional[str],
+                           cache_share: int = 1) -> AssetLoader:
+    '''Create an asset loader using the given optimisation settings, with `1 / cache_share` of the cache budget.'''
+    cache_manager = UsageBasedCacheManager(max_memory=optimisation.AssetCacheBudget * 1024 * 1024 // max(cache_share, 1),
+                                           weights={'.umap': optimisation.AssetCacheMapWeight})
+    summary_store = None
+    if optimisation.UseAssetSummaryStore:
+        summary_store = AssetSummaryStore(summary_path, build_id=build_id)
+    loader = AssetLoader(modresolver,
+                         asset_path,
+                         cache_manager=ContextAwareCacheWrapper(cache_manager),
+                         use_mmap=optimisation.UseMemoryMappedAssets,
+                         summary_store=summary_store,
+                         use_index=optimisation.UseAssetFileIndex)
+    return loader
+
+
 def findInstalledMods(asset_path: Path) -> Dict[str, Dict]:
     '''Scan installed modules and return their information in a Dict[id->data].'''
     mods_path: Path = asset_path / 'Content' / 'Mods'
@@ -384,32 +480,90 @@ def verifyModDownloaded(game_path, modid):
     return srcPath.is_dir()
 
 
-def unpackMod(game_path, modid):
-    '''Unpack a compressed steam mod.'''
+def unpackMod(game_path, modid, executor: Optional[Executor] = None) -> Set[str]:
+    '''
+    Unpack a compressed steam mod.
+    Files are processed on `executor` if one is given, returning once they are all done. Each file is then
+    decompressed on a single thread, as the executor already provides the parallelism. Otherwise files are
+    processed in turn, with their chunks decompressed on a pool shared by the whole mod.
+
+    Source files are fingerprinted and recorded in a manifest, so on an update only changed files are
+    unpacked and removed ones deleted. Returns the names of the assets that were changed or removed.
+    '''
     srcPath: Path = game_path / 'steamapps' / 'workshop' / 'content' / str(ARK_MAIN_APP_ID) / str(modid) / 'WindowsNoEditor'
     dstPath: Path = game_path / 'ShooterGame' / 'Content' / 'Mods' / str(modid)
+    manifestPath = dstPath / UNPACK_MANIFEST_FILENAME
+
+    # Without a manifest the existing files can't be trusted, so start from scratch
+    oldManifest = readUnpackManifest(manifestPath) if dstPath.is_dir() else None
+    if oldManifest is None:
+        oldManifest = dict()
+        if dstPath.is_dir():
+            shutil.rmtree(dstPath)
+
+    def unpackIfChanged(relPath: str, src: Path, dst: Path, unpack: Callable[[Path, Path], Any]):
+        oldFingerprint = oldManifest.get(relPath, None)
+        fingerprint = fingerprintFile(src, oldFingerprint)
+        if oldFingerprint and fingerprint[:2] == oldFingerprint[:2] and dst.is_file():
+            return (relPath, fingerprint, None)
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f'Unpacking {src} -> {dst}')
+        unpack(src, dst)
+        return (relPath, fingerprint, dst)
+
+    jobs: List[Future] = []
+    results: List[Tuple[str, List[Any], Optional[Path]]] = []
+    with ExitStack() as stack:
+        if executor:
+            unpackFile: Callable[[Path, Path], Any] = partial(unpackModFile, threads=1)
+        else:
+            chunkExecutor = stack.enter_context(ThreadPoolExecutor(UNPACK_THREADS))
+            unpackFile = partial(unpackModFile, executor=chunkExecutor)
 
-    if dstPath.is_dir():
-        shutil.rmtree(dstPath)
-
-    for curdir, _, files in walk(srcPath):
-        curdir = Path(curdir).relative_to(srcPath)
-        for filename in files:
-            filename = Path(filename)
-            if filename.suffix.lower() == '.z':
-                # decompress
+        for curdir, _, files in walk(srcPath):
+            curdir = Path(curdir).relative_to(srcPath)
+            for filename in files:
+                filename = Path(filename)
                 src = srcPath / curdir / filename
-                dst = dstPath / curdir / filename.stem
-                dst.parent.mkdir(parents=True, exist_ok=True)
-                logger.debug(f'Decompressing {src} -> {dst}')
-                unpackModFile(src, dst)
-            elif filename.suffix.lower() == '.uncompressed_size':
-                # ignore
-                pass
-            else:
-                # just copy
-                src = srcPath / curdir / filename
-                dst = dstPath / curdir / filename
-                dst.parent.mkdir(parents=True, exist_ok=True)
-                logger.debug(f'Copying {src} -> {dst}')
-                shutil.copyfile(src, dst)
+                if filename.suffix.lower() == '.z':
+                    # decompress
+                    args = ((curdir / filename).as_posix(), src, dstPath / curdir / filename.stem, unpackFile)
+                elif filename.suffix.lower() == '.uncompressed_size':
+                    # ignore
+                    continue
+                else:
+                    # just copy
+                    args = ((curdir / filename).as_posix(), src, dstPath / curdir / filename, shutil.copyfile)
+
+                if executor:
+                    jobs.append(executor.submit(unpackIfChanged, *args))
+                else:
+                    results.append(unpackIfChanged(*args))
+
+        # Wait for everything, then raise the first failure
+        wait(jobs)
+        results.extend(future.result() for future in jobs)
+
+    manifest = dict((relPath, fingerprint) for relPath, fingerprint, _ in results)
+    changed = [dst for _, _, dst in results if dst]
+
+    # Delete the outputs of source files that no longer exist
+    for relPath in oldManifest.keys() - manifest.keys():
+        dst = dstPath / relPath
+        if dst.suffix.lower() == '.z':
+            dst = dst.with_suffix('')
+        if dst.is_file():
+            logger.debug(f'Removing {dst}')
+            dst.unlink()
+        changed.append(dst)
+
+    dstPath.mkdir(parents=True, exist_ok=True)
+    writeUnpackManifest(manifestPath, manifest)
+
+    return set(_assetNameFromModFile(dstPath, dst, modid) for dst in changed if dst.suffix.lower() in ASSET_EXTENSIONS)
+
+
+def _assetNameFromModFile(dstPath: Path, filename: Path, modid) -> str:
+    relPath = filename.relative_to(dstPath).with_suffix('')
+    return f'/Game/Mods/{modid}/{relPath.as_posix()}'
@@ -92,6 +92,16 @@ class ExportWikiSection(ExportSection):
 
 class OptimisationSection(BaseModel):
     SearchIgnore: IniStringList = IniStringList()
+    UseMemoryMappedAssets: bool = False
+    AssetCacheBudget: int = 3072
+    AssetCacheMapWeight: float = 2.0
+    UseAssetSummaryStore: bool = False
+    DiscoveryWorkers: int = 1
+    MapWorkers: int = 1
+    SpeciesWorkers: int = 1
+    UseAssetFileIndex: bool = True
+    ModUnpackWorkers: int = 2
+    UseDependencyTracking: bool = False
 
     class Config:
         extra = Extra.forbid
@@ -7,7 +7,9 @@ from typing import *
 
 from config import ConfigFile, get_global_config
 from ue.asset import UAsset
+from ue.context import ue_parsing_context
 from ue.loader import AssetLoader
+from ue.summary import AssetSummary
 
 # pylint: disable=unnecessary-pass # present for readability and to help the formatter
 
@@ -50,6 +52,13 @@ class AssetTester(ABC):
         '''
         pass
 
+    def is_a_summary_match(self, summary: AssetSummary) -> Optional[bool]:
+        '''
+        Return True or False if the stored summary of an asset is enough to decide the same way `is_a_full_match`
+        would, or None if the asset must be loaded. Used only when the loader has a summary store.
+        '''
+        return None
+
 
 class Discoverer:
     def __init__(self, loader: AssetLoader, *, remove_assets_from_cache: bool = False, config: ConfigFile = get_global_config()):
@@ -96,8 +105,11 @@ class Discoverer:
     def _test_asset(self, assetname: str, ext: str) -> Iterable[str]:
         '''Check the given asset against the registered testers, yielding the names of ones that match.'''
         # Load and test against the raw memory first, to be as fast as possible
-        mem_view, _ = self.loader.load_raw_asset(assetname)
+        mem_view, _, _ = self.loader.load_raw_asset(assetname)
         mem: bytes = mem_view.obj  # type: ignore # missing from typedef of native module
+        if not isinstance(mem, bytes):
+            # Memory-mapped assets don't support substring tests, so take a copy of the (small) header file
+            mem = bytes(mem_view)
 
         ext_testers = self.testers_by_ext[ext.lower()]
         fast_matches: List[AssetTester] = [tester for tester in ext_testers if tester.is_a_fast_match(mem)]
@@ -108,19 +120,30 @@ class Discoverer:
         if not fast_matches:
             return []
 
-        # Load and parse the asset
-        # TODO: Don't parse properties if we don't need them
-        # need_props = any(tester.get_requires_properties() for tester in fast_matches)
-        try:
-            asset: UAsset = self.loader[assetname]
-        except Exception:  # pylint: disable=broad-except
-            print("Failed to load asset: " + assetname)
-            return []
-
-        assert asset.assetname
-
-        # Test fully only for the ones that matched quickly
-        full_matches = [tester for tester in fast_matches if tester.is_a_full_match(asset)]
+        # Try to decide from a stored summary, to avoid parsing the asset at all
+        summary = self.loader.get_stored_summary(assetname)
+        if summary:
+            summary_matches = [(tester, tester.is_a_summary_match(summary)) for tester in fast_matches]
+            if all(match is not None for _, match in summary_matches):
+                return [tester.get_category_name() for tester, match in summary_matches if match]
+
+        # Load and parse the asset, stopping after the tables if no tester needs properties
+        need_props = any(tester.get_requires_properties() for tester in fast_matches)
+        with ue_parsing_context(properties=need_props, tables_only=not need_props):
+            try:
+                asset: UAsset = self.loader[assetname]
+            except Exception:  # pylint: disable=broad-except
+                print("Failed to load asset: " + assetname)
+                return []
+
+            assert asset.assetname
+
+            # Test fully only for the ones that matched quickly
+            full_matches = [tester for tester in fast_matches if tester.is_a_full_match(asset)]
+
+            # Keep a summary so later runs can skip parsing it
+            if self.loader.summary_store and not summary:
+                self.loader.store_summary(asset)
 
         # Remove the asset from the cache, if requested
         if self.remove_assets_from_cache:
@@ -1,21 +1,26 @@
 import hashlib
 import json
 import re
+from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 from logging import NullHandler, getLogger
+from multiprocessing import Pool
 from operator import attrgetter
 from pathlib import Path
 from typing import *
 
 import ark.discovery
 import ark.properties
+import ue.hierarchy
 from ark.common import PGD_PKG
 from ark.export_asb_values import values_for_species, values_from_pgd
+from ark.overrides import OVERRIDE_FILENAME
 from automate.ark import ArkSteamManager
 from automate.version import createExportVersion
 from config import ConfigFile, get_global_config
-from ue.loader import AssetLoadException
-from ue.utils import property_serialiser
+from ue.loader import AssetLoader, AssetLoadException
+from ue.utils import hash_files, property_serialiser
 from utils.strings import get_valid_filename
 
 logger = getLogger(__name__)
@@ -51,22 +56,30 @@ class Exporter:
         self.loader = arkman.getLoader()
         self.discoverer = ark.discovery.SpeciesDiscoverer(self.loader)
         self.game_version = self.arkman.getGameVersion()
+        self.dependencies = self.arkman.getDependencyStore()
+        self.overrides_digest = hash_files([OVERRIDE_FILENAME]) if self.dependencies else None
+        self.pool: Optional[Pool] = None
 
     def perform(self):
         self._prepare_versions()
 
-        if self.config.export_asb.ExportVanillaSpecies:
-            logger.info('Beginning export of vanilla species')
-            self._export_vanilla()
+        # One pool serves the whole export, with workers wiping each mod's assets as they move between outputs
+        workers = self.config.optimisation.SpeciesWorkers
+        with species_pool(self.loader, workers, self.arkman.getLoaderFactory(workers)) as self.pool:
+            if self.config.export_asb.ExportVanillaSpecies:
+                logger.info('Beginning export of vanilla species')
+                self._export_vanilla()
 
-        for modid in self.modids:
-            logger.info(f'Beginning mod {modid} export')
-            self._export_mod(modid)
+            for modid in self.modids:
+                logger.info(f'Beginning mod {modid} export')
+                self._export_mod(modid)
 
-            # Remove assets with this mod's prefix from the cache
-            prefix = '/Game/Mods/' + self.loader.get_mod_name('/Game/Mods/' + modid)
-            self.loader.wipe_cache_with_prefix(prefix)
+                # Remove assets with this mod's prefix from the cache
+                self.loader.wipe_cache_with_prefix(self._get_mod_prefix(modid))
 
+        self.pool = None
+
+        self.loader.sample_memory()
         logger.info('Max memory: %6.2f Mb', self.loader.max_memory / 1024.0 / 1024.0)
         logger.info('Max cache entries: %d', self.loader.max_cache)
 
@@ -82,13 +95,20 @@ class Exporter:
         version = self._create_version(game_buildid)
         species = list(self.discoverer.discover_vanilla_species())
         species.sort()
-        species_data = self._gather_species_data(species)
-        species_values = self._convert_for_export(species_data, False)
 
-        other: Dict[str, Any] = dict()
-        other.update(self._gather_color_data(PGD_PKG, require_override=False))
+        fullpath = self._get_output_path(None)
+        inputs = self._describe_inputs(species, None)
+        if self._is_output_current(fullpath, inputs):
+            return
+
+        with self.loader.record_dependencies() as dependencies:
+            species_values = self._gather_species_values(species, dependencies)
+
+            other: Dict[str, Any] = dict()
+            other.update(self._gather_color_data(PGD_PKG, require_override=False))
 
         self._export_values(species_values, version=version, moddata=None, other=other)
+        self._record_output(fullpath, inputs, dependencies)
 
     def _export_mod(self, modid: str):
         moddata = self.arkman.getModData(modid)
@@ -97,71 +117,93 @@ class Exporter:
         version = self._create_version(moddata['version'])
         species = list(self.discoverer.discover_mod_species(modid))
         species.sort()
-        species_data = self._gather_species_data(species)
-        species_values = self._convert_for_export(species_data, True)
 
-        other: Dict[str, Any] = dict()
-        mod_pgd = moddata.get('package', None)
-        if mod_pgd:
-            other.update(self._gather_color_data(mod_pgd, require_override=True))
-        else:
-            logger.warning(f'PrimalGameData information missing for mod {modid}')
+        fullpath = self._get_output_path(moddata)
+        inputs = self._describe_inputs(species, moddata)
+        if self._is_output_current(fullpath, inputs):
+            return
+
+        with self.loader.record_dependencies() as dependencies:
+            species_values = self._gather_species_values(species, dependencies, self._get_mod_prefix(modid))
+
+            other: Dict[str, Any] = dict()
+            mod_pgd = moddata.get('package', None)
+            if mod_pgd:
+                other.update(self._gather_color_data(mod_pgd, require_override=True))
+            else:
+                logger.warning(f'PrimalGameData information missing for mod {modid}')
 
         self._export_values(species_values, version=version, moddata=moddata, other=other)
+        self._record_output(fullpath, inputs, dependencies)
+
+    def _describe_inputs(self, species: List[str], moddata: Optional[Dict]) -> str:
+        '''Describe everything other than assets that affects an output, for dependency tracking.'''
+        mod = None
+        if moddata:
+            mod = dict(id=moddata['id'], tag=moddata['name'], title=moddata['title'])
+        # Overrides change names and colour regions in the output, so any edit to them invalidates it
+        return json.dumps(dict(species=species,
+                               mod=mod,
+                               config=self.config.export_asb.dict(),
+                               overrides=self.overrides_digest),
+                          default=str)
+
+    def _is_output_current(self, fullpath: Path, inputs: str) -> bool:
+        if self.dependencies and self.dependencies.is_current(str(fullpath), inputs, self.loader):
+            logger.info(f'No dependencies of {fullpath} have changed')
+            return True
+        return False
+
+    def _record_output(self, fullpath: Path, inputs: str, dependencies: Set[str]):
+        if self.dependencies:
+            self.dependencies.record(str(fullpath), inputs, fullpath, dependencies, self.loader)
 
     def _gather_color_data(self, pgd_assetname: str, require_override: bool = False) -> Dict[str, Any]:
         asset = self.loader[pgd_assetname]
         color_data = values_from_pgd(asset, require_override=require_override)
         return color_data
 
-    def _gather_species_data(self, species):
-        species_data = list()
-        for assetname in species:
-            asset = self.loader[assetname]
-
-            props = None
-            try:
-                props = ark.properties.gather_properties(asset)
-            except AssetLoadException as ex:
-                logger.warning(f'Gathering properties failed for {assetname}: %s', str(ex))
-            except:  # pylint: disable=bare-except
-                logger.warning(f'Gathering properties failed for {assetname}', exc_info=True)
+    def _get_mod_prefix(self, modid: str) -> str:
+        return '/Game/Mods/' + self.loader.get_mod_name('/Game/Mods/' + modid)
 
-            if props:
-                species_data.append((asset, props))
+    def _gather_species_values(self,
+                               species: List[str],
+                               dependencies: Set[str],
+                               mod_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        full_stats = not self.config.export_asb.Export8Stats
 
-        return species_data
+        # Mods with only a few species aren't worth the round trips to the workers
+        if not self.pool or len(species) < SPECIES_POOL_MIN_SPECIES:
+            results = (_species_values(self.loader, assetname, full_stats) for assetname in species)
+            return [species_values for species_values in results if species_values]
 
-    def _convert_for_export(self, species_data, _ismod: bool):
+        # Results come back in the order of the sorted species list, so output matches a serial run
+        # Assets loaded by the workers are added to the dependencies, as they aren't seen by our loader
         values = list()
-        for asset, props in species_data:
-            species_values = None
-            try:
-                species_values = values_for_species(asset,
-                                                    props,
-                                                    allFields=True,
-                                                    fullStats=not self.config.export_asb.Export8Stats,
-                                                    includeBreeding=True,
-                                                    includeColor=True)
-            except:  # pylint: disable=bare-except
-                logger.warning(f'Export conversion failed for {asset.assetname}', exc_info=True)
-
+        work = ((assetname, full_stats, mod_prefix) for assetname in species)
+        for species_values, worker_dependencies in self.pool.imap(_species_values_in_worker, work, chunksize=SPECIES_CHUNK_SIZE):
+            dependencies.update(worker_dependencies)
             if species_values:
                 values.append(species_values)
 
         return values
 
+    def _get_output_path(self, moddata: Optional[Dict]) -> Path:
+        if moddata:
+            filename = f"{moddata['id']}-{moddata['name']}"
+            filename = get_valid_filename(filename)
+        else:
+            filename = 'values'
+
+        return (self.config.settings.OutputPath / self.config.export_asb.PublishSubDir / filename).with_suffix('.json')
+
     def _export_values(self, species_values: List, version: str, other: Dict = None, moddata: Optional[Dict] = None):
         values: Dict[str, Any] = dict()
         values['format'] = "1.12"
 
         if moddata:
-            filename = f"{moddata['id']}-{moddata['name']}"
-            filename = get_valid_filename(filename)
             title = moddata['title'] or moddata['name']
             values['mod'] = dict(id=moddata['id'], tag=moddata['name'], title=title)
-        else:
-            filename = 'values'
 
         values['version'] = version
         values['species'] = species_values
@@ -169,7 +211,7 @@ class Exporter:
         if other:
             values.update(other)
 
-        fullpath = (self.config.settings.OutputPath / self.config.export_asb.PublishSubDir / filename).with_suffix('.json')
+        fullpath = self._get_output_path(moddata)
         self._save_json_if_changed(values, fullpath)
 
     def _save_json_if_changed(self, values: Dict[str, Any], fullpath: Path):
@@ -269,3 +311,89 @@ def _save_as_json(data, filename, pretty=False):
     json_string = _format_json(data, pretty)
     with open(filename, 'w', newline='\n') as f:
         f.write(json_string)
+
+
+def _species_values(loader: AssetLoader, assetname: str, full_stats: bool) -> Optional[Dict[str, Any]]:
+    asset = loader[assetname]
+
+    props = None
+    try:
+        props = ark.properties.gather_properties(asset)
+    except AssetLoadException as ex:
+        logger.warning(f'Gathering properties failed for {assetname}: %s', str(ex))
+    except:  # pylint: disable=bare-except
+        logger.warning(f'Gathering properties failed for {assetname}', exc_info=True)
+
+    if not props:
+        return None
+
+    species_values = None
+    try:
+        species_values = values_for_species(asset,
+                                            props,
+                                            allFields=True,
+                                            fullStats=full_stats,
+                                            includeBreeding=True,
+                                            includeColor=True)
+    except:  # pylint: disable=bare-except
+        logger.warning(f'Export conversion failed for {asset.assetname}', exc_info=True)
+
+    return species_values
+
+
+@contextmanager
+def species_pool(loader: AssetLoader,
+                 workers: int,
+                 loader_factory: Optional[Callable[[], AssetLoader]] = None) -> Iterator[Optional[Pool]]:
+    '''
+    Create a process pool that extracts species values, with each worker owning its own loader
+    and a copy of the loaded hierarchy. Workers create their loader with `loader_factory` if given,
+    otherwise a plain loader like the parent's. Gives None if `workers` is less than two.
+    '''
+    if workers < 2:
+        yield None
+        return
+
+    logger.info('Starting %d species export workers', workers)
+    initargs = (loader_factory or partial(AssetLoader, loader.modresolver, str(loader.asset_path)), ue.hierarchy.tree)
+    with Pool(workers, initializer=_init_species_worker, initargs=initargs) as pool:
+        yield pool
+
+
+# Species per batch of work sent to an export worker
+SPECIES_CHUNK_SIZE = 4
+
+# Outputs with fewer species than this are extracted without the workers
+SPECIES_POOL_MIN_SPECIES = SPECIES_CHUNK_SIZE * 2
+
+_worker_loader: Optional[AssetLoader] = None
+_worker_mod_prefix: Optional[str] = None
+
+
+def _init_species_worker(loader_factory: Callable[[], AssetLoader], tree):
+    global _worker_loader  # pylint: disable=global-statement
+    ue.hierarchy.tree = tree
+    _worker_loader = loader_factory()
+
+
+def _species_values_in_worker(work: Tuple[str, bool, Optional[str]]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    '''
+    Worker function extracting a species, giving its values and the names of the assets it needed.
+    UE objects can't leave the worker, so values are converted to plain JSON types.
+    Work from a different output than the last wipes the previous mod's assets from the worker's cache.
+    '''
+    global _worker_mod_prefix  # pylint: disable=global-statement
+    loader = _worker_loader
+    assert loader
+    assetname, full_stats, mod_prefix = work
+    if mod_prefix != _worker_mod_prefix:
+        if _worker_mod_prefix:
+            loader.wipe_cache_with_prefix(_worker_mod_prefix)
+        _worker_mod_prefix = mod_prefix
+
+    with loader.record_dependencies() as dependencies:
+        species_values = _species_values(loader, assetname, full_stats)
+
+    if not species_values:
+        return (None, sorted(dependencies))
+    return (json.loads(_format_json(species_values)), sorted(dependencies))
@@ -1,7 +1,13 @@
+import json
+from contextlib import contextmanager
+from functools import partial
 from logging import NullHandler, getLogger
+from multiprocessing import Pool
 from pathlib import Path
 from typing import *
 
+import ue.hierarchy
+
 from ark.export_wiki.discovery import CompositionSublevelTester
 from ark.export_wiki.exporters import PROXY_TYPE_MAP, is_export_extractable
 from ark.export_wiki.map import WorldData
@@ -9,13 +15,13 @@ from ark.export_wiki.mod_gathering import gather_spawn_groups_from_pgd
 from ark.export_wiki.spawncontainers import get_spawn_entry_container_data
 from automate.ark import ArkSteamManager
 from automate.discovery import Discoverer
-from automate.export import _save_as_json, _should_save_json
+from automate.export import _format_json, _save_as_json, _should_save_json
 from automate.version import createExportVersion
 from config import ConfigFile, get_global_config
 from ue.asset import UAsset
 from ue.gathering import gather_properties
 from ue.hierarchy import MissingParent, inherits_from
-from ue.loader import AssetNotFound
+from ue.loader import AssetLoader, AssetNotFound
 from utils.strings import get_valid_filename
 
 logger = getLogger(__name__)
@@ -50,8 +56,8 @@ class Exporter:
         self.modids = modids
         self.loader = arkman.getLoader()
         self.game_version = self.arkman.getGameVersion()
-        self.discoverer = Discoverer(self.loader, remove_assets_from_cache=True)
-        self.discoverer.register_asset_tester(CompositionSublevelTester())
+        self.collector = LevelCollector(self.loader)
+        self.dependencies = self.arkman.getDependencyStore()
 
     def perform(self):
         self._prepare_versions()
@@ -70,6 +76,7 @@ class Exporter:
             prefix = '/Game/Mods/' + self.loader.get_mod_name('/Game/Mods/' + modid)
             self.loader.wipe_cache_with_prefix(prefix)
 
+        self.loader.sample_memory()
         logger.info('Max memory: %6.2f Mb', self.loader.max_memory / 1024.0 / 1024.0)
         logger.info('Max cache entries: %d', self.loader.max_cache)
 
@@ -84,9 +91,7 @@ class Exporter:
         game_buildid = self.arkman.getGameBuildId()
         version = self._create_version(game_buildid)
 
-        for asset_name in self.config.maps:
-            self._export_level(asset_name, version)
-            self.loader.wipe_cache_with_prefix(asset_name[:asset_name.rfind('/')])
+        self._export_levels(self.config.maps, version)
 
     def _export_mod(self, modid: str):
         moddata = self.arkman.getModData(modid)
@@ -99,49 +104,55 @@ class Exporter:
 
         map_list = moddata.get('maps', None)
         if map_list:
-            for map_name in map_list:
-                self._export_level(f'/Game/Mods/{modid}/{map_name}', version, moddata)
+            self._export_levels([f'/Game/Mods/{modid}/{map_name}' for map_name in map_list], version, moddata)
         else:
             logger.warning(f'Mod {modid} is missing its list of maps.')
 
-    def _export_level(self, asset_name: str, version: str, moddata: Optional[Dict] = None):
-        logger.info(f'Collecting data from a map: {asset_name}')
-        # Gather data from the persistent level and create a container
-        asset = self.loader[asset_name]
-        world_data = WorldData(asset)
-        self._gather_data_from_level(asset, world_data)
-        self.loader.cache.remove(asset_name)
+    def _export_levels(self, asset_names: Sequence[str], version: str, moddata: Optional[Dict] = None):
+        inputs = self._describe_inputs(moddata)
+        asset_names = [asset_name for asset_name in asset_names if not self._is_level_current(asset_name, inputs)]
+
+        workers = min(self.config.optimisation.MapWorkers, len(asset_names))
+        with map_export_pool(self.loader, workers, self.arkman.getLoaderFactory(workers)) as pool:
+            if pool:
+                # Results come back in submission order, so output matches a serial run
+                results = pool.imap(_collect_level_in_worker, asset_names)
+                for asset_name, (values, dependencies) in zip(asset_names, results):
+                    fullpath = self._export_world_data(values, version, moddata)
+                    self._record_level(asset_name, inputs, fullpath, dependencies)
+                return
+
+            for asset_name in asset_names:
+                with self.loader.record_dependencies() as dependencies:
+                    world_data = self.collector.collect(asset_name)
+                    values = world_data.format_for_json()
+                fullpath = self._export_world_data(values, version, moddata)
+                self._record_level(asset_name, inputs, fullpath, dependencies)
+                del world_data
+                _wipe_level_directory(self.loader, asset_name)
+
+    def _describe_inputs(self, moddata: Optional[Dict]) -> str:
+        '''Describe everything other than assets that affects a map's output, for dependency tracking.'''
+        mod = None
+        if moddata:
+            mod = dict(id=moddata['id'], tag=moddata['name'], title=moddata['title'])
+        return json.dumps(dict(mod=mod, config=self.config.export_wiki.dict()), default=str)
 
-        # Load sublevels and gather data from them
-        map_directory = asset_name[:asset_name.rfind('/')]
-        composition_levels = self.discoverer.run(map_directory)['worldcomposition']
-        for sublevel_name in composition_levels:
-            self._gather_data_from_level(self.loader[sublevel_name], world_data)
-            self.loader.cache.remove(sublevel_name)
+    def _is_level_current(self, asset_name: str, inputs: str) -> bool:
+        # New world composition sublevels aren't in the recorded dependencies, so regenerate the map if
+        # anything in its directory was added or changed by a mod update this run
+        map_dir = asset_name[:asset_name.rfind('/') + 1]
+        if any(changed.startswith(map_dir) for changed in self.arkman.getChangedAssets()):
+            return False
 
-        # Gather spawn groups and save the data
-        self._gather_spawn_groups(world_data)
-        self._export_world_data(world_data, version, moddata)
-        del world_data
+        if self.dependencies and self.dependencies.is_current(f'wiki-map:{asset_name}', inputs, self.loader):
+            logger.info(f'No dependencies of map {asset_name} have changed')
+            return True
+        return False
 
-    def _gather_data_from_level(self, level: UAsset, world_data: WorldData):
-        for export in level.exports:
-            if not is_export_extractable(export):
-                continue
-
-            proxy = gather_properties(export)  # type:ignore
-            export_function = PROXY_TYPE_MAP.get(proxy.get_ue_type(), None)
-            if export_function:
-                export_function(world_data, proxy)  # type:ignore
-            else:
-                logger.error(f'Unsupported type: no export mapping exists for "{proxy.get_ue_type()}".')
-            del proxy
-
-    def _gather_spawn_groups(self, world: WorldData):
-        for index in range(len(world.spawnGroups)):
-            group_data = get_spawn_entry_container_data(self.loader, world.spawnGroups[index])
-            if group_data:
-                world.spawnGroups[index] = group_data.as_dict()
+    def _record_level(self, asset_name: str, inputs: str, fullpath: Path, dependencies: Iterable[str]):
+        if self.dependencies:
+            self.dependencies.record(f'wiki-map:{asset_name}', inputs, fullpath, dependencies, self.loader)
 
     def _export_modded_spawn_groups(self, modid: str, version: str, moddata: dict):
         mod_pgd = moddata.get('package', None)
@@ -166,24 +177,26 @@ class Exporter:
         fullpath = (fullpath / 'spawningGroups').with_suffix('.json')
         self._save_json_if_changed(values, fullpath)
 
-    def _export_world_data(self, world_data: WorldData, version: str, moddata: Optional[Dict] = None):
+    def _export_world_data(self, world_values: Dict[str, Any], version: str, moddata: Optional[Dict] = None) -> Path:
         values: Dict[str, Any] = dict()
+        map_name = world_values['map']
 
         if moddata:
-            dirname = f"{moddata['id']}-{moddata['name']}-{world_data.name}"
+            dirname = f"{moddata['id']}-{moddata['name']}-{map_name}"
             dirname = get_valid_filename(dirname)
             title = moddata['title'] or moddata['name']
             values['mod'] = dict(id=moddata['id'], tag=moddata['name'], title=title)
         else:
-            dirname = get_valid_filename(world_data.name)
+            dirname = get_valid_filename(map_name)
 
         values['version'] = version
-        values.update(world_data.format_for_json())
+        values.update(world_values)
 
         fullpath = (self.config.settings.OutputPath / self.config.export_wiki.PublishSubDir / dirname)
         fullpath.mkdir(parents=True, exist_ok=True)
         fullpath = (fullpath / 'map').with_suffix('.json')
         self._save_json_if_changed(values, fullpath)
+        return fullpath
 
     def _save_json_if_changed(self, values: Dict[str, Any], fullpath: Path):
         changed, version = _should_save_json(values, fullpath)
@@ -194,3 +207,98 @@ class Exporter:
             _save_as_json(values, fullpath, pretty=pretty)
         else:
             logger.info(f'No changes to {fullpath}')
+
+
+class LevelCollector:
+    '''Gathers the data of a map from its persistent level and world composition sublevels.'''
+    def __init__(self, loader: AssetLoader):
+        self.loader = loader
+        self.discoverer = Discoverer(self.loader, remove_assets_from_cache=True)
+        self.discoverer.register_asset_tester(CompositionSublevelTester())
+
+    def collect(self, asset_name: str) -> WorldData:
+        logger.info(f'Collecting data from a map: {asset_name}')
+        # Gather data from the persistent level and create a container
+        asset = self.loader[asset_name]
+        world_data = WorldData(asset)
+        self._gather_data_from_level(asset, world_data)
+        self.loader.cache.remove(asset_name)
+
+        # Load sublevels and gather data from them
+        map_directory = asset_name[:asset_name.rfind('/')]
+        composition_levels = self.discoverer.run(map_directory)['worldcomposition']
+        for sublevel_name in composition_levels:
+            self._gather_data_from_level(self.loader[sublevel_name], world_data)
+            self.loader.cache.remove(sublevel_name)
+
+        # Gather spawn groups
+        self._gather_spawn_groups(world_data)
+        return world_data
+
+    def _gather_data_from_level(self, level: UAsset, world_data: WorldData):
+        for export in level.exports:
+            if not is_export_extractable(export):
+                continue
+
+            proxy = gather_properties(export)  # type:ignore
+            export_function = PROXY_TYPE_MAP.get(proxy.get_ue_type(), None)
+            if export_function:
+                export_function(world_data, proxy)  # type:ignore
+            else:
+                logger.error(f'Unsupported type: no export mapping exists for "{proxy.get_ue_type()}".')
+            del proxy
+
+    def _gather_spawn_groups(self, world: WorldData):
+        for index in range(len(world.spawnGroups)):
+            group_data = get_spawn_entry_container_data(self.loader, world.spawnGroups[index])
+            if group_data:
+                world.spawnGroups[index] = group_data.as_dict()
+
+
+@contextmanager
+def map_export_pool(loader: AssetLoader,
+                    workers: int,
+                    loader_factory: Optional[Callable[[], AssetLoader]] = None) -> Iterator[Optional[Pool]]:
+    '''
+    Create a process pool that collects whole maps, with each worker owning its own loader
+    and a copy of the loaded hierarchy. Workers create their loader with `loader_factory` if given,
+    otherwise a plain loader like the parent's. Gives None if `workers` is less than two.
+    '''
+    if workers < 2:
+        yield None
+        return
+
+    logger.info('Starting %d map export workers', workers)
+    initargs = (loader_factory or partial(AssetLoader, loader.modresolver, str(loader.asset_path)), ue.hierarchy.tree)
+    with Pool(workers, initializer=_init_map_worker, initargs=initargs) as pool:
+        yield pool
+
+
+def _wipe_level_directory(loader: AssetLoader, asset_name: str):
+    # Cached assets are keyed by clean names, which use mod names rather than IDs
+    asset_name = loader.clean_asset_name(asset_name)
+    loader.wipe_cache_with_prefix(asset_name[:asset_name.rfind('/') + 1])
+
+
+_worker_collector: Optional[LevelCollector] = None
+
+
+def _init_map_worker(loader_factory: Callable[[], AssetLoader], tree):
+    global _worker_collector  # pylint: disable=global-statement
+    ue.hierarchy.tree = tree
+    _worker_collector = LevelCollector(loader_factory())
+
+
+def _collect_level_in_worker(asset_name: str) -> Tuple[Dict[str, Any], List[str]]:
+    '''
+    Worker function collecting a map, giving its values and the names of the assets it needed.
+    UE objects can't leave the worker, so values are converted to plain JSON types.
+    '''
+    collector = _worker_collector
+    assert collector
+    with collector.loader.record_dependencies() as dependencies:
+        world_data = collector.collect(asset_name)
+        values = json.loads(_format_json(world_data.format_for_json()))
+    del world_data
+    _wipe_level_directory(collector.loader, asset_name)
+    return (values, sorted(dependencies))
@@ -1,12 +1,23 @@
+import json
+import os
+import struct
 import zlib
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import ExitStack
 from logging import NullHandler, getLogger
+from pathlib import Path
 from typing import *
 
 from ue.stream import MemoryStream
+from ue.utils import hash_files
 
 __all__ = (
     'DecompressionError',
     'unpackModFile',
+    'fingerprintFile',
+    'readUnpackManifest',
+    'writeUnpackManifest',
     'readACFFile',
     'readModInfo',
     'readModMetaInfo',
@@ -22,6 +33,13 @@ class DecompressionError(Exception):
     '''An error occurred during file decompression.'''
 
 
+# Threads used to decompress the chunks of a single mod file
+UNPACK_THREADS = min(4, os.cpu_count() or 1)
+
+# Decompressed chunks waiting to be written, which bounds memory use (chunks are usually 128KiB)
+UNPACK_MAX_PENDING_CHUNKS = 32
+
+
 # Compressed file structure:
 #   8   fixed token 0x9e2a83c1
 #   8   chunk size (when uncompressed)
@@ -30,38 +48,108 @@ class DecompressionError(Exception):
 #   repeat:
 #     8   chunk compressed size
 #     8   chunk uncompressed size (matches chunk size in all but the last chunk)
-def unpackModFile(src: str, dst: str):
-    f = loadFileAsStream(src)
-    token = f.readUInt64()
-    sizeUnpackedChunk = f.readUInt64()
-    sizePacked = f.readUInt64()
-    sizeUnpacked = f.readUInt64()
-
-    assert token == 0x9e2a83c1, DecompressionError("Invalid header in downloaded mod")
-
-    chunkSizes = []
-    sizeFound = 0
-    while sizeFound < sizeUnpacked:
-        chunkSizeCompressed = f.readUInt64()
-        chunkSizeUnompressed = f.readUInt64()
-        chunkSizes.append((chunkSizeCompressed, chunkSizeUnompressed))
-        sizeFound += chunkSizeUnompressed
-
-    assert sizeFound == sizeUnpacked, DecompressionError("Invalid chunk sizes in downloaded mod")
-
-    with open(dst, 'wb', buffering=64 * 1024) as of:
-        for i, (csCompressed, csUncompressed) in enumerate(chunkSizes):
-            chunkData = f.readBytes(csCompressed)
-            uncompressedChunkData = zlib.decompress(chunkData)
-            del chunkData
-
-            assert len(uncompressedChunkData) == csUncompressed, DecompressionError(
-                "Decompression of downloaded mod chunk failed verification")
-            assert len(uncompressedChunkData) == sizeUnpackedChunk or i + 1 == len(chunkSizes), DecompressionError(
-                "Chunk of downloaded mod is not the expected size")
-
-            of.write(uncompressedChunkData)
-            del uncompressedChunkData
+def unpackModFile(src: str,
+                  dst: str,
+                  threads: int = UNPACK_THREADS,
+                  maxPendingChunks: int = UNPACK_MAX_PENDING_CHUNKS,
+                  executor: Optional[Executor] = None):
+    '''
+    Decompress a downloaded mod file.
+
+    Chunks are read one at a time and decompressed on `executor`, or a pool of `threads` threads if not given,
+    as zlib releases the GIL. With a single thread and no executor they are decompressed on the calling thread.
+    They are written out in order, with no more than `maxPendingChunks` held in memory at once.
+    '''
+    with open(src, 'rb') as f:
+        token, sizeUnpackedChunk, _sizePacked, sizeUnpacked = _readUInt64s(f, 4)
+
+        assert token == 0x9e2a83c1, DecompressionError("Invalid header in downloaded mod")
+
+        chunkSizes = []
+        sizeFound = 0
+        while sizeFound < sizeUnpacked:
+            chunkSizeCompressed, chunkSizeUnompressed = _readUInt64s(f, 2)
+            chunkSizes.append((chunkSizeCompressed, chunkSizeUnompressed))
+            sizeFound += chunkSizeUnompressed
+
+        assert sizeFound == sizeUnpacked, DecompressionError("Invalid chunk sizes in downloaded mod")
+
+        with open(dst, 'wb', buffering=64 * 1024) as of, ExitStack() as stack:
+            if executor is None and threads > 1:
+                executor = stack.enter_context(ThreadPoolExecutor(threads))
+            pending: Deque[Future] = deque()
+
+            def write_next_chunk():
+                uncompressedChunkData = pending.popleft().result()
+                of.write(uncompressedChunkData)
+                del uncompressedChunkData
+
+            for i, (csCompressed, csUncompressed) in enumerate(chunkSizes):
+                chunkData = f.read(csCompressed)
+                assert len(chunkData) == csCompressed, DecompressionError("Downloaded mod is truncated")
+
+                isLast = i + 1 == len(chunkSizes)
+                if not executor:
+                    of.write(_decompressChunk(chunkData, csUncompressed, sizeUnpackedChunk, isLast))
+                    continue
+
+                pending.append(executor.submit(_decompressChunk, chunkData, csUncompressed, sizeUnpackedChunk, isLast))
+                del chunkData
+
+                while len(pending) >= maxPendingChunks:
+                    write_next_chunk()
+
+            while pending:
+                write_next_chunk()
+
+
+def _readUInt64s(f: BinaryIO, count: int) -> Tuple[int, ...]:
+    data = f.read(8 * count)
+    assert len(data) == 8 * count, DecompressionError("Downloaded mod is truncated")
+    return struct.unpack(f'<{count}Q', data)
+
+
+def _decompressChunk(chunkData: bytes, csUncompressed: int, sizeUnpackedChunk: int, isLast: bool) -> bytes:
+    uncompressedChunkData = zlib.decompress(chunkData)
+
+    assert len(uncompressedChunkData) == csUncompressed, DecompressionError(
+        "Decompression of downloaded mod chunk failed verification")
+    assert len(uncompressedChunkData) == sizeUnpackedChunk or isLast, DecompressionError(
+        "Chunk of downloaded mod is not the expected size")
+
+    return uncompressedChunkData
+
+
+def fingerprintFile(filename: Union[str, Path], previous: Optional[List[Any]] = None) -> List[Any]:
+    '''
+    Return the size, SHA1 hex digest and modification time of a file, as a JSON-compatible list.
+    If the size and modification time match those of the `previous` fingerprint it is returned without hashing the file.
+    Fingerprints have the same content when their first two entries match.
+    '''
+    stat = os.stat(filename)
+    if previous and len(previous) > 2 and previous[0] == stat.st_size and previous[2] == stat.st_mtime_ns:
+        return previous
+
+    return [stat.st_size, hash_files([str(filename)]), stat.st_mtime_ns]
+
+
+def readUnpackManifest(filename: Path) -> Optional[Dict[str, List[Any]]]:
+    '''Read the fingerprints of the source files of an unpacked mod, or None if there is no valid manifest.'''
+    try:
+        with open(filename) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(manifest, dict):
+        return None
+
+    return manifest
+
+
+def writeUnpackManifest(filename: Path, manifest: Dict[str, List[Any]]):
+    with open(filename, 'w', newline='\n') as f:
+        json.dump(manifest, f, indent='\t', sort_keys=True)
 
 
 def readACFFile(filename, outputType=dict):
@@ -0,0 +1,37 @@
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest  # type: ignore
+
+from . import ark
+from .ark import ArkSteamManager
+
+
+def test_install_mods_waits_for_unpack_on_download_failure(tmp_path: Path, mocker):
+    unpacking = threading.Event()
+
+    def install_workshopfiles(_app, modid, _path):
+        if modid == '2':
+            # Only fail once the first mod is being unpacked in the background
+            unpacking.wait(5)
+            raise ConnectionError('download failed')
+
+    def unpack_and_record(modid, _version, _pool, _timings):
+        unpacking.set()
+        threading.Event().wait(0.1)
+        raise ValueError(f'unpack of {modid} failed')
+
+    arkman = ArkSteamManager.__new__(ArkSteamManager)
+    arkman.config = SimpleNamespace(optimisation=SimpleNamespace(ModUnpackWorkers=1))
+    arkman.steamcmd = SimpleNamespace(install_workshopfiles=install_workshopfiles)
+    arkman.gamedata_path = tmp_path
+    mocker.patch.object(ark, 'verifyModDownloaded', lambda _path, _modid: True)
+    mocker.patch.object(ark, 'getSteamModVersions', lambda _path, modids: {modid: 1 for modid in modids})
+    mocker.patch.object(arkman, '_unpackAndRecordMod', unpack_and_record)
+
+    # The pending unpack is waited for, so its failure isn't lost behind the download's
+    with pytest.raises(ValueError, match='unpack of 1 failed') as excinfo:
+        arkman._installMods(['1', '2'])  # pylint: disable=protected-access
+
+    assert isinstance(excinfo.value.__context__, ConnectionError)
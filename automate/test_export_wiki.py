@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from ue.loader import AssetLoader
+
+from .ark import FixedModResolver
+from .export_wiki import _wipe_level_directory
+
+
+def _fake_asset():
+    return SimpleNamespace(raw_size=10,
+                           raw_export_size=0,
+                           names=(),
+                           imports=(),
+                           exports=(),
+                           has_properties=False,
+                           has_lazy_properties=False,
+                           file_ext='.umap')
+
+
+def test_wipe_level_directory_of_mod(tmp_path):
+    loader = AssetLoader(FixedModResolver({'Purlovia': '123'}), assetpath=tmp_path)
+    cache = loader.cache.manager
+    for assetname in ('/Game/Mods/Purlovia/Map', '/Game/Mods/Purlovia/Sub/Level', '/Game/Mods/PurloviaOther/Map'):
+        cache.add(assetname, _fake_asset())
+
+    # Map names use mod IDs, but cached assets are keyed by mod name
+    _wipe_level_directory(loader, '/Game/Mods/123/Map')
+
+    assert cache.lookup('/Game/Mods/Purlovia/Map') is None
+    assert cache.lookup('/Game/Mods/Purlovia/Sub/Level') is None
+    assert cache.lookup('/Game/Mods/PurloviaOther/Map')
@@ -0,0 +1,108 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest import raises  # type: ignore
+
+from .ark import ARK_MAIN_APP_ID, unpackMod
+from .modutils import fingerprintFile, unpackModFile
+
+CHUNK_SIZE = 64
+
+
+def _pack_mod_file(data: bytes) -> bytes:
+    '''Compress data in the format used for downloaded mod files.'''
+    chunks = [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+    compressed = [zlib.compress(chunk) for chunk in chunks]
+
+    header = struct.pack('<4Q', 0x9e2a83c1, CHUNK_SIZE, sum(len(c) for c in compressed), len(data))
+    table = b''.join(struct.pack('<2Q', len(c), len(u)) for c, u in zip(compressed, chunks))
+    return header + table + b''.join(compressed)
+
+
+def test_unpack_in_order(tmp_path):
+    data = os.urandom(CHUNK_SIZE * 50 + 17)
+    src = tmp_path / 'file.z'
+    dst = tmp_path / 'file'
+    src.write_bytes(_pack_mod_file(data))
+
+    # Allow few pending chunks so writes have to wait on decompression
+    unpackModFile(str(src), str(dst), threads=4, maxPendingChunks=2)
+    assert dst.read_bytes() == data
+
+
+def test_unpack_single_thread(tmp_path):
+    data = b'Purlovia' * 100
+    src = tmp_path / 'file.z'
+    dst = tmp_path / 'file'
+    src.write_bytes(_pack_mod_file(data))
+
+    unpackModFile(str(src), str(dst), threads=1, maxPendingChunks=1)
+    assert dst.read_bytes() == data
+
+
+def test_unpack_shared_executor(tmp_path):
+    data = os.urandom(CHUNK_SIZE * 20 + 3)
+    with ThreadPoolExecutor(2) as executor:
+        for name in ('one', 'two'):
+            src = tmp_path / f'{name}.z'
+            src.write_bytes(_pack_mod_file(data))
+            unpackModFile(str(src), str(tmp_path / name), maxPendingChunks=4, executor=executor)
+
+    assert (tmp_path / 'one').read_bytes() == data
+    assert (tmp_path / 'two').read_bytes() == data
+
+
+def test_unpack_bad_header(tmp_path):
+    src = tmp_path / 'file.z'
+    src.write_bytes(struct.pack('<4Q', 0, CHUNK_SIZE, 0, 0))
+
+    with raises(AssertionError):
+        unpackModFile(str(src), str(tmp_path / 'file'))
+
+
+def test_unpack_truncated(tmp_path):
+    src = tmp_path / 'file.z'
+    src.write_bytes(_pack_mod_file(os.urandom(CHUNK_SIZE * 4))[:-10])
+
+    with raises(AssertionError):
+        unpackModFile(str(src), str(tmp_path / 'file'))
+
+
+def test_fingerprint(tmp_path):
+    filename = tmp_path / 'file'
+    filename.write_bytes(b'Purlovia')
+    fingerprint = fingerprintFile(filename)
+    assert fingerprint == [8, '0267162292e4ff5900db321cfcf564487896011c', os.stat(filename).st_mtime_ns]
+
+    # Files are only hashed if their size or modification time changed
+    assert fingerprintFile(filename, [8, 'previous', fingerprint[2]]) == [8, 'previous', fingerprint[2]]
+    assert fingerprintFile(filename, [8, 'previous', fingerprint[2] + 1]) == fingerprint
+
+
+def test_unpack_mod_incremental(tmp_path):
+    src = tmp_path / 'steamapps' / 'workshop' / 'content' / str(ARK_MAIN_APP_ID) / '1234' / 'WindowsNoEditor'
+    dst = tmp_path / 'ShooterGame' / 'Content' / 'Mods' / '1234'
+    (src / 'Dinos').mkdir(parents=True)
+    (src / 'mod.info').write_bytes(b'info')
+    (src / 'Dinos' / 'Rex.uasset.z').write_bytes(_pack_mod_file(b'rex' * 100))
+    (src / 'Dinos' / 'Rex.uasset.z.uncompressed_size').write_bytes(b'300')
+    (src / 'Dinos' / 'Dodo.uasset.z').write_bytes(_pack_mod_file(b'dodo' * 100))
+
+    changed = unpackMod(tmp_path, '1234')
+    assert changed == {'/Game/Mods/1234/Dinos/Rex', '/Game/Mods/1234/Dinos/Dodo'}
+    assert (dst / 'mod.info').read_bytes() == b'info'
+    assert (dst / 'Dinos' / 'Rex.uasset').read_bytes() == b'rex' * 100
+    assert not (dst / 'Dinos' / 'Rex.uasset.uncompressed_size').exists()
+
+    # Nothing changed
+    assert unpackMod(tmp_path, '1234') == set()
+
+    # Change one asset and remove another
+    (src / 'Dinos' / 'Rex.uasset.z').write_bytes(_pack_mod_file(b'bigger rex' * 100))
+    (src / 'Dinos' / 'Dodo.uasset.z').unlink()
+    changed = unpackMod(tmp_path, '1234')
+    assert changed == {'/Game/Mods/1234/Dinos/Rex', '/Game/Mods/1234/Dinos/Dodo'}
+    assert (dst / 'Dinos' / 'Rex.uasset').read_bytes() == b'bigger rex' * 100
+    assert not (dst / 'Dinos' / 'Dodo.uasset').exists()
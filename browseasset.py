@@ -6,6 +6,7 @@ from typing import *
 
 from automate.ark import ArkSteamManager
 from ue.base import UEBase
+from ue.context import ue_parsing_context
 from ue.loader import AssetLoader
 
 root: Optional[Tk] = None
@@ -157,7 +158,9 @@ def insert_fields_for_node(parentId):
 def load_asset(assetname):
     assetname = loader.clean_asset_name(assetname)
     root.title("Asset Browser : " + assetname)
-    asset = loader[assetname]
+    # Parse all properties up-front so they appear in the tree
+    with ue_parsing_context(lazy_properties=False):
+        asset = loader[assetname]
     add_asset_to_root(asset)
 
 
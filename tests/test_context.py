@@ -79,3 +79,48 @@ def test_bulk_data(loader: AssetLoader):
     with ue_parsing_context(bulk_data=True):
         asset = loader[ASSETNAME]
         assert asset.has_bulk_data
+
+
+@pytest.mark.requires_game
+def test_tables_only(loader: AssetLoader):
+    loader.wipe_cache()
+    with ue_parsing_context(tables_only=True):
+        asset = loader[ASSETNAME]
+        assert asset.is_linked
+        assert asset.is_tables_only
+        assert not asset.has_properties
+        assert asset.default_export and asset.default_class
+        assert not asset.default_export.has_properties
+
+        # Check asset is re-parsed when more data is requested
+        with ue_parsing_context(tables_only=False):
+            asset = loader[ASSETNAME]
+            assert not asset.is_tables_only
+            assert asset.has_properties
+
+        # A fully parsed asset satisfies a tables-only request
+        assert loader[ASSETNAME] is asset
+
+
+@pytest.mark.requires_game
+def test_lazy_properties(loader: AssetLoader):
+    loader.wipe_cache()
+    with ue_parsing_context(lazy_properties=True):
+        asset = loader[ASSETNAME]
+        assert asset.has_properties
+        assert not asset.default_export.has_properties
+
+        # Properties are parsed on first access
+        assert asset.default_export.properties is not None
+        assert asset.default_export.has_properties
+
+        # Check asset is re-parsed when all properties are requested up-front
+        with ue_parsing_context(lazy_properties=False):
+            asset = loader[ASSETNAME]
+            assert not asset.has_lazy_properties
+            assert all(export.has_properties for export in asset.exports)
+
+    loader.wipe_cache()
+    with ue_parsing_context(lazy_properties=False):
+        asset = loader[ASSETNAME]
+        assert all(export.has_properties for export in asset.exports)
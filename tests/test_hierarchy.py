@@ -1,4 +1,5 @@
 import ue.hierarchy
+from ue.loader import AssetLoadException
 
 from .common import *
 
@@ -84,3 +85,64 @@ def test_inherits_from(loader: AssetLoader, dodos):  # pylint: disable=unused-ar
 
     # Ab Dodo *class* does not inherit from itself
     assert not ue.hierarchy.inherits_from(dodo_ab_asset.default_class, DODO_AB_CHR)
+
+
+def test_add_edges(internal_hierarchy):  # pylint: disable=unused-argument
+    tree = ue.hierarchy.tree
+
+    # Child listed before its parent, as can happen across shards
+    ue.hierarchy.add_edges([(DODO_AB_CHR, DODO_CHR), (DODO_CHR, DINO_CHR), (DINO_CHR, PRIMAL_DINO_CHR)], loader=None)
+
+    assert tree[DODO_AB_CHR].parent is tree[DODO_CHR]
+    assert tree[DODO_CHR].parent is tree[DINO_CHR]
+    assert tree[DINO_CHR].parent is tree[PRIMAL_DINO_CHR]
+
+
+def test_add_edges_missing_parent(internal_hierarchy):  # pylint: disable=unused-argument
+    class BrokenLoader:
+        def load_class(self, fullname: str):
+            raise AssetLoadException(fullname)
+
+    # A parent that fails to load is skipped with a warning
+    ue.hierarchy.add_edges([(DODO_CHR, DINO_CHR)], loader=BrokenLoader())
+    assert DODO_CHR not in ue.hierarchy.tree
+
+    # An edge without a parent is reported as such
+    with pytest.raises(ue.hierarchy.MissingParent):
+        ue.hierarchy.add_edges([(DODO_CHR, None)], loader=BrokenLoader())
+
+
+def test_add_edges_parent_not_ingested(internal_hierarchy, monkeypatch):  # pylint: disable=unused-argument
+    class NullLoader:
+        def load_class(self, fullname: str):
+            return None
+
+    # The parent loads but doesn't make it into the tree, e.g. as it was filtered out
+    monkeypatch.setattr(ue.hierarchy, '_ingest_export', lambda export, loader: None)
+    with pytest.raises(ue.hierarchy.MissingParent):
+        ue.hierarchy.add_edges([(DODO_CHR, DINO_CHR)], loader=NullLoader())
+
+
+@pytest.mark.requires_game
+def test_exploring_assets_in_pool(loader: AssetLoader, internal_hierarchy):  # pylint: disable=unused-argument
+    ue.hierarchy.explore_path('/Game/PrimalEarth/Dinos/Dodo', loader, set())
+    expected = list(ue.hierarchy.tree.keys())
+
+    ue.hierarchy.tree.clear()
+    ue.hierarchy.load_internal_hierarchy('config/hierarchy.yaml')
+    with ue.hierarchy.discovery_pool(loader, 2) as pool:
+        ue.hierarchy.explore_path('/Game/PrimalEarth/Dinos/Dodo', loader, set(), pool=pool)
+
+    assert list(ue.hierarchy.tree.keys()) == expected
+
+
+def test_classify(internal_hierarchy):  # pylint: disable=unused-argument
+    # The first matching candidate is returned
+    candidates = (PRIMAL_CHR, '/Script/Engine.Pawn', '/Script/Engine.Actor')
+    assert ue.hierarchy.classify(PRIMAL_DINO_CHR, candidates) == PRIMAL_CHR
+    assert ue.hierarchy.classify('/Script/Engine.Character', candidates) == '/Script/Engine.Pawn'
+    assert ue.hierarchy.classify('/Script/Engine.Actor', candidates) is None
+    assert ue.hierarchy.classify(PRIMAL_CHR, ('/Game/NotInTree.NotInTree_C', )) is None
+
+    assert ue.hierarchy.inherits_from(PRIMAL_DINO_CHR, '/Script/Engine.Actor')
+    assert not ue.hierarchy.inherits_from(PRIMAL_CHR, PRIMAL_CHR)
@@ -0,0 +1,94 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import ark.tree
+from ue.asset import ImportTableItem
+from ue.dependencies import DependencyStore
+from ue.hierarchy import _get_parent_cls
+from ue.loader import AssetLoader, ModResolver
+from ue.tree import get_parent_fullname
+
+from .common import *
+
+# Each asset's parent package, forming the chain Child -> Parent -> Base
+PARENTS = {
+    '/Game/Child': '/Game/Parent',
+    '/Game/Parent': '/Game/Base',
+    '/Game/Base': '/Script/Engine.Actor',
+}
+
+
+class DummyResolver(ModResolver):
+    def get_name_from_id(self, modid: str) -> str:
+        raise NotImplementedError
+
+    def get_id_from_name(self, name: str) -> str:
+        raise NotImplementedError
+
+
+def _write_asset(base: Path, name: str, content: bytes):
+    (base / 'Content').mkdir(parents=True, exist_ok=True)
+    (base / 'Content' / f'{name}.uasset').write_bytes(content)
+    (base / 'Content' / f'{name}.uexp').write_bytes(b'exports')
+
+
+def test_inherits_from_cache_records_dependencies(tmp_path: Path, mocker):
+    for name in ('Child', 'Parent', 'Base'):
+        _write_asset(tmp_path, name, name.encode())
+
+    # Stand in for real assets, which only need their names for the inheritance walk
+    loader = AssetLoader(DummyResolver(), assetpath=tmp_path)
+    mocker.patch.object(loader, '_load_asset', lambda assetname: SimpleNamespace(loader=loader, assetname=assetname))
+    mocker.patch.object(ark.tree, 'findParentPackages', lambda asset: [PARENTS[asset.assetname]])
+    child = loader['/Game/Child']
+
+    with loader.record_dependencies() as first:
+        assert ark.tree.inherits_from(child, '/Game/Base')
+
+    # A second check is answered from the cache, but still records the assets behind the answer
+    loader._load_asset = None  # pylint: disable=protected-access
+    with loader.record_dependencies() as second:
+        assert ark.tree.inherits_from(child, '/Game/Base')
+
+    assert first == {'/Game/Child', '/Game/Parent'}
+    assert second == first
+
+    # An output recorded from cached answers is outdated when an ancestor changes
+    store = DependencyStore(tmp_path / 'deps.sqlite')
+    store.record('output', 'inputs', tmp_path / 'Content' / 'Child.uasset', second, loader)
+    store.close()
+    _write_asset(tmp_path, 'Parent', b'changed')
+    store = DependencyStore(tmp_path / 'deps.sqlite')
+    assert not store.is_current('output', 'inputs', loader)
+    store.close()
+
+
+def _make_class_ref(fullname: str) -> ImportTableItem:
+    (package, name) = fullname.split('.')
+    ref = ImportTableItem.__new__(ImportTableItem)
+    ref.namespace = SimpleNamespace(value=SimpleNamespace(name=package))
+    ref.name = name
+    return ref
+
+
+def _make_map_export(loader: AssetLoader, index: int, klass: str) -> ExportTableItem:
+    # Exports in maps often share a name, so these only differ by index and class
+    export = ExportTableItem.__new__(ExportTableItem)
+    export.asset = SimpleNamespace(loader=loader, assetname='/Game/Map')
+    export.table_index = index
+    export.fullname = '/Game/Map.Actor'
+    export.klass = SimpleNamespace(value=_make_class_ref(klass))
+    export.super = None
+    return export
+
+
+def test_parent_caches_distinguish_same_named_exports(tmp_path: Path):
+    loader = AssetLoader(DummyResolver(), assetpath=tmp_path)
+    first = _make_map_export(loader, 0, '/Script/Engine.Actor')
+    second = _make_map_export(loader, 1, '/Script/Engine.Light')
+
+    for _ in range(2):
+        assert get_parent_fullname(first) == '/Script/Engine.Actor'
+        assert get_parent_fullname(second) == '/Script/Engine.Light'
+        assert _get_parent_cls(first) == '/Script/Engine.Actor'
+        assert _get_parent_cls(second) == '/Script/Engine.Light'
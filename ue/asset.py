@@ -1,10 +1,11 @@
+import sys
 import weakref
 from collections import namedtuple
 from logging import NullHandler, getLogger
 from typing import *
 
 from .base import UEBase
-from .context import INCLUDE_METADATA, get_ctx
+from .context import INCLUDE_METADATA, ParsingContext, get_ctx, snapshot_ctx, ue_parsing_context
 from .coretypes import *
 from .properties import Box, CustomVersion, EngineVersion, Guid, PropertyTable, StringProperty
 from .stream import MemoryStream
@@ -30,6 +31,8 @@ __all__ = [
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+UNRESOLVED = object()
+
 
 class UAsset(UEBase):
     display_fields = ('tag', 'legacy_ver', 'ue_ver', 'file_ver', 'licensee_ver', 'custom_versions', 'header_size',
@@ -46,21 +49,30 @@ class UAsset(UEBase):
         self.assetname: Optional[str] = None
         self.name: Optional[str] = None
         self.file_ext: Optional[str] = None
-        self.default_export: Optional['ExportTableItem'] = None
-        self.default_class: Optional['ExportTableItem'] = None
+        self.raw_size = 0
+        self.raw_export_size = 0
+        self._default_export: Any = UNRESOLVED
+        self._default_class: Any = UNRESOLVED
+        self.is_tables_only = False
         self.has_properties = False
+        self.has_lazy_properties = False
         self.has_bulk_data = False
+        self.load_ctx: Optional[ParsingContext] = None
+        self.name_strings: Tuple[str, ...] = ()
+        self.name_lookup: Dict[str, int] = dict()
+        self._instanced_names: Dict[Tuple[int, int], str] = dict()
         super().__init__(self, asset_stream)
 
     def _deserialise(self):  # pylint: disable=arguments-differ
         ctx = get_ctx()
 
         # Header top
-        self._newField('tag', self.stream.readUInt32())
-        self._newField('legacy_ver', self.stream.readInt32())
-        self._newField('ue_ver', self.stream.readInt32())
-        self._newField('file_ver', self.stream.readUInt32())
-        self._newField('licensee_ver', self.stream.readUInt32())
+        tag, legacy_ver, ue_ver, file_ver, licensee_ver = self.stream.readStruct('IiiII')
+        self._newField('tag', tag)
+        self._newField('legacy_ver', legacy_ver)
+        self._newField('ue_ver', ue_ver)
+        self._newField('file_ver', file_ver)
+        self._newField('licensee_ver', licensee_ver)
         # Mobile assets are not versioned after being cooked.
         # HACK: Checking whether the version is zero is the easiest,
         # but preferably we should make this into an override or
@@ -100,9 +112,10 @@ class UAsset(UEBase):
         if self.legacy_ver > -7:
             # Legacy field that is not used anymore
             self._newField('texture_allocations', self.stream.readInt32())
-        self._newField('asset_registry_data_offset', self.stream.readUInt32())
-        self._newField('bulk_data_start_offset', self.stream.readUInt64())
-        self._newField('world_tile_info_data_offset', self.stream.readUInt64())
+        registry_offset, bulk_data_offset, tile_info_offset = self.stream.readStruct('IQQ')
+        self._newField('asset_registry_data_offset', registry_offset)
+        self._newField('bulk_data_start_offset', bulk_data_offset)
+        self._newField('world_tile_info_data_offset', tile_info_offset)
 
         # Read the various chunk table contents
         # These tables are not included in the field list so they're not included in pretty printing
@@ -111,7 +124,9 @@ class UAsset(UEBase):
         self._newField('imports', self._parseTable(self.imports_chunk, ImportTableItem))
         self._newField('exports', self._parseTable(self.exports_chunk, ExportTableItem))
 
-        if ctx.bulk_data and self.bulk_data_start_offset:
+        if ctx.tables_only:
+            self.is_tables_only = True
+        elif ctx.bulk_data and self.bulk_data_start_offset:
             bulk_stream = MemoryStream(self.stream, self.bulk_data_start_offset)
             bulk_length = self.world_tile_info_data_offset - self.bulk_data_start_offset
             self._newField('bulk_length', bulk_length)
@@ -125,33 +140,103 @@ class UAsset(UEBase):
         '''Override linking phase to support hidden table fields.'''
         super()._link()
         self.names.link()
+        self._indexNames()
         self._findNoneName()
         self.imports.link()
         self.exports.link()
 
         ctx = get_ctx()
 
+        # Remembered so properties parsed later are parsed the same way as if they were parsed now
+        self.load_ctx = snapshot_ctx()
+
+        if self.is_tables_only:
+            return
+
         if ctx.bulk_data:
             bulk_chunk = namedtuple('FakeChunkPtr', ['offset', 'count'])(self.bulk_data_start_offset, self.bulk_length)
             self._newField('bulk', self._parseTable(bulk_chunk, PropertyTable))
             self.has_bulk_data = True
 
         if ctx.properties:
-            for export in self.exports:
-                export.deserialise_properties()
+            if ctx.lazy_properties:
+                # Exports parse their properties on first access, so keep the export data alive until then
+                self.export_stream = MemoryStream(self.export_stream)
+                self.has_lazy_properties = True
+            else:
+                for export in self.exports:
+                    export.deserialise_properties()
             self.has_properties = True
 
     def is_context_satisfied(self, ctx):
         # Check that each of the context parameters is satisfied
         if not self.is_linked and ctx.link:
             return False
+        if ctx.tables_only:
+            return True
+        if self.is_tables_only:
+            return False
         if not self.has_properties and ctx.properties:
             return False
+        if self.has_lazy_properties and ctx.properties and not ctx.lazy_properties:
+            return False
         if not self.has_bulk_data and ctx.bulk_data:
             return False
 
         return True
 
+    @property
+    def default_export(self) -> Optional['ExportTableItem']:
+        '''The asset's main export, found on first access once the asset is linked.'''
+        if self._default_export is UNRESOLVED:
+            if not self.is_linked:
+                return None
+            self._resolve_defaults()
+        return self._default_export
+
+    @default_export.setter
+    def default_export(self, value: Optional['ExportTableItem']):
+        self._default_export = value
+
+    @property
+    def default_class(self) -> Optional['ExportTableItem']:
+        '''The class of the asset's main export, if it is a blueprint.'''
+        if self._default_class is UNRESOLVED:
+            if not self.is_linked:
+                return None
+            self._resolve_defaults()
+        return self._default_class
+
+    @default_class.setter
+    def default_class(self, value: Optional['ExportTableItem']):
+        self._default_class = value
+
+    def _resolve_defaults(self):
+        default_export = None
+        default_class = None
+
+        # Look for a BP-style Default__<assetname> export
+        exports = [export for export in self.exports.values if str(export.name).startswith('Default__')]
+        if len(exports) > 1:
+            logger.warning(f'Found more than one Default__ entry in {self.assetname}!')
+        default_export = exports[0] if exports else None
+        if default_export:
+            default_class = default_export.klass.value
+
+        if not default_export and self.name:
+            # Fall back to an export named the same as the asset
+            leafname = self.name.lower()
+            exports = [export for export in self.exports.values if str(export.name).lower() == leafname]
+            if len(exports) > 1:
+                logger.warning(f'Found more than <assetname> export in {self.assetname}!')
+            else:
+                default_export = exports[0] if exports else None
+
+        if self._default_export is UNRESOLVED:
+            self._default_export = default_export
+        if self._default_class is UNRESOLVED:
+            self._default_class = default_class
+
     def getName(self, index):
         '''Get a name for the given index.'''
         names = self.names
@@ -174,6 +259,19 @@ class UAsset(UEBase):
         # TODO: Do something with extraIndex?
         return name
 
+    def getInstancedName(self, index: int, instance: int) -> str:
+        '''Get the string for a name with an instance number, shared between all uses of the same name and instance.'''
+        key = (index, instance)
+        value = self._instanced_names.get(key, None)
+        if value is None:
+            value = sys.intern(f'{self.getName(index)}_{instance}')
+            self._instanced_names[key] = value
+        return value
+
+    def findName(self, name: str) -> Optional[int]:
+        '''Get the index of the given string in the name table, or None if it is not present.'''
+        return self.name_lookup.get(name, None)
+
     def getObject(self, index):
         '''Get an object for the given index (either an import or an export).'''
         assert index is not None
@@ -191,14 +289,19 @@ class UAsset(UEBase):
         table = Table(self, stream).deserialise(itemType, chunk.count)
         return table
 
+    def _indexNames(self):
+        self.name_strings = tuple(name.value for name in self.names)
+        lookup: Dict[str, int] = dict()
+        for i, name in enumerate(self.name_strings):
+            lookup.setdefault(name, i)
+        self.name_lookup = lookup
+
     def _findNoneName(self):
-        target = self.package_group.value
-        for i, name in enumerate(self.names):
-            if name.value == target:
-                self.none_index = i
-                return
+        index = self.name_lookup.get(self.package_group.value, None)
+        if index is None:
+            raise RuntimeError("Could not find None string entry")
 
-        raise RuntimeError("Could not find None string entry")
+        self.none_index = index
 
     # def __eq__(self, other):
     #     return super().__eq__(other)
@@ -216,6 +319,8 @@ class UAsset(UEBase):
 class NameTableItem(StringProperty):
     def _deserialise(self, *args):
         StringProperty._deserialise(self, *args)
+        # Names are compared often, so share a single copy of each string
+        self.field_values['value'] = sys.intern(self.value)
         if self.asset.is_mobile_asset:
             self._newField('non_case_preserving_hash', self.stream.readUInt16())
             self._newField('case_preserving_hash', self.stream.readUInt16())
@@ -287,28 +392,29 @@ class ExportTableItem(UEBase):
             self._newField('template', ObjectIndex(self))
         self._newField('namespace', ObjectIndex(self))  # item namespace
         self._newField('name', NameIndex(self))  # item name
-        self._newField('object_flags', self.stream.readUInt32())
-        if self.asset.is_mobile_asset:  # 64-bit, ue_ver >= 511
-            self._newField('serial_size', self.stream.readUInt64())
-            self._newField('serial_offset', self.stream.readUInt64())
-        else:
-            self._newField('serial_size', self.stream.readUInt32())
-            self._newField('serial_offset', self.stream.readUInt32())
-        self._newField('force_export', self.stream.readBool32())
-        self._newField('not_for_client', self.stream.readBool32())
-        self._newField('not_for_server', self.stream.readBool32())
+
+        # Fixed-size block, read in one go (serial size/offset are 64-bit for ue_ver >= 511)
+        flags, size, offset, force, not_client, not_server = self.stream.readStruct(
+            'IQQIII' if self.asset.is_mobile_asset else 'IIIIII')
+        self._newField('object_flags', flags)
+        self._newField('serial_size', size)
+        self._newField('serial_offset', offset)
+        self._newField('force_export', bool(force))
+        self._newField('not_for_client', bool(not_client))
+        self._newField('not_for_server', bool(not_server))
         self._newField('guid', Guid(self))
-        self._newField('package_flags', self.stream.readUInt32())
-        self._newField('not_for_editor_game', self.stream.readBool32())
+        package_flags, not_for_editor_game = self.stream.readStruct('II')
+        self._newField('package_flags', package_flags)
+        self._newField('not_for_editor_game', bool(not_for_editor_game))
         if self.asset.is_mobile_asset:
-            # ue_ver >= 485
-            self._newField('is_asset', self.stream.readBool32())
-            # ue_ver >= 507
-            self._newField('first_export_dependency', self.stream.readUInt32())
-            self._newField('serial_before_serial_deps', self.stream.readUInt32())
-            self._newField('create_before_serial_deps', self.stream.readUInt32())
-            self._newField('serial_before_create_deps', self.stream.readUInt32())
-            self._newField('create_before_create_deps', self.stream.readUInt32())
+            # ue_ver >= 485 (is_asset), ue_ver >= 507 (dependencies)
+            is_asset, first_dep, ss_deps, cs_deps, sc_deps, cc_deps = self.stream.readStruct('IIIIII')
+            self._newField('is_asset', bool(is_asset))
+            self._newField('first_export_dependency', first_dep)
+            self._newField('serial_before_serial_deps', ss_deps)
+            self._newField('create_before_serial_deps', cs_deps)
+            self._newField('serial_before_create_deps', sc_deps)
+            self._newField('create_before_create_deps', cc_deps)
 
         if INCLUDE_METADATA:
             # References to this item
@@ -323,8 +429,13 @@ class ExportTableItem(UEBase):
         if INCLUDE_METADATA:
             self.users.add(user)
 
+    @property
+    def has_properties(self) -> bool:
+        '''True if this export's properties have been parsed.'''
+        return 'properties' in self.field_values
+
     def deserialise_properties(self):
-        if 'properties' in self.field_values:
+        if self.has_properties:
             raise RuntimeError('Attempt to deserialise properties more than once')
 
         # We deferred deserialising the properties until all imports/exports were defined
@@ -332,8 +443,19 @@ class ExportTableItem(UEBase):
         if self.asset.is_mobile_asset:
             offset -= self.asset.header_size
         stream = MemoryStream(self.asset.export_stream, offset, self.serial_size)
-        self._newField('properties', PropertyTable(self, weakref.proxy(stream)))
-        self.properties.link()
+        load_ctx = self.asset.load_ctx
+        property_filter = load_ctx.property_filter if load_ctx else get_ctx().property_filter
+        self._newField('properties', PropertyTable(self, weakref.proxy(stream)), property_filter)
+        with ue_parsing_context(link=True):
+            self.properties.link()
+
+    def __getattr__(self, name: str):
+        # Properties of assets loaded with lazy_properties are only parsed when first requested
+        if name == 'properties' and not self.has_properties and self.asset.has_properties:
+            self.deserialise_properties()
+            return self.field_values['properties']
+
+        return super().__getattr__(name)
 
     def __str__(self):
         parent = get_clean_name(self.super)
@@ -368,10 +490,11 @@ class WorldTileInfo(UEBase):
         self._newField('unknown_field1', self.stream.readUInt64())
         self._newField('bounds', Box(self))
         self._newField('layer_name', StringProperty(self))
-        self._newField('unknown_field2', self.stream.readUInt32())
-        self._newField('unknown_field3', self.stream.readUInt32())
-        self._newField('unknown_field4', self.stream.readUInt32())
-        self._newField('streaming_distance', self.stream.readInt32())
+        unknown2, unknown3, unknown4, streaming_distance = self.stream.readStruct('IIIi')
+        self._newField('unknown_field2', unknown2)
+        self._newField('unknown_field3', unknown3)
+        self._newField('unknown_field4', unknown4)
+        self._newField('streaming_distance', streaming_distance)
         self._newField('distance_streaming_enabled', self.stream.readBool8())
 
     def __str__(self):
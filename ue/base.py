@@ -12,28 +12,48 @@ if INCLUDE_METADATA:
 else:
     support_pretty = False
 
+NOT_SET = object()
+
+
+# Bits of UEBase._state
+SERIALISING = 1 << 0
+SERIALISED = 1 << 1
+LINKING = 1 << 2
+LINKED = 1 << 3
+INSIDE_ARRAY = 1 << 4
+
 
 class UEBase(object):
+    '''
+    Base of all parsed UE nodes.
+
+    Subclasses normally store their fields in a `field_values` dict. Hot leaf types can instead declare
+    their fields in `__slots__`, making them compact: they have no instance `__dict__`, fields are stored in
+    slots and `field_values`/`field_order` are generated on demand. Subclasses of a compact type must declare
+    `__slots__` too (even if empty) to stay compact.
+    '''
+    __slots__ = ('stream', 'asset', 'parent', 'start_offset', 'end_offset', '_state')
+
     main_field: Optional[str] = None
     string_format: Optional[str] = None
     display_fields: Optional[Sequence[str]] = None
     skip_level_field: Optional[str] = None
 
+    _is_compact = False
+    _compact_fields: Tuple[str, ...] = ()
+
     def __init__(self, owner: "UEBase", stream=None):
         assert owner is not None, "Owner must be specified"
         self.stream: MemoryStream = stream or owner.stream
         self.asset = owner.asset  # type: ignore
-        self.field_values: Dict[str, Any] = {}
         self.start_offset: Optional[int] = None
-        self.is_serialising = False
-        self.is_serialised = False
-        self.is_linking = False
-        self.is_linked = False
-        self.is_inside_array = False
+        self.end_offset: Optional[int] = None
+        self._state = 0
         self.parent: Optional["UEBase"] = owner if owner is not owner.asset else None
-        if INCLUDE_METADATA:
-            self.field_order: List[str] = []
-            self.end_offset: Optional[int] = None
+        if not self._is_compact:
+            self.field_values: Dict[str, Any] = {}
+            if INCLUDE_METADATA:
+                self.field_order: List[str] = []
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -42,35 +62,71 @@ class UEBase(object):
         if 'deserialise' in vars(cls):
             raise TypeError('Cannot override "deserialise"')
 
+        if '__slots__' not in vars(cls) and cls._compact_fields:
+            raise TypeError(f'"{cls.__name__}" must declare __slots__ as it derives from a compact type')
+
+        cls._is_compact = not cls.__dictoffset__
+        if cls._is_compact:
+            fields: List[str] = []
+            for klass in reversed(cls.__mro__[:cls.__mro__.index(UEBase)]):
+                fields.extend(name for name in vars(klass).get('__slots__', ()) if name != '__weakref__')
+            cls._compact_fields = tuple(fields)
+
+    @property
+    def is_serialising(self) -> bool:
+        return bool(self._state & SERIALISING)
+
+    @property
+    def is_serialised(self) -> bool:
+        return bool(self._state & SERIALISED)
+
+    @property
+    def is_linking(self) -> bool:
+        return bool(self._state & LINKING)
+
+    @property
+    def is_linked(self) -> bool:
+        return bool(self._state & LINKED)
+
+    @property
+    def is_inside_array(self) -> bool:
+        return bool(self._state & INSIDE_ARRAY)
+
+    @is_inside_array.setter
+    def is_inside_array(self, value: bool):
+        if value:
+            self._state |= INSIDE_ARRAY
+        else:
+            self._state &= ~INSIDE_ARRAY
+
     def deserialise(self, *args, **kwargs):
-        if self.is_serialising:
+        state = self._state
+        if state & SERIALISING:
             return
 
-        if self.is_serialised:
+        if state & SERIALISED:
             # return
             raise RuntimeError(f'Deserialise called twice for "{self.__class__.__name__}"')
 
         self.start_offset = self.stream.offset
-        self.is_serialising = True
+        self._state = state | SERIALISING
         self._deserialise(*args, **kwargs)
         if INCLUDE_METADATA:
             self.end_offset = self.stream.offset - 1
-        self.is_serialising = False
-        self.is_serialised = True
+        self._state = (self._state & ~SERIALISING) | SERIALISED
 
         return self
 
     def link(self):
-        if self.is_linked or self.is_linking:
+        if self._state & (LINKED | LINKING):
             return
 
         if not get_ctx().link:
             return
 
-        self.is_linking = True
+        self._state |= LINKING
         self._link()
-        self.is_linking = False
-        self.is_linked = True
+        self._state = (self._state & ~LINKING) | LINKED
 
         return self
 
@@ -95,13 +151,18 @@ class UEBase(object):
 
     def _newField(self, name: str, value, *extraArgs):
         '''Internal method used by subclasses to define new fields.'''
-        if name in self.field_values:
-            raise NameError(f'Field "{name}" is already defined')
+        if self._is_compact:
+            if getattr(self, name, NOT_SET) is not NOT_SET:
+                raise NameError(f'Field "{name}" is already defined')
+            setattr(self, name, value)
+        else:
+            if name in self.field_values:
+                raise NameError(f'Field "{name}" is already defined')
 
-        self.field_values[name] = value
+            self.field_values[name] = value
 
-        if INCLUDE_METADATA:
-            self.field_order.append(name)
+            if INCLUDE_METADATA:
+                self.field_order.append(name)
 
         if isinstance(value, UEBase) and not value.is_serialised:
             value.deserialise(*extraArgs)
@@ -117,10 +178,25 @@ class UEBase(object):
 
     def __getattr__(self, name: str):
         '''Override property accessor to allow reading of defined fields.'''
-        try:
-            return self.field_values[name]
-        except KeyError:
-            raise AttributeError(f'No field named "{name}"')
+        if self._is_compact:
+            # Compact types hold their fields in slots, so only the field views need generating here
+            if name == 'field_values':
+                return {field: value for field, value in self._iter_compact_fields()}
+            if name == 'field_order' and INCLUDE_METADATA:
+                return [field for field, _ in self._iter_compact_fields()]
+        elif name not in ('field_values', 'field_order'):
+            try:
+                return self.field_values[name]
+            except KeyError:
+                pass
+
+        raise AttributeError(f'No field named "{name}"')
+
+    def _iter_compact_fields(self) -> Iterator[Tuple[str, Any]]:
+        for name in self._compact_fields:
+            value = getattr(self, name, NOT_SET)
+            if value is not NOT_SET:
+                yield (name, value)
 
     def __str__(self):
         '''Override string conversion to show defined fields.'''
@@ -128,7 +204,7 @@ class UEBase(object):
             return self.string_format.format(**self.field_values)
 
         if self.main_field:
-            return str(self.field_values.get(self.main_field, f'<uninitialised {self.__class__.__name__}>'))
+            return str(getattr(self, self.main_field, f'<uninitialised {self.__class__.__name__}>'))
 
         fields = self.display_fields or list(self.field_values.keys())
         fields_txt = ', '.join(str(self.field_values[name]) for name in fields)
@@ -16,7 +16,7 @@ from contextlib import ContextDecorator
 from dataclasses import dataclass
 from enum import IntEnum, auto
 from logging import NullHandler, getLogger
-from typing import NamedTuple, Optional, cast
+from typing import FrozenSet, Iterable, NamedTuple, Optional, cast
 
 from utils.xlocal import xlocal
 
@@ -24,6 +24,7 @@ __all__ = [
     'ParsingContext',
     'ue_parsing_context',
     'get_ctx',
+    'snapshot_ctx',
 ]
 
 logger = getLogger(__name__)
@@ -43,6 +44,9 @@ class ParsingContext:
     link: bool
     properties: bool
     bulk_data: bool
+    tables_only: bool
+    lazy_properties: bool
+    property_filter: FrozenSet[str]
     context_level: int
 
 
@@ -51,6 +55,9 @@ DEFAULT_CONTEXT = ParsingContext(
     link=True,
     properties=True,
     bulk_data=False,
+    tables_only=False,
+    lazy_properties=True,
+    property_filter=frozenset(),
     context_level=1,
 )
 
@@ -61,16 +68,33 @@ def get_ctx() -> ParsingContext:
     return cast(ParsingContext, __current_ctx)
 
 
+def snapshot_ctx() -> ParsingContext:
+    '''Get a copy of the current context that is unaffected by later changes.'''
+    return ParsingContext(**dict((name, getattr(__current_ctx, name)) for name in vars(DEFAULT_CONTEXT)))
+
+
 def ue_parsing_context(
         *,
         #    metadata: Optional[bool] = None,
         link: Optional[bool] = None,
         properties: Optional[bool] = None,
-        bulk_data: Optional[bool] = None):
+        bulk_data: Optional[bool] = None,
+        tables_only: Optional[bool] = None,
+        lazy_properties: Optional[bool] = None,
+        property_filter: Optional[Iterable[str]] = None):
     '''
     Change the current UE parsing context.
     This is a context manager for use in a `with` statement.
 
+    `tables_only` stops parsing after the name, import and export tables, skipping
+    the .uexp file and all properties. This is sufficient for inheritance checks.
+
+    `lazy_properties` defers parsing an export's properties until they are first accessed.
+    Disable it to parse the properties of every export while the asset is loaded.
+
+    `property_filter` limits which of an export's properties are parsed to those with the given names.
+    Others are only parsed if they are accessed later. Pass an empty collection to remove the filter.
+
     Usage:
         with ue_parsing_context(metadata=False, properties=False):
             asset = loader[assetname]
@@ -81,6 +105,9 @@ def ue_parsing_context(
     if link is not None: fields['link'] = link
     if properties is not None: fields['properties'] = properties
     if bulk_data is not None: fields['bulk_data'] = bulk_data
+    if tables_only is not None: fields['tables_only'] = tables_only
+    if lazy_properties is not None: fields['lazy_properties'] = lazy_properties
+    if property_filter is not None: fields['property_filter'] = frozenset(property_filter)
 
     ctx = __current_ctx(**fields)
     return ctx
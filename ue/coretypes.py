@@ -83,8 +83,9 @@ class ChunkPtr(UEBase):
     offset: int
 
     def _deserialise(self):
-        self._newField('count', self.stream.readUInt32())
-        self._newField('offset', self.stream.readUInt32())
+        count, offset = self.stream.readStruct('II')
+        self._newField('count', count)
+        self._newField('offset', offset)
 
 
 class GenerationInfo(UEBase):
@@ -92,8 +93,9 @@ class GenerationInfo(UEBase):
     name_count: int
 
     def _deserialise(self):
-        self._newField('export_count', self.stream.readUInt32())
-        self._newField('name_count', self.stream.readUInt32())
+        export_count, name_count = self.stream.readStruct('II')
+        self._newField('export_count', export_count)
+        self._newField('name_count', name_count)
 
 
 class CompressedChunk(UEBase):
@@ -103,13 +105,15 @@ class CompressedChunk(UEBase):
     compressed_size: int
 
     def _deserialise(self):
-        self._newField('uncompressed_offset', self.stream.readUInt32())
-        self._newField('uncompressed_size', self.stream.readUInt32())
-        self._newField('compressed_offset', self.stream.readUInt32())
-        self._newField('compressed_size', self.stream.readUInt32())
+        uncompressed_offset, uncompressed_size, compressed_offset, compressed_size = self.stream.readStruct('IIII')
+        self._newField('uncompressed_offset', uncompressed_offset)
+        self._newField('uncompressed_size', uncompressed_size)
+        self._newField('compressed_offset', compressed_offset)
+        self._newField('compressed_size', compressed_size)
 
 
 class NameIndex(UEBase):
+    __slots__ = ('index', 'instance', 'value')
     main_field = 'value'
 
     index: int
@@ -122,11 +126,12 @@ class NameIndex(UEBase):
         self._newField('instance', self.stream.readUInt32())
 
     def _link(self):
-        self._newField('value', self.asset.getName(self.index))
+        value = self.asset.getName(self.index)
         if INCLUDE_METADATA:
-            self.value.register_user(self.parent or self)
+            value.register_user(self.parent or self)
         if self.instance:
-            self.field_values['value'] = f'{self.value}_{self.instance}'
+            value = self.asset.getInstancedName(self.index, self.instance)
+        self._newField('value', value)
 
     if support_pretty:
 
@@ -136,41 +141,47 @@ class NameIndex(UEBase):
                 p.text(f'{cls}(<cyclic>)')
                 return
 
-            if 'value' in self.field_values:
+            if hasattr(self, 'value'):
                 p.pretty(self.value)
             else:
                 p.text(f'{cls}(index={self.index})')
 
 
 class ObjectIndex(UEBase):
+    __slots__ = ('index', 'used_index', 'value')
     main_field = 'value'
     display_fields = ['index', 'value']
     skip_level_field = 'value'
 
     index: int
     used_index: int
-    kind: str
+
+    @property
+    def kind(self) -> str:
+        if self.index < 0:
+            return 'import'
+        if self.index > 0:
+            return 'export'
+        return 'none'
 
     def _deserialise(self):
         # Calculate the indexes but don't look up the actual import/export until the link phase
-        self._newField('index', self.stream.readInt32())  # object indexes are 32-bit and signed
-        if self.index < 0:
-            self.used_index = -self.index - 1
-            self.kind = 'import'
-        elif self.index > 0:
-            self.used_index = self.index - 1
-            self.kind = 'export'
+        index = self.stream.readInt32()  # object indexes are 32-bit and signed
+        self._newField('index', index)
+        if index < 0:
+            used_index = -index - 1
+        elif index > 0:
+            used_index = index - 1
         else:
-            self.used_index = 0
-            self.kind = 'none'
+            used_index = 0
 
-        self._newField('used_index', self.used_index)
+        self._newField('used_index', used_index)
 
     def _link(self):
         # Look up the import/export in the asset tables now they're completed
-        if self.kind == 'import':
+        if self.index < 0:
             source = self.asset.imports
-        elif self.kind == 'export':
+        elif self.index > 0:
             source = self.asset.exports
         else:
             source = None
@@ -0,0 +1,112 @@
+'''
+A persistent record of the assets each export output was produced from.
+
+Outputs are recorded with the content digest of every asset that was requested from the loader while
+producing them. On later runs an output only needs regenerating if one of those assets has changed.
+'''
+
+import json
+import sqlite3
+from logging import NullHandler, getLogger
+from pathlib import Path
+from typing import *
+
+from .loader import AssetLoader, AssetLoadException
+from .utils import fingerprint_files, hash_files
+
+__all__ = [
+    'DependencyStore',
+]
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Bump when exporters change in ways that should invalidate all recorded outputs
+DEPENDENCY_FORMAT_VERSION = 1
+
+# Digest used for assets that could not be found
+MISSING_DIGEST = ''
+
+
+class DependencyStore:
+    '''
+    An SQLite-backed store of the asset dependencies of export outputs.
+
+    Each output is keyed by a caller-chosen name and also records an `inputs` string, which should describe
+    anything other than assets that affects the output (e.g. the list of species discovered, relevant config).
+    Asset digests are cached by the size and modification time of their files, so unchanged assets are not
+    re-hashed. Assets that were requested but missing are recorded too, so their later appearance is noticed.
+    '''
+    def __init__(self, filename: Union[str, Path]):
+        self.filename = Path(filename)
+        self.hits = 0
+        self.misses = 0
+        self._digests: Dict[str, str] = dict()
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.filename))
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS outputs (key TEXT PRIMARY KEY, inputs TEXT, filename TEXT, assets TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS digests (assetname TEXT PRIMARY KEY, fingerprint TEXT, digest TEXT)')
+        self.db.commit()
+
+        row = self.db.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        if not row or row[0] != str(DEPENDENCY_FORMAT_VERSION):
+            with self.db:
+                self.db.execute('DELETE FROM outputs')
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                                (str(DEPENDENCY_FORMAT_VERSION), ))
+
+    def close(self):
+        self.db.close()
+
+    def is_current(self, key: str, inputs: str, loader: AssetLoader) -> bool:
+        '''Check if the output recorded under `key` still exists and was made from the same inputs and assets.'''
+        row = self.db.execute('SELECT inputs, filename, assets FROM outputs WHERE key=?', (key, )).fetchone()
+        if not row or row[0] != inputs or not Path(row[1]).is_file():
+            self.misses += 1
+            return False
+
+        assets: Dict[str, str] = json.loads(row[2])
+        for assetname, digest in assets.items():
+            if self._current_digest(assetname, loader) != digest:
+                logger.debug('Output %s is outdated as %s changed', key, assetname)
+                self.misses += 1
+                return False
+
+        self.hits += 1
+        return True
+
+    def record(self, key: str, inputs: str, filename: Union[str, Path], assetnames: Iterable[str], loader: AssetLoader):
+        '''Record that the output `filename` was produced from the given inputs and assets.'''
+        assets = dict((assetname, self._current_digest(assetname, loader)) for assetname in sorted(set(assetnames)))
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO outputs (key, inputs, filename, assets) VALUES (?, ?, ?, ?)',
+                            (key, inputs, str(filename), json.dumps(assets)))
+
+    def _current_digest(self, assetname: str, loader: AssetLoader) -> str:
+        # Assets aren't expected to change during a run, so each is only checked once
+        digest = self._digests.get(assetname, None)
+        if digest is not None:
+            return digest
+
+        try:
+            filenames: Sequence[str] = loader.find_asset_files(assetname)[:2]
+        except AssetLoadException:
+            filenames = ()
+
+        if not filenames:
+            digest = MISSING_DIGEST
+        else:
+            fingerprint = fingerprint_files(filenames)
+            row = self.db.execute('SELECT fingerprint, digest FROM digests WHERE assetname=?', (assetname, )).fetchone()
+            if row and row[0] == fingerprint:
+                digest = row[1]
+            else:
+                digest = hash_files(filenames)
+                with self.db:
+                    self.db.execute('INSERT OR REPLACE INTO digests (assetname, fingerprint, digest) VALUES (?, ?, ?)',
+                                    (assetname, fingerprint, digest))
+
+        self._digests[assetname] = digest
+        return digest
@@ -1,4 +1,3 @@
-from functools import lru_cache
 from typing import *
 
 from ark.defaults import *
@@ -18,6 +17,13 @@ __all__ = [
 
 Tproxy = TypeVar('Tproxy', bound=UEProxyStructure)
 
+# Name of the inheritance cache table holding the gathered properties of each class, by full name
+GATHERED_PROPERTIES_TABLE = 'gathered_properties'
+
+# Most classes to keep gathered properties for
+# Property values refer to the assets they came from, so each entry keeps its ancestors' assets in memory
+GATHERED_PROPERTIES_LIMIT = 256
+
 
 def gather_properties(export: ExportTableItem) -> Tproxy:
     '''Collect properties from an export, respecting the inheritance tree.'''
@@ -27,22 +33,44 @@ def gather_properties(export: ExportTableItem) -> Tproxy:
     if not isinstance(export, ExportTableItem):
         raise TypeError("ExportTableItem required")
 
+    loader: AssetLoader = export.asset.loader
     chain = discover_inheritance_chain(export)
+
+    # Ancestors are shared by many exports, so start from the most derived one already gathered
+    # The export itself is not cached, as it is often a one-off (e.g. an actor in a map)
+    states = loader.inheritance.table(GATHERED_PROPERTIES_TABLE)
     proxy = None
-    while not proxy and chain:
-        baseclass_fullname = chain.pop(0)
-        proxy = proxy_for_type(baseclass_fullname)
+    for i in range(len(chain) - 2, -1, -1):
+        state = states.pop(chain[i], None)
+        if state is not None:
+            # Re-insert to mark as recently used
+            states[chain[i]] = state
+            proxy = state.copy()
+            chain = chain[i + 1:]
+            break
 
     if not proxy:
-        raise TypeError(f"No proxy type available for {baseclass_fullname}")
+        while not proxy and chain:
+            baseclass_fullname = chain.pop(0)
+            proxy = proxy_for_type(baseclass_fullname)
 
-    for fullname in chain:
+        if not proxy:
+            raise TypeError(f"No proxy type available for {baseclass_fullname}")
+
+    for i, fullname in enumerate(chain):
         if not is_fullname_an_asset(fullname):
             continue  # Defaults are already in proxy - skip
 
-        props = get_default_props_for_class(fullname, export.asset.loader)
+        props = get_default_props_for_class(fullname, loader)
         proxy.update(props)
 
+        if i < len(chain) - 1:
+            states[fullname] = proxy.copy()
+
+    # Drop the least recently used entries, so their assets can be freed
+    while len(states) > GATHERED_PROPERTIES_LIMIT:
+        del states[next(iter(states))]
+
     return proxy
 
 
@@ -1,7 +1,9 @@
-from functools import lru_cache
+from contextlib import contextmanager
+from functools import partial
 from logging import NullHandler, getLogger
 from operator import attrgetter
 from pathlib import Path
+from multiprocessing.pool import Pool
 from typing import *
 
 import yaml
@@ -10,7 +12,8 @@ from config import ConfigFile, get_global_config
 from ue.asset import ExportTableItem, ImportTableItem, UAsset
 from ue.context import ue_parsing_context
 from ue.loader import AssetLoader, AssetLoadException
-from ue.tree import get_parent_fullname
+from ue.summary import ExportSummary
+from ue.tree import get_export_key, get_inheritance_table, get_parent_fullname
 from utils.tree import IndexedTree, Node
 
 from .consts import BLUEPRINT_GENERATED_CLASS_CLS
@@ -21,10 +24,14 @@ __all__ = [
     'UnexpectedClass',
     'MissingParent',
     'inherits_from',
+    'summary_inherits_from',
+    'classify',
     'find_sub_classes',
     'find_parent_classes',
     'load_internal_hierarchy',
     'explore_path',
+    'discovery_pool',
+    'add_edges',
     'iterate_all',
 ]
 
@@ -34,8 +41,19 @@ logger.addHandler(NullHandler())
 ROOT_NAME = '/Script/CoreUObject.Object'
 
 
-@lru_cache(maxsize=1024)
 def _get_parent_cls(export: ExportTableItem) -> Optional[str]:
+    parents = get_inheritance_table(export, 'parent_cls')
+    if parents is None:
+        return _find_parent_cls(export)
+
+    # Keyed by export index, as export names are not always unique within an asset (e.g. in maps)
+    key = get_export_key(export)
+    if key not in parents:
+        parents[key] = _find_parent_cls(export)
+    return parents[key]
+
+
+def _find_parent_cls(export: ExportTableItem) -> Optional[str]:
     src = export.klass.value
     if src.fullname == BLUEPRINT_GENERATED_CLASS_CLS:
         src = export.super.value
@@ -64,7 +82,89 @@ def inherits_from(klass: Union[str, ExportTableItem], target: str) -> bool:
     `klass` should be a full classname or an exported class.
     `target` should be a full classname.
     '''
-    return target in find_parent_classes(klass)
+    return classify(klass, (target, )) is not None
+
+
+def summary_inherits_from(export: ExportSummary, target: str) -> Optional[bool]:
+    '''
+    Check if a summarised export inherits from a class, in the same way as `inherits_from` does for a full export.
+    Gives None if the export's parent isn't in the hierarchy, in which case the full export must be checked.
+    '''
+    parent = export.parent
+    if parent == target:
+        return True
+    if not parent or parent not in tree:
+        return None
+    return inherits_from(parent, target)
+
+
+def classify(klass: Union[str, ExportTableItem], candidates: Iterable[str]) -> Optional[str]:
+    '''
+    Find the first of the candidate classes that a class inherits from.
+    `klass` should be a full classname or an exported class.
+    `candidates` should be full classnames.
+
+    Once an in-tree ancestor of `klass` is found each candidate is checked in constant time,
+    making this much cheaper than repeated calls to `find_parent_classes`.
+    '''
+    walked, anchor, include_anchor, error = _find_anchor(klass)
+
+    for candidate in candidates:
+        if candidate in walked:
+            return candidate
+        if anchor is None or candidate not in tree:
+            continue
+        if candidate == anchor:
+            if include_anchor:
+                return candidate
+        elif tree.is_descendant(anchor, candidate):
+            return candidate
+
+    if error:
+        raise error
+
+    return None
+
+
+def _find_anchor(klass: Union[str, ExportTableItem]) -> Tuple[List[str], Optional[str], bool, Optional[Exception]]:
+    '''
+    Step up through non-primary parent classes until one is found in the tree.
+    Returns the names walked through, the name found in the tree, whether that name is a parent (rather than
+    `klass` itself) and any error that prevented one being found.
+    '''
+    if isinstance(klass, str):
+        name = klass
+        export = None
+    elif isinstance(klass, ExportTableItem):
+        assert klass.fullname
+        name = klass.fullname
+        export = klass
+    else:
+        raise TypeError('Invalid argument')
+
+    if name in tree:
+        return ([], name, False, None)
+
+    if not export:
+        raise ValueError(f'Cannot find {name} in the hierarchy and no export supplied to scan from')
+
+    walked: List[str] = []
+    try:
+        while True:
+            parent_name = get_parent_fullname(export)
+            if not parent_name:
+                raise MissingParent(f'Unable to find useful parent for {export.fullname}')
+
+            if parent_name in tree:
+                return (walked, parent_name, True, None)
+
+            walked.append(parent_name)
+            if not parent_name.startswith('/Game'):
+                raise MissingParent(f'Unable to find parent for {parent_name}')
+
+            export = export.asset.loader.load_class(parent_name)
+    except (MissingParent, AssetLoadException) as ex:
+        return (walked, None, False, ex)
 
 
 def find_sub_classes(klass: Union[str, ExportTableItem]) -> Iterator[str]:
@@ -185,15 +285,23 @@ def load_internal_hierarchy(filename: Path):
 # export_path('...', loader, config.optimisation.SearchIgnore)
 
 
-def explore_path(path: str, loader: AssetLoader, excludes: Iterable[str], verbose=False):
-    '''Run hierarchy discovery over every matching asset within the given path.'''
+def explore_path(path: str, loader: AssetLoader, excludes: Iterable[str], verbose=False, pool: Optional[Pool] = None):
+    '''
+    Run hierarchy discovery over every matching asset within the given path.
+    If a `pool` from `discovery_pool` is given the assets are parsed by its worker processes.
+    '''
     excludes = set(excludes)
 
     logger.info('Discovering hierarchy in path: %s', path)
 
+    if pool:
+        _explore_path_in_pool(path, loader, excludes, pool)
+        return
+
     n = 0
 
-    with ue_parsing_context(properties=False):
+    # Only the name, import and export tables are needed to find parent classes
+    with ue_parsing_context(properties=False, tables_only=True):
         asset_iterator = loader.find_assetnames('.*', path, exclude=excludes, extension=asset_extensions, return_extension=True)
         for (assetname, ext) in asset_iterator:
             n += 1
@@ -218,6 +326,132 @@ def explore_path(path: str, loader: AssetLoader, excludes: Iterable[str], verbos
                 loader.cache.remove(assetname)
 
 
+@contextmanager
+def discovery_pool(loader: AssetLoader,
+                   workers: int,
+                   loader_factory: Optional[Callable[[], AssetLoader]] = None) -> Iterator[Optional[Pool]]:
+    '''
+    Create a process pool for use with `explore_path`, with each worker owning its own loader.
+    Workers create their loader with `loader_factory` if given, otherwise a plain loader like the parent's.
+    Gives None if `workers` is less than two, which makes `explore_path` work in-process.
+    '''
+    if workers < 2:
+        yield None
+        return
+
+    logger.info('Starting %d hierarchy discovery workers', workers)
+    initargs = (loader_factory or partial(AssetLoader, loader.modresolver, str(loader.asset_path)), )
+    with Pool(workers, initializer=_init_discovery_worker, initargs=initargs) as pool:
+        yield pool
+
+
+# Assets per batch of work sent to a discovery worker
+DISCOVERY_SHARD_SIZE = 100
+
+Edge = Tuple[str, Optional[str]]
+
+_worker_loader: Optional[AssetLoader] = None
+
+
+def _init_discovery_worker(loader_factory: Callable[[], AssetLoader]):
+    global _worker_loader  # pylint: disable=global-statement
+    _worker_loader = loader_factory()
+
+
+def _discover_edges_in_shard(shard: List[Tuple[str, str]]) -> List[Edge]:
+    '''Worker function gathering (fullname, parent fullname) edges from a batch of assets.'''
+    loader = _worker_loader
+    assert loader
+    edges: List[Edge] = []
+
+    with ue_parsing_context(properties=False, tables_only=True):
+        for (assetname, ext) in shard:
+            try:
+                asset = loader[assetname]
+            except AssetLoadException:
+                logger.warning("Failed to load asset: %s", assetname)
+                continue
+
+            try:
+                for export in _find_exports_to_store(asset, ext):
+                    assert export.fullname
+                    edges.append((export.fullname, _get_parent_cls(export)))
+            except AssetLoadException:
+                logger.warning("Failed to check parentage of %s", assetname)
+
+            # Only the parent process chases parents, so nothing is gained by keeping the asset
+            loader.cache.remove(assetname)
+
+    return edges
+
+
+def _explore_path_in_pool(path: str, loader: AssetLoader, excludes: Set[str], pool: Pool):
+    assetnames = list(loader.find_assetnames('.*', path, exclude=excludes, extension=asset_extensions, return_extension=True))
+    shards = [assetnames[i:i + DISCOVERY_SHARD_SIZE] for i in range(0, len(assetnames), DISCOVERY_SHARD_SIZE)]
+
+    # Shards come back in order, keeping the tree identical to one built in-process
+    edges: List[Edge] = []
+    for shard_edges in pool.imap(_discover_edges_in_shard, shards):
+        edges.extend(shard_edges)
+
+    with ue_parsing_context(properties=False, tables_only=True):
+        add_edges(edges, loader)
+
+
+def add_edges(edges: Sequence[Edge], loader: AssetLoader):
+    '''
+    Merge (fullname, parent fullname) edges into the hierarchy, in order.
+    Parents that are neither in the tree nor in `edges` are discovered by loading them.
+    '''
+    parents: Dict[str, Optional[str]] = dict()
+    for fullname, parent_name in edges:
+        parents.setdefault(fullname, parent_name)
+
+    for fullname, _ in edges:
+        if fullname in tree:
+            continue
+
+        try:
+            _add_edge_chain(fullname, parents, loader)
+        except AssetLoadException:
+            logger.warning("Failed to check parentage of %s", fullname)
+        except MissingParent as ex:
+            logger.exception("Missing parent for %s", fullname)
+            raise MissingParent from ex
+
+
+def _add_edge_chain(fullname: str, parents: Dict[str, Optional[str]], loader: AssetLoader):
+    segment: Optional[Node[str]] = None
+
+    while True:
+        # Extend unsaved segment
+        old_segment = segment
+        segment = Node(fullname)
+        if old_segment:
+            segment.add(old_segment)
+
+        parent_name = parents.get(fullname, None)
+        if not parent_name:
+            raise MissingParent(f'Unable to find parent of {fullname}')
+
+        if parent_name not in tree and parent_name not in parents:
+            if parent_name.startswith('/Game'):
+                # Parent lives outside the scanned assets - let the normal discovery add it
+                _ingest_export(loader.load_class(parent_name), loader)
+                if parent_name not in tree:
+                    raise MissingParent(f'Unable to add parent {parent_name} of {fullname}')
+            else:
+                logger.warning(f'Internal class {parent_name} missing from pre-defined hierarchy')
+                tree.add(ROOT_NAME, parent_name)
+
+        if parent_name in tree:
+            # Insert segment and finish
+            tree.insert_segment(parent_name, segment)
+            return
+
+        fullname = parent_name
+
+
 def _find_exports_to_store(asset: UAsset, ext: str) -> Iterator[ExportTableItem]:
     current_cls = asset.default_class or asset.default_export
     if current_cls:
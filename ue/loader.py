@@ -1,10 +1,11 @@
+import mmap
 import os.path
 import re
 import sys
 import weakref
 from abc import ABC, abstractmethod
 from configparser import ConfigParser
-from itertools import islice
+from contextlib import contextmanager
 from logging import NullHandler, getLogger
 from pathlib import Path
 from typing import *
@@ -13,9 +14,10 @@ import psutil  # type: ignore
 
 from .asset import ExportTableItem, ImportTableItem, UAsset
 from .base import UEBase
-from .context import ParsingContext, get_ctx
+from .context import ParsingContext, get_ctx, ue_parsing_context
 from .properties import ObjectIndex, ObjectProperty, Property, StringProperty
 from .stream import MemoryStream
+from .summary import AssetSummary, AssetSummaryStore, summarise_asset
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
@@ -33,6 +35,9 @@ __all__ = (
 
 NO_FALLBACK = object()
 
+# Name of the inheritance cache table holding summaries of assets used this run, by asset name
+SUMMARY_TABLE = 'summaries'
+
 
 class AssetLoadException(Exception):
     pass
@@ -119,6 +124,12 @@ class CacheManager(ABC):
     def get_count(self):
         raise NotImplementedError
 
+    def pin(self, name: str):
+        '''Prevent the named asset from being evicted, if supported by the manager.'''
+
+    def unpin(self, name: str):
+        '''Allow the named asset to be evicted again.'''
+
 
 class DictCacheManager(CacheManager):
     '''A cache manager implementing the old unintelligent mechanism.'''
@@ -145,19 +156,53 @@ class DictCacheManager(CacheManager):
         return len(self.cache)
 
 
+# Rough number of bytes kept alive by each parsed name/import/export entry, including its child nodes
+TABLE_ENTRY_SIZE_ESTIMATE = 600
+# Rough ratio between the size of parsed properties and their serialised form
+PROPERTY_SIZE_MULTIPLIER = 10
+
+# Number of asset loads between each check of the process's memory use
+MEMORY_SAMPLE_INTERVAL = 100
+
+
+def estimate_asset_size(asset: UAsset) -> int:
+    '''Estimate the number of bytes kept alive by a parsed asset, without walking its tree.'''
+    size = asset.raw_size
+    size += (len(asset.names) + len(asset.imports) + len(asset.exports)) * TABLE_ENTRY_SIZE_ESTIMATE
+    if asset.has_lazy_properties:
+        # Properties are mostly never parsed, but the export data is kept for when they are
+        size += asset.raw_export_size
+    elif asset.has_properties:
+        size += asset.raw_export_size * PROPERTY_SIZE_MULTIPLIER
+    return size
+
+
 class UsageBasedCacheManager(CacheManager):
     '''
     A cache manager that prioritises the most recently used entries.
 
     We use the guaranteed ordering of Python dicts to track the most recently used entries.
+    Entries are evicted oldest first when either the entry count or the estimated total size
+    of the cached assets goes over its limit. Pinned entries are never evicted.
+
+    `weights` scales the estimated size of assets by file extension, e.g. {'.umap': 2.0} makes
+    maps use up the memory budget twice as fast.
     '''
-    def __init__(self, max_count=3000, max_memory=6 * 1024 * 1024 * 1024, keep_count=500):
+    def __init__(self,
+                 max_count=3000,
+                 max_memory=4 * 1024 * 1024 * 1024,
+                 keep_count=500,
+                 weights: Optional[Dict[str, float]] = None):
         self.cache: Dict[str, UAsset] = dict()
+        self.sizes: Dict[str, int] = dict()
+        self.pinned: Set[str] = set()
         self.max_count = max_count
         self.max_memory = max_memory
         self.keep_count = keep_count
+        self.weights: Dict[str, float] = dict(weights or {})
 
-        self.highest_memory_seen = 0
+        self.total_size = 0
+        self.highest_size_seen = 0
 
     def lookup(self, name: str):
         '''
@@ -180,10 +225,15 @@ class UsageBasedCacheManager(CacheManager):
         Note that this marks it as recently used, and hence less likely to be purged.
         '''
         # Discard any previous version
-        self.cache.pop(name, None)
+        self._discard(name)
 
         # Add to the end of the cache
+        size = int(estimate_asset_size(asset) * self.weights.get((asset.file_ext or '').lower(), 1.0))
         self.cache[name] = asset
+        self.sizes[name] = size
+        self.total_size += size
+        if self.total_size > self.highest_size_seen:
+            self.highest_size_seen = self.total_size
 
         # Check if we have too many assets
         self._maybe_purge()
@@ -193,7 +243,7 @@ class UsageBasedCacheManager(CacheManager):
         Remove the named asset from the cache.
         '''
         logger.debug('Removing cache entry: %s', name)
-        found = self.cache.pop(name, None)
+        found = self._discard(name)
         if not found:
             logger.warning('Attempt to remove asset that was not found: %s', name)
 
@@ -207,33 +257,46 @@ class UsageBasedCacheManager(CacheManager):
             logger.debug('Wiping cache completely')
             # Full wipe
             self.cache = dict()
+            self.sizes = dict()
+            self.total_size = 0
         else:
             logger.debug('Wiping cache with prefix: %s', prefix)
             to_cull = list(key for key in self.cache if key.startswith(prefix))
             for name in to_cull:
-                del self.cache[name]
+                self._discard(name)
+
+    def pin(self, name: str):
+        self.pinned.add(name)
+
+    def unpin(self, name: str):
+        self.pinned.discard(name)
 
     def get_count(self):
         return len(self.cache)
 
-    def _maybe_purge(self):
-        mem_used = psutil.Process().memory_info().rss
-        if mem_used > self.highest_memory_seen:
-            self.highest_memory_seen = mem_used
+    def _discard(self, name: str) -> Optional[UAsset]:
+        asset = self.cache.pop(name, None)
+        if asset:
+            self.total_size -= self.sizes.pop(name)
+        return asset
 
+    def _maybe_purge(self):
         cache_count = len(self.cache)
 
         if cache_count >= self.max_count:
             logger.debug("Asset cache purge due to too many items")
-            self._purge(cache_count - self.keep_count)
-        # elif mem_used >= self.max_memory and cache_count > self.keep_count:
-        #     logger.info("Asset cache purge due to high memory usage (with %d items)", cache_count)
-        #     self._purge(cache_count - self.keep_count)
+            self._purge(lambda: len(self.cache) > self.keep_count)
+        elif self.total_size > self.max_memory:
+            logger.debug("Asset cache purge due to estimated size (%d items)", cache_count)
+            self._purge(lambda: self.total_size > self.max_memory)
 
-    def _purge(self, amount: int):
-        to_cull = list(islice(self.cache, amount))
-        for name in to_cull:
-            del self.cache[name]
+    def _purge(self, should_continue: Callable[[], bool]):
+        # Oldest entries are at the start
+        for name in list(self.cache):
+            if not should_continue():
+                break
+            if name not in self.pinned:
+                self._discard(name)
 
 
 class ContextAwareCacheWrapper(CacheManager):
@@ -262,13 +325,168 @@ class ContextAwareCacheWrapper(CacheManager):
     def wipe(self, prefix: str = ''):
         self.manager.wipe(prefix)
 
+    def pin(self, name: str):
+        self.manager.pin(name)
+
+    def unpin(self, name: str):
+        self.manager.unpin(name)
+
     def get_count(self):
         return self.manager.get_count()
 
 
+class DirectoryIndex:
+    '''
+    An in-memory index of directory contents, filled one directory at a time using `os.scandir`.
+
+    Lets the loader check for and list files without repeatedly hitting the filesystem.
+    Directories are read on first use and kept until invalidated, so changes made to them after
+    that point are not seen until `invalidate` is called.
+    '''
+    def __init__(self):
+        self.dirs: Dict[str, Tuple[Dict[str, str], List[str]]] = dict()
+
+    def invalidate(self, path: Optional[str] = None):
+        '''Forget the contents of the given directory and everything below it, or everything if no path is given.'''
+        if path is None:
+            self.dirs = dict()
+            return
+
+        key = self._key(path)
+        prefix = key + os.sep
+        for dirkey in [dirkey for dirkey in self.dirs if dirkey == key or dirkey.startswith(prefix)]:
+            del self.dirs[dirkey]
+
+    def is_file(self, filename: str) -> bool:
+        dirname, name = os.path.split(filename)
+        files, _ = self._list(dirname)
+        return os.path.normcase(name) in files
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        '''Equivalent of a top-down `os.walk`, served from the index.'''
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            files, subdirs = self._list(path)
+            if not files and not subdirs and not os.path.isdir(path):
+                continue
+            yield (path, list(subdirs), list(files.values()))
+            pending.extend(os.path.join(path, subdir) for subdir in reversed(subdirs))
+
+    def _list(self, path: str) -> Tuple[Dict[str, str], List[str]]:
+        key = self._key(path)
+        listing = self.dirs.get(key, None)
+        if listing is None:
+            files: Dict[str, str] = dict()
+            subdirs: List[str] = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        else:
+                            files[os.path.normcase(entry.name)] = entry.name
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            listing = (files, subdirs)
+            self.dirs[key] = listing
+
+        return listing
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+
+class InheritanceCache:
+    '''
+    Facts about class inheritance, keyed by class and asset names rather than by parsed objects.
+
+    Entries outlive the assets they were worked out from, so walking up a hierarchy a second time does not
+    need any assets to be loaded. Each kind of fact is kept in its own named table. `wipe` drops every
+    entry whose key or value refers to an asset with a name starting with the given prefix.
+
+    Entries are indexed by the asset names they refer to (the part of each string before any '.'),
+    so wiping only has to look at the names of assets rather than at every entry.
+    '''
+    def __init__(self):
+        self.tables: Dict[str, InheritanceTable] = dict()
+        self.index: Dict[str, Set[Tuple[str, Any]]] = dict()
+
+    def table(self, name: str) -> Dict[Any, Any]:
+        '''Get the named table, creating it if needed.'''
+        table = self.tables.get(name, None)
+        if table is None:
+            table = self.tables[name] = InheritanceTable(self, name)
+        return table
+
+    def wipe(self, prefix: str = ''):
+        if not prefix:
+            self.tables = dict()
+            self.index = dict()
+            return
+
+        for assetname in [assetname for assetname in self.index if assetname.startswith(prefix)]:
+            for (name, key) in list(self.index.get(assetname, ())):
+                self.tables[name].pop(key, None)
+
+
+class InheritanceTable(dict):
+    '''A table of an `InheritanceCache`, which keeps the cache's index up to date as entries are set and removed.'''
+    def __init__(self, cache: InheritanceCache, name: str):
+        super().__init__()
+        self.cache = cache
+        self.name = name
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self._unindex(key)
+        super().__setitem__(key, value)
+        entry = (self.name, key)
+        for assetname in _find_mentioned_assetnames((key, value)):
+            self.cache.index.setdefault(assetname, set()).add(entry)
+
+    def __delitem__(self, key):
+        self._unindex(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._unindex(key)
+        return super().pop(key, *default)
+
+    def _unindex(self, key):
+        entry = (self.name, key)
+        for assetname in _find_mentioned_assetnames((key, self[key])):
+            entries = self.cache.index.get(assetname, None)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self.cache.index[assetname]
+
+
+def _find_mentioned_assetnames(item) -> Iterator[str]:
+    if isinstance(item, str):
+        yield item.split('.', 1)[0]
+    elif isinstance(item, tuple):
+        for part in item:
+            yield from _find_mentioned_assetnames(part)
+
+
 class AssetLoader:
-    def __init__(self, modresolver: ModResolver, assetpath='.', cache_manager: CacheManager = None):
+    def __init__(self,
+                 modresolver: ModResolver,
+                 assetpath='.',
+                 cache_manager: CacheManager = None,
+                 use_mmap: bool = False,
+                 summary_store: Optional[AssetSummaryStore] = None,
+                 use_index: bool = False):
         self.cache: CacheManager = cache_manager or ContextAwareCacheWrapper(UsageBasedCacheManager())
+        self.use_mmap = use_mmap
+        self.summary_store = summary_store
+        self.file_index: Optional[DirectoryIndex] = DirectoryIndex() if use_index else None
+        self.inheritance = InheritanceCache()
+        self.dependency_recorders: List[Set[str]] = []
         self.asset_path = Path(assetpath)
         self.absolute_asset_path = self.asset_path.absolute().resolve()  # need both absolute and resolve here
         self.modresolver = modresolver
@@ -276,6 +494,13 @@ class AssetLoader:
 
         self.max_memory = 0
         self.max_cache = 0
+        self.load_count = 0
+
+    def sample_memory(self) -> None:
+        '''Update `max_memory` with the current memory use of the process.'''
+        mem_used = psutil.Process().memory_info().rss
+        if mem_used > self.max_memory:
+            self.max_memory = mem_used
 
     def clean_asset_name(self, name: str) -> str:
         # Remove class name, if present
@@ -305,9 +530,21 @@ class AssetLoader:
 
     def wipe_cache(self) -> None:
         self.cache.wipe()
+        self.inheritance.wipe()
+
+    def invalidate_file_index(self, assetname: Optional[str] = None) -> None:
+        '''Make the loader re-read the directory holding the given asset path and its sub-directories, or all directories.'''
+        if not self.file_index:
+            return
+
+        if assetname:
+            self.file_index.invalidate(self.convert_asset_name_to_path(assetname, partial=True))
+        else:
+            self.file_index.invalidate()
 
     def wipe_cache_with_prefix(self, prefix: str) -> None:
         self.cache.wipe(prefix)
+        self.inheritance.wipe(prefix)
 
     def convert_asset_name_to_path(self, name: str, partial=False, ext='.uasset') -> str:
         '''Get the filename from which an asset can be loaded.'''
@@ -370,7 +607,8 @@ class AssetLoader:
         assert extensions
 
         toppath = self.convert_asset_name_to_path(toppath, partial=True)
-        for path, _, files in os.walk(toppath):
+        walker = self.file_index.walk(toppath) if self.file_index else os.walk(toppath)
+        for path, _, files in walker:
             for filename in files:
                 fullpath = os.path.join(path, filename)
                 name, ext = os.path.splitext(fullpath)
@@ -429,46 +667,117 @@ class AssetLoader:
         if not os.path.isabs(filename):
             filename = os.path.join(self.asset_path, filename)
         try:
-            mem = load_file_into_memory(filename)
+            mem = load_file_into_memory(filename, use_mmap=self.use_mmap)
         except FileNotFoundError:
             raise AssetNotFound(filename)
         return mem
 
-    def load_raw_asset(self, name: str) -> Tuple[memoryview, memoryview, str]:
+    def load_raw_asset(self, name: str, exports: bool = True) -> Tuple[memoryview, Optional[memoryview], str]:
         '''
         Load an asset given its asset name into memory without parsing it.
-        Returns (memoryview, ext).
+        Returns (asset memoryview, exports memoryview, ext).
+        With `exports` disabled the .uexp file is required to exist but is not loaded, and None is returned in its place.
+        '''
+        asset_filename, exports_filename, ext = self.find_asset_files(name)
+        asset_mem = load_file_into_memory(asset_filename, use_mmap=self.use_mmap)
+        exports_mem = None
+        if exports:
+            exports_mem = load_file_into_memory(exports_filename, use_mmap=self.use_mmap)
+        return (asset_mem, exports_mem, ext)
+
+    def find_asset_files(self, name: str) -> Tuple[str, str, str]:
+        '''
+        Find the files an asset is made of.
+        Returns (asset filename, exports filename, ext).
         '''
         # TODO: Mobile-only. Make this somehow work with both platforms.
         name = self.clean_asset_name(name)
-        asset_mem = None
-        exports_mem = None
         exports_filename = self.convert_asset_name_to_path(name, ext='.uexp')
 
-        if Path(exports_filename).is_file():
+        if self._is_file(exports_filename):
             for ext in ('.uasset', '.umap'):
                 asset_filename = self.convert_asset_name_to_path(name, ext=ext)
 
-                if Path(asset_filename).is_file():
-                    asset_mem = load_file_into_memory(asset_filename)
-                    exports_mem = load_file_into_memory(exports_filename)
-                    return (asset_mem, exports_mem, ext)
+                if self._is_file(asset_filename):
+                    return (asset_filename, exports_filename, ext)
 
         raise AssetNotFound(name)
 
+    def _is_file(self, filename: str) -> bool:
+        if self.file_index:
+            return self.file_index.is_file(filename)
+        return Path(filename).is_file()
+
+    def get_summary(self, assetname: str) -> AssetSummary:
+        '''
+        Get a summary of the given asset.
+        Summaries are served from the summary store while the asset's files are unchanged, else the asset is parsed
+        and the store updated. Without a summary store assets are parsed without properties, so default properties
+        are missing from the summary.
+        '''
+        assetname = self.clean_asset_name(assetname)
+        summaries = self.inheritance.table(SUMMARY_TABLE)
+        summary = summaries.get(assetname, None) or self.get_stored_summary(assetname)
+        if not summary:
+            # Stored summaries are reused by later runs, so are made complete
+            if self.summary_store:
+                with ue_parsing_context(properties=True, tables_only=False):
+                    summary = self.store_summary(self[assetname])
+            else:
+                with ue_parsing_context(properties=False, tables_only=False):
+                    summary = summarise_asset(self[assetname], properties=False)
+
+        summaries[assetname] = summary
+        return summary
+
+    def get_stored_summary(self, assetname: str) -> Optional[AssetSummary]:
+        '''Get a summary of the given asset only if the summary store holds one for its current files.'''
+        if not self.summary_store:
+            return None
+
+        assetname = self.clean_asset_name(assetname)
+        asset_filename, exports_filename, _ = self.find_asset_files(assetname)
+        return self.summary_store.lookup(assetname, (asset_filename, exports_filename))
+
+    def store_summary(self, asset: UAsset) -> AssetSummary:
+        '''Summarise a loaded asset, adding the summary to the summary store if there is one.'''
+        assert asset.assetname
+        summary = summarise_asset(asset)
+        if self.summary_store:
+            asset_filename, exports_filename, _ = self.find_asset_files(asset.assetname)
+            self.summary_store.add(summary, (asset_filename, exports_filename))
+        return summary
+
+    @contextmanager
+    def record_dependencies(self) -> Iterator[Set[str]]:
+        '''
+        Collect the names of all assets requested while in this context, whether loaded or found in the cache.
+        Names of assets that failed to load are included too.
+        '''
+        names: Set[str] = set()
+        self.dependency_recorders.append(names)
+        try:
+            yield names
+        finally:
+            # Contexts nest, so this is always the last recorder
+            self.dependency_recorders.pop()
+
+    def note_dependency(self, assetname: str) -> None:
+        '''
+        Add an asset to the dependencies being recorded, without loading it.
+        For use where a result derived from the asset is served from a cache instead.
+        '''
+        if self.dependency_recorders:
+            assetname = self.clean_asset_name(assetname)
+            for recorder in self.dependency_recorders:
+                recorder.add(assetname)
+
     def __getitem__(self, assetname: str) -> UAsset:
         '''Load and parse the given asset, or fetch it from the cache if already loaded.'''
         assetname = self.clean_asset_name(assetname)
+        for recorder in self.dependency_recorders:
+            recorder.add(assetname)
         asset = self.cache.lookup(assetname) or self._load_asset(assetname)
-
-        # Keep track of some stats
-        mem_used = psutil.Process().memory_info().rss
-        if mem_used > self.max_memory:
-            self.max_memory = mem_used
-        cache_used = self.cache.get_count()
-        if cache_used > self.max_cache:
-            self.max_cache = cache_used
-
         return asset
 
     def __delitem__(self, assetname: str) -> None:
@@ -482,14 +791,20 @@ class AssetLoader:
 
     def _load_asset(self, assetname: str, doNotLink=False) -> UAsset:
         logger.debug(f"Loading asset: {assetname}")
-        asset_mem, export_mem, ext = self.load_raw_asset(assetname)
+        tables_only = get_ctx().tables_only
+        asset_mem, export_mem, ext = self.load_raw_asset(assetname, exports=not tables_only)
         asset_stream = MemoryStream(asset_mem, 0, len(asset_mem))
-        export_stream = MemoryStream(export_mem, 0, len(export_mem))
-        asset = UAsset(weakref.proxy(asset_stream), weakref.proxy(export_stream))
+        if export_mem is not None:
+            export_stream = MemoryStream(export_mem, 0, len(export_mem))
+            asset = UAsset(weakref.proxy(asset_stream), weakref.proxy(export_stream))
+        else:
+            asset = UAsset(weakref.proxy(asset_stream))
         asset.loader = self
         asset.assetname = assetname
         asset.name = assetname.split('/')[-1]
         asset.file_ext = ext
+        asset.raw_size = len(asset_mem)
+        asset.raw_export_size = len(export_mem) if export_mem is not None else 0
 
         try:
             asset.deserialise()
@@ -499,32 +814,35 @@ class AssetLoader:
         except Exception as ex:
             raise AssetParseError(assetname) from ex
 
-        leafname = assetname.split('/')[-1]
-
-        # Look for a BP-style Default__<assetname> export
-        exports = [export for export in asset.exports.values if str(export.name).startswith('Default__')]
-        if len(exports) > 1:
-            logger.warning(f'Found more than one Default__ entry in {assetname}!')
-        asset.default_export = exports[0] if exports else None
-        if asset.default_export:
-            asset.default_class = asset.default_export.klass.value
-
-        if not asset.default_export:
-            # Fall back to an export named the same as the asset
-            exports = [export for export in asset.exports.values if str(export.name).lower() == leafname.lower()]
-            if len(exports) > 1:
-                logger.warning(f'Found more than <assetname> export in {assetname}!')
-            else:
-                asset.default_export = exports[0] if exports else None
-
-        # TODO: Potentially treat .umap assets different for caching purposes
         self.cache.add(assetname, asset)
 
+        # Keep track of some stats, sampling memory use only every so often to avoid a syscall per load
+        self.load_count += 1
+        if self.load_count % MEMORY_SAMPLE_INTERVAL == 1:
+            self.sample_memory()
+        cache_used = self.cache.get_count()
+        if cache_used > self.max_cache:
+            self.max_cache = cache_used
+
         return asset
 
 
-def load_file_into_memory(filename):
+def load_file_into_memory(filename, use_mmap=False) -> memoryview:
+    '''
+    Load the contents of a file, returning a memoryview over it.
+
+    With `use_mmap` the file is mapped read-only instead of being copied onto the Python heap. The mapping is
+    released once the last stream referencing it is garbage collected, which for cached assets is when they
+    are evicted from the cache.
+    '''
     with open(filename, 'rb') as f:
-        data = f.read()
+        if use_mmap:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                data = f.read()
+        else:
+            data = f.read()
         mem = memoryview(data)
     return mem
@@ -1,3 +1,4 @@
+import array
 import math
 import operator
 import struct
@@ -11,10 +12,10 @@ from numbers import Real
 from typing import *
 
 from .base import UEBase
-from .context import INCLUDE_METADATA, get_ctx
+from .context import INCLUDE_METADATA, get_ctx, ue_parsing_context
 from .coretypes import *
 from .number import *
-from .stream import MemoryStream
+from .stream import MemoryStream, get_codec
 
 if INCLUDE_METADATA:
     try:
@@ -36,20 +37,66 @@ PropDict = Dict[str, Dict[int, UEBase]]
 
 NO_FALLBACK = object()
 
+# Returned by PropertyTable._parseField in place of a property that was filtered out
+SKIPPED = object()
+
+
+class PropertyIndexEntry(dict):
+    '''Values of a single property name, keyed by index. Missing indexes read as None.'''
+    def __missing__(self, key):
+        return None
+
+
+class PropertyIndex(dict):
+    '''Property values keyed by name then index. Missing names read as an empty entry, without being added.'''
+    def __missing__(self, key):
+        return PropertyIndexEntry()
+
 
 class PropertyTable(UEBase):
+    '''
+    A list of properties, terminated by a None name.
+
+    Property values are indexed by name and index as they are parsed, for `get`, `has` and `as_dict`.
+
+    If deserialised with a set of property names, other properties are skipped over without being parsed.
+    Their offsets are recorded and they are parsed on demand: by name through `get`, or all at once
+    when `values` or `as_dict` are used.
+    '''
     string_format = '{count} entries'
     display_fields = ['values']
     skip_level_field = 'values'
-    _as_dict: Optional[PropDict] = None
+    _index: Optional[PropertyIndex] = None
+    _skipped: Optional[Dict[str, List[int]]] = None
+    _skipped_stream: Optional[MemoryStream] = None
 
     values: List["Property"]
 
     def as_dict(self) -> PropDict:
-        return self._as_dict or self._convert_to_dict()
+        if self._skipped:
+            self.decode_skipped()
+        return self._index
+
+    def has(self, name: str) -> bool:
+        '''Check if a property with the given name is present, at any index.'''
+        return name in self._index or bool(self._skipped and name in self._skipped)
+
+    def get(self, name: str, index: int = 0) -> Optional[UEBase]:
+        '''Get the value of a property by name and index, or None if it is not present.'''
+        if self._skipped and name in self._skipped:
+            self.decode_skipped((name, ))
+
+        return self._index[name][index]
+
+    def get_all(self, name: str) -> Dict[int, UEBase]:
+        '''Get all values of a property by name, keyed by index in file order.'''
+        if self._skipped and name in self._skipped:
+            self.decode_skipped((name, ))
+
+        return self._index[name]
 
     def get_property(self, name: str, index: int = 0, fallback=NO_FALLBACK) -> UEBase:
-        value = self.as_dict()[name][index]
+        value = self.get(name, index)
 
         if value is not None:
             return value
@@ -59,39 +106,62 @@ class PropertyTable(UEBase):
 
         raise KeyError(f"Property {name}[{index}] not found")
 
-    def _convert_to_dict(self):
-        result: PropDict = defaultdict(lambda: defaultdict(lambda: None))
-
-        for prop in self.values:
-            name = str(prop.header.name)
-            idx = prop.header.index
-            value = prop.value
-
-            result[name][idx] = value
+    def decode_skipped(self, names: Optional[Iterable[str]] = None):
+        '''Parse properties that were skipped during deserialisation, either all of them or just those with the given names.'''
+        if not self._skipped:
+            return
 
-        self._as_dict = result
-        return result
+        names = list(self._skipped.keys()) if names is None else [name for name in names if name in self._skipped]
+        if not names:
+            return
 
-    def _deserialise(self):
+        values = self.field_values['values']
+        with ue_parsing_context(link=True):
+            for name in names:
+                for offset in self._skipped.pop(name):
+                    stream = MemoryStream(self._skipped_stream, offset, self._skipped_stream.end - offset)
+                    prop = Property(self, stream)
+                    values.append(prop.deserialise())
+                    prop.link()
+                    self._addToIndex(prop)
+
+        # Keep the properties in file order
+        values.sort(key=lambda prop: prop.start_offset)
+        if not self._skipped:
+            self._skipped_stream = None
+
+    def _addToIndex(self, prop: "Property"):
+        name = str(prop.header.name)
+        entry = self._index.get(name, None)
+        if entry is None:
+            entry = self._index[name] = PropertyIndexEntry()
+        entry[prop.header.index] = prop.value
+
+    def _deserialise(self, name_filter: Optional[Collection[str]] = None):
         values = []
         self._newField('values', values)
+        self._index = PropertyIndex()
 
+        count = 0
         while self.stream.offset < (self.stream.end - 8):
-            value = self._parseField()
+            value = self._parseField(name_filter)
             if value is None:
                 break
-            values.append(value)
+            if value is not SKIPPED:
+                values.append(value)
+                self._addToIndex(value)
+            count += 1
 
-        self._newField('count', len(values))
+        self._newField('count', count)
 
     def _link(self):
         '''Override link to link all table entries.'''
         super()._link()
-        for value in self.values:
+        for value in self.field_values['values']:
             if isinstance(value, UEBase):
                 value.link()
 
-    def _parseField(self):
+    def _parseField(self, name_filter: Optional[Collection[str]] = None):
         # Records the current offset
         saved_offset = self.stream.offset
 
@@ -100,13 +170,38 @@ class PropertyTable(UEBase):
         if name.index == self.asset.none_index:
             return None
 
-        # Reset back to the saved offset and read the whole property
+        # Reset back to the saved offset
         self.stream.offset = saved_offset
+
+        if name_filter:
+            name.link()
+            name_str = str(name)
+            if name_str not in name_filter:
+                # Only read the header, to find where the next property starts
+                header = PropertyHeader(self).deserialise()
+                self.stream.offset += header.size
+                self._recordSkipped(name_str, saved_offset)
+                return SKIPPED
+
+        # Read the whole property
         value = Property(self).deserialise()
         value.link()
 
         return value
 
+    def _recordSkipped(self, name: str, offset: int):
+        if self._skipped is None:
+            self._skipped = dict()
+            # The table's own stream may not outlive parsing, so keep hold of the memory
+            self._skipped_stream = MemoryStream(self.stream)
+        self._skipped.setdefault(name, []).append(offset)
+
+    def __getattr__(self, name: str):
+        if name == 'values' and self._skipped:
+            self.decode_skipped()
+
+        return super().__getattr__(name)
+
     def __getitem__(self, index: int):
         '''Provide access using the index via the table[index] syntax.'''
         if self.values is None:
@@ -115,7 +210,10 @@ class PropertyTable(UEBase):
         return self.values[index]
 
     def __len__(self):
-        return len(self.values)
+        length = len(self.field_values['values'])
+        if self._skipped:
+            length += sum(len(offsets) for offsets in self._skipped.values())
+        return length
 
     if INCLUDE_METADATA and support_pretty:
 
@@ -135,6 +233,7 @@ class PropertyTable(UEBase):
 
 
 class PropertyHeader(UEBase):
+    __slots__ = ('name', 'type', 'size', 'index', 'inner_type', 'struct_guid', 'inner_value', 'has_guid', 'guid')
     display_fields = ['name', 'index']
 
     name: NameIndex
@@ -170,6 +269,7 @@ class PropertyHeader(UEBase):
 
 
 class Property(UEBase):
+    __slots__ = ('header', 'value')
     string_format = '{header.name}[{header.index}] = {value}'
 
     header: PropertyHeader
@@ -225,8 +325,13 @@ class DummyAsset(UEBase):
             return StringProperty.create('None')
         raise ValueError("Attempt to lookup a name in a dummy asset")
 
+    def getInstancedName(self, index, instance):
+        return f'{self.getName(index)}_{instance}'
+
 
 class ValueProperty(UEBase, Real, ABC):
+    __slots__ = ()
+
     value: Real
 
     @abstractmethod
@@ -287,12 +392,13 @@ class ValueProperty(UEBase, Real, ABC):
 
 
 class FloatProperty(ValueProperty):
+    __slots__ = ('value', 'raw_data', 'rounded', 'rounded_value', 'textual')
     main_field = 'textual'
     display_fields = ['textual']
 
     # value: float
     textual: str
-    raw_data: bytes
+    raw_data: ByteString
     rounded: str
     rounded_value: float
 
@@ -342,30 +448,36 @@ class FloatProperty(ValueProperty):
         return obj
 
     def _deserialise(self, size=None):
-        # Read once as a float
         saved_offset = self.stream.offset
         self._newField('value', self.stream.readFloat())
 
-        # Read again as plain bytes for exact exporting
-        self.stream.offset = saved_offset
-        self._newField('raw_data', self.stream.readBytes(4))
+        # Keep a copy of the plain bytes for exact exporting, as a view would hold on to the whole asset's memory
+        self._newField('raw_data', bytes(self.stream.mem[saved_offset:saved_offset + 4]))
 
-        # Make a rounded textual version with (inexact) if required
-        value = self.value
-        rounded = round(value, 6)
-        inexact = abs(value - rounded) >= sys.float_info.epsilon
-        text = str(rounded)
-        self._newField('rounded', text)
-        self._newField('rounded_value', rounded)
-        if inexact:
-            text += ' (inexact)'
-        self._newField('textual', text)
+    def __getattr__(self, name: str):
+        # Rounded and textual versions are only made when first needed
+        if name in ('rounded', 'rounded_value', 'textual') and self.is_serialised:
+            self._format()
+            return object.__getattribute__(self, name)
+
+        return super().__getattr__(name)
+
+    def _format(self):
+        self.rounded_value, self.rounded, self.textual = _format_float(self.value)
 
     def __bytes__(self):
         assert self.is_serialised
         return self.raw_data
 
 
+def _format_float(value: float) -> Tuple[float, str, str]:
+    '''Make a rounded version of a float's value, its text, and the text with (inexact) if required.'''
+    rounded = round(value, 6)
+    inexact = abs(value - rounded) >= sys.float_info.epsilon
+    text = str(rounded)
+    return (rounded, text, text + ' (inexact)' if inexact else text)
+
+
 class DoubleProperty(ValueProperty):
     main_field = 'textual'
     display_fields = ['textual']
@@ -398,6 +510,7 @@ class DoubleProperty(ValueProperty):
 
 
 class IntProperty(ValueProperty):
+    __slots__ = ('value', )
     string_format = '(int) {value}'
     main_field = 'value'
 
@@ -420,6 +533,7 @@ class IntProperty(ValueProperty):
 
 
 class UInt32Property(IntProperty):
+    __slots__ = ()
     string_format = '(uint) {value}'
 
     def _deserialise(self, size=None):
@@ -427,6 +541,7 @@ class UInt32Property(IntProperty):
 
 
 class BoolProperty(ValueProperty):
+    __slots__ = ('value', )
     main_field = 'value'
 
     value: bool  # type: ignore
@@ -607,11 +722,11 @@ class Guid(UEBase):
     value: uuid.UUID
 
     def _deserialise(self, *args):
-        raw_bytes = self.stream.readBytes(16)
+        words = self.stream.readStruct('4I')
         # Here we need to reverse the endian of each 4-byte word
         # to match C# UUID decoder. Python's bytes_le only corrects
         # some of the fields as the rest are single bytes.
-        value = uuid.UUID(bytes=struct.pack('>4I', *struct.unpack('<4I', raw_bytes)))
+        value = uuid.UUID(bytes=struct.pack('>4I', *words))
         self._newField('value', value)
 
 
@@ -915,15 +1030,23 @@ class ArrayProperty(UEBase):
             self._newField('value', f'<unsupported field type {self.field_type}>')
             return
 
-        values: List[Union[UEBase, str]] = []
-        self._newField('values', values)
-
         field_size = (size-4) // self.count  # don't know if we can use this
         end = saved_offset + size
         if dbg_structs > 1:
             print(f'Array @ {self.start_offset}, size={size}, count={self.count}, '
                   f'calculated field size={field_size}, field type={self.field_type}')
 
+        # Arrays of fixed-size numeric values are decoded in one go
+        layout = PACKED_ARRAY_LAYOUTS.get(propertyType, None)
+        if layout and get_codec(layout).size == field_size and end - self.stream.offset == field_size * self.count:
+            stream = MemoryStream(self.stream, self.stream.offset, field_size * self.count)
+            self._newField('values', PackedArrayValues(self, propertyType, stream, self.count, layout))
+            self.stream.offset = end
+            return
+
+        values: List[Union[UEBase, str]] = []
+        self._newField('values', values)
+
         while self.stream.offset < end:
             # print("  Array entry @", self.stream.offset)
             value = propertyType(self)
@@ -944,8 +1067,26 @@ class ArrayProperty(UEBase):
 
         self.stream.offset = saved_offset + size
 
+    def as_numbers(self) -> Sequence[Union[int, float]]:
+        '''Get the plain values of an array of numbers, without creating an object per element where possible.'''
+        values = self.values
+        if isinstance(values, PackedArrayValues):
+            return values.numbers
+        return [value.value for value in values]
+
+    def iter_vectors(self) -> Iterator[Tuple[float, float, float]]:
+        '''Iterate over the (x, y, z) values of an array of vectors.'''
+        values = self.values
+        if isinstance(values, PackedArrayValues):
+            numbers = values.numbers
+            return zip(numbers[0::3], numbers[1::3], numbers[2::3])
+        return ((value.x.value, value.y.value, value.z.value) for value in values)
+
     def format_for_json(self):
-        return [element.format_for_json() for element in self.values]
+        values = self.values
+        if isinstance(values, PackedArrayValues):
+            return values.format_for_json()
+        return [element.format_for_json() for element in values]
 
     if INCLUDE_METADATA and support_pretty:
 
@@ -967,6 +1108,55 @@ class ArrayProperty(UEBase):
                     p.text(', ' + str(self.value))
 
 
+class PackedArrayValues(Sequence):
+    '''
+    The elements of an array of fixed-size numeric values, decoded in one go.
+
+    The plain numbers are held in `numbers` (flattened, for multi-value types such as `Vector`).
+    Element objects are only created when they are accessed.
+    '''
+    def __init__(self, owner: ArrayProperty, element_type: Type[UEBase], stream: MemoryStream, count: int, layout: str):
+        self.owner = owner
+        self.element_type = element_type
+        self.element_size = stream.size // count
+        self.layout = layout
+        self.stream = stream
+        self.numbers = array.array(layout[0])
+        self.numbers.frombytes(stream.mem[stream.offset:stream.end])
+        if sys.byteorder != 'little':
+            self.numbers.byteswap()
+        self._elements: List[Optional[UEBase]] = [None] * count
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._elements)))]
+
+        element = self._elements[index]
+        if element is None:
+            offset = self.stream.offset + (index % len(self._elements)) * self.element_size
+            element = self.element_type(self.owner, MemoryStream(self.stream, offset, self.element_size))
+            element.is_inside_array = True
+            element.deserialise(self.element_size)
+            element.link()
+            self._elements[index] = element
+
+        return element
+
+    def format_for_json(self):
+        '''Format the elements as their own `format_for_json` would, straight from the numbers.'''
+        width = len(self.layout)
+        if width == 1:
+            return self.numbers.tolist()
+
+        # Multi-value types are structs of floats, shown in the same form as UEBase.__str__
+        name = self.element_type.__name__
+        texts = [_format_float(number)[2] for number in self.numbers]
+        return [f"{name}({', '.join(texts[i:i + width])})" for i in range(0, len(texts), width)]
+
+
 class Vector(UEBase):
     x: FloatProperty
     y: FloatProperty
@@ -978,6 +1168,15 @@ class Vector(UEBase):
         self._newField('z', FloatProperty(self))
 
 
+# Element types that ArrayProperty can decode in bulk, with their struct layouts
+PACKED_ARRAY_LAYOUTS: Dict[Type[UEBase], str] = {
+    FloatProperty: 'f',
+    IntProperty: 'i',
+    UInt32Property: 'I',
+    Vector: 'fff',
+}
+
+
 class Box(UEBase):
     min: Vector
     max: Vector
@@ -1063,8 +1262,9 @@ class IntPoint(UEBase):
     y: int
 
     def _deserialise(self, size=None):
-        self._newField('x', self.stream.readInt32())
-        self._newField('y', self.stream.readInt32())
+        x, y = self.stream.readStruct('ii')
+        self._newField('x', x)
+        self._newField('y', y)
 
 
 class EngineVersion(UEBase):
@@ -1075,10 +1275,11 @@ class EngineVersion(UEBase):
     branch: str
 
     def _deserialise(self):
-        self._newField('major', self.stream.readUInt16())
-        self._newField('minor', self.stream.readUInt16())
-        self._newField('patch', self.stream.readUInt16())
-        self._newField('changelist', self.stream.readUInt32())
+        major, minor, patch, changelist = self.stream.readStruct('HHHI')
+        self._newField('major', major)
+        self._newField('minor', minor)
+        self._newField('patch', patch)
+        self._newField('changelist', changelist)
         self._newField('branch', StringProperty(self))
 
 
@@ -1,3 +1,4 @@
+from types import MappingProxyType
 from typing import *
 
 from .base import UEBase
@@ -17,14 +18,20 @@ __all__ = [
 
 _UETYPE = '__uetype'
 _UEFIELDS = '__uefields'
+_UEDEFAULTS = '__uedefaults'
 _UEOVERRIDDEN = '__ueoverridden'
+_UEOWNED = '__ueowned'
 
 
 class UEProxyStructure:
     '''Baseclass for UE proxy structures.
 
     These classes provide typed property names and default values to match values found
-    in-game binaries, outside of the normal asset system.'''
+    in-game binaries, outside of the normal asset system.
+
+    Instances only hold the fields that have been written to. Other fields read as a read-only view
+    of the class defaults. Field dicts may be shared with copies of the proxy, so each is copied
+    before its first write.'''
 
     __proxy_classes: Dict[str, Type['UEProxyStructure']] = dict()
 
@@ -70,16 +77,20 @@ class UEProxyStructure:
                 delattr(cls, name)
 
         setattr(cls, _UEFIELDS, fields)
+        setattr(cls, _UEDEFAULTS, {name: MappingProxyType(default) for name, default in fields.items()})
 
     def __init__(self):
-        # Initialise the proxy with a *copy* of the defaults from _UEFIELDS
-        fields = getattr(self, _UEFIELDS)
-        for name, default in fields.items():
-            value = {**default}
-            setattr(self, name, value)
-
-        # Initialise the empty set of overridden fields
+        # Defaults are read from the class until written to, so only the override tracking is needed
         setattr(self, _UEOVERRIDDEN, set())
+        setattr(self, _UEOWNED, set())
+
+    def __getattr__(self, name):
+        # Only called for fields that have not been written to
+        defaults = getattr(type(self), _UEDEFAULTS, None)
+        if defaults and name in defaults:
+            return defaults[name]
+
+        raise AttributeError(f"'{type(self).__name__}' has no field '{name}'")
 
     def __getitem__(self, name):
         return getattr(self, name)
@@ -89,15 +100,29 @@ class UEProxyStructure:
 
     def update(self, values: Mapping[str, Mapping[int, UEBase]]):
         overrides = getattr(self, _UEOVERRIDDEN)
+        owned = getattr(self, _UEOWNED)
         target_dict = vars(self)
+        defaults = getattr(self, _UEFIELDS)
         for name, field_values in values.items():
-            if name not in target_dict:
-                target_dict[name] = dict()
+            if name not in owned:
+                # Take a private copy of the field (from the defaults, or shared with another proxy) before writing
+                target_dict[name] = dict(target_dict[name] if name in target_dict else defaults.get(name, {}))
+                owned.add(name)
             target_field = target_dict[name]
             for i, value in field_values.items():
                 target_field[i] = value
                 overrides.add((name, i))
 
+    def copy(self):
+        '''Make a copy of this proxy, including which values are overridden. Field dicts are shared until written to.'''
+        new = self.__class__.__new__(self.__class__)
+        target_dict = vars(new)
+        target_dict.update(vars(self))
+        setattr(new, _UEOVERRIDDEN, set(getattr(self, _UEOVERRIDDEN)))
+        setattr(new, _UEOWNED, set())
+        setattr(self, _UEOWNED, set())
+        return new
+
     def has_override(self, name: str, index: int = 0):
         '''Returns True if a value has bee set (excluding the defaults).'''
         return (name, index) in getattr(self, _UEOVERRIDDEN)
@@ -1,7 +1,27 @@
 import struct
+from functools import lru_cache
+from typing import Tuple
 
 __all__ = ('MemoryStream', )
 
+# Pre-compiled little-endian codecs for the primitive types
+INT8 = struct.Struct('<b')
+UINT8 = struct.Struct('<B')
+INT16 = struct.Struct('<h')
+UINT16 = struct.Struct('<H')
+INT32 = struct.Struct('<i')
+UINT32 = struct.Struct('<I')
+INT64 = struct.Struct('<q')
+UINT64 = struct.Struct('<Q')
+FLOAT = struct.Struct('<f')
+DOUBLE = struct.Struct('<d')
+
+
+@lru_cache(maxsize=512)
+def get_codec(layout: str) -> struct.Struct:
+    '''Fetch a compiled little-endian codec for the given struct layout (without a byte-order prefix).'''
+    return struct.Struct('<' + layout)
+
 
 class MemoryStream:
     mem: memoryview
@@ -27,40 +47,59 @@ class MemoryStream:
         return self.size
 
     def readInt8(self) -> int:
-        return self._read('b')
+        return self._unpack(INT8)[0]
 
     def readUInt8(self) -> int:
-        return self._read('B')
+        return self._unpack(UINT8)[0]
 
     def readBool8(self) -> bool:
-        return bool(self._read('B'))
+        return bool(self._unpack(UINT8)[0])
 
     def readBool32(self) -> bool:
-        return bool(self._read('I'))
+        return bool(self._unpack(UINT32)[0])
 
     def readUInt16(self) -> int:
-        return self._read('H')
+        return self._unpack(UINT16)[0]
 
     def readInt16(self) -> int:
-        return self._read('h')
+        return self._unpack(INT16)[0]
 
     def readUInt32(self) -> int:
-        return self._read('I')
+        return self._unpack(UINT32)[0]
 
     def readInt32(self) -> int:
-        return self._read('i')
+        return self._unpack(INT32)[0]
 
     def readUInt64(self) -> int:
-        return self._read('Q')
+        return self._unpack(UINT64)[0]
 
     def readInt64(self) -> int:
-        return self._read('q')
+        return self._unpack(INT64)[0]
 
     def readFloat(self) -> float:
-        return self._read('f')
+        return self._unpack(FLOAT)[0]
 
     def readDouble(self) -> float:
-        return self._read('d')
+        return self._unpack(DOUBLE)[0]
+
+    def readUInt32Array(self, count: int) -> Tuple[int, ...]:
+        return self._unpack(get_codec(f'{count}I'))
+
+    def readInt32Array(self, count: int) -> Tuple[int, ...]:
+        return self._unpack(get_codec(f'{count}i'))
+
+    def readFloatArray(self, count: int) -> Tuple[float, ...]:
+        return self._unpack(get_codec(f'{count}f'))
+
+    def readStruct(self, layout: str) -> tuple:
+        '''
+        Read a fixed-layout record in one go, returning a tuple of its values.
+        `layout` uses `struct` format characters, without a byte-order prefix (little-endian is always used).
+
+        Usage:
+            count, offset = stream.readStruct('II')
+        '''
+        return self._unpack(get_codec(layout))
 
     def readBytes(self, count: int) -> bytes:
         if self.offset + count > self.end:
@@ -79,16 +118,18 @@ class MemoryStream:
         value = bytes(raw_bytes[:-2]).decode('utf-16-le')
         return value
 
-    def _read(self, fmt, count: int = None):
-        size = struct.calcsize(fmt)
-        if self.offset + size > self.end:
-            raise EOFError("End of stream at offset " + str(self.offset))
+    def _unpack(self, codec: struct.Struct) -> tuple:
+        offset = self.offset
+        end = offset + codec.size
+        if end > self.end:
+            raise EOFError("End of stream at offset " + str(offset))
+
+        values = codec.unpack_from(self.mem, offset)
+        self.offset = end
+        return values
 
+    def _read(self, fmt, count: int = None):
         if count is None or count == 1:
-            value, = struct.unpack_from('<' + fmt, self.mem, self.offset)
-            self.offset += size
-            return value
+            return self._unpack(get_codec(fmt))[0]
 
-        values = struct.unpack_from('<' + str(count) + fmt, self.mem, self.offset)
-        self.offset += size
-        return values
+        return self._unpack(get_codec(str(count) + fmt))
@@ -0,0 +1,221 @@
+'''
+Compact, picklable summaries of parsed assets and a persistent store for them.
+
+Summaries hold the parts of an asset most often needed to classify it (names, imports, exports,
+default export/class and the default export's own properties) as plain Python data, so they can be
+reused across runs without re-parsing unchanged assets.
+'''
+
+import json
+import pickle
+import sqlite3
+from logging import NullHandler, getLogger
+from pathlib import Path
+from typing import *
+
+from .asset import ExportTableItem, ImportTableItem, UAsset
+from .consts import BLUEPRINT_GENERATED_CLASS_CLS
+from .utils import fingerprint_files, hash_files, property_serialiser
+
+__all__ = [
+    'ImportSummary',
+    'ExportSummary',
+    'AssetSummary',
+    'summarise_asset',
+    'AssetSummaryStore',
+]
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Bump when the content of AssetSummary changes
+SUMMARY_FORMAT_VERSION = 2
+
+JsonProps = Dict[str, Dict[int, Any]]
+
+
+class ImportSummary(NamedTuple):
+    fullname: str
+    package: str
+    klass: str
+
+
+class ExportSummary(NamedTuple):
+    name: str
+    klass: Optional[str]
+    super: Optional[str]
+    outer: Optional[str] = None
+    klass_klass: Optional[str] = None
+
+    @property
+    def parent(self) -> Optional[str]:
+        '''The full name of the parent class, as found by `ue.tree.get_parent_fullname` for the full export.'''
+        if self.klass and self.klass != BLUEPRINT_GENERATED_CLASS_CLS:
+            return self.klass
+        return self.super
+
+
+class AssetSummary(NamedTuple):
+    assetname: str
+    file_ext: str
+    names: Tuple[str, ...]
+    imports: Tuple[ImportSummary, ...]
+    exports: Tuple[ExportSummary, ...]
+    default_export: Optional[str]
+    default_class: Optional[str]
+    default_properties: Optional[JsonProps]
+    has_tile_info: bool = False
+
+    def find_export(self, name: Optional[str]) -> Optional[ExportSummary]:
+        for export in self.exports:
+            if export.name == name:
+                return export
+        return None
+
+
+def _fullname_of(obj: Union[ImportTableItem, ExportTableItem, None]) -> Optional[str]:
+    if obj is None or isinstance(obj, str):
+        return None
+    return obj.fullname
+
+
+def _klass_name_of(export: ExportTableItem) -> Optional[str]:
+    klass = export.klass and export.klass.value
+    klass_klass = klass and getattr(klass, 'klass', None) and klass.klass.value
+    return str(klass_klass) if klass_klass else None
+
+
+def _flatten_properties(export: ExportTableItem) -> JsonProps:
+    result: JsonProps = dict()
+    for prop in export.properties.values:
+        # Round-trip through JSON to get plain, picklable data
+        value = json.loads(json.dumps(prop.value, default=property_serialiser))
+        result.setdefault(str(prop.header.name), dict())[prop.header.index] = value
+    return result
+
+
+def summarise_asset(asset: UAsset, properties: bool = True) -> AssetSummary:
+    '''
+    Build a summary of a linked asset.
+    Default properties are included only if requested and the asset was parsed with properties.
+    '''
+    assert asset.assetname
+    assert asset.is_linked
+
+    imports = tuple(ImportSummary(item.fullname, str(item.package), str(item.klass)) for item in asset.imports)
+    exports = tuple(
+        ExportSummary(str(item.name), _fullname_of(item.klass.value), _fullname_of(item.super.value),
+                      _fullname_of(item.namespace.value), _klass_name_of(item)) for item in asset.exports)
+
+    default_export = asset.default_export
+    default_properties = None
+    if properties and default_export is not None and asset.has_properties:
+        default_properties = _flatten_properties(default_export)
+
+    return AssetSummary(
+        assetname=asset.assetname,
+        file_ext=asset.file_ext or '',
+        names=asset.name_strings,
+        imports=imports,
+        exports=exports,
+        default_export=str(default_export.name) if default_export is not None else None,
+        default_class=_fullname_of(asset.default_class),
+        default_properties=default_properties,
+        has_tile_info='tile_info' in asset.field_values,
+    )
+
+
+class AssetSummaryStore:
+    '''
+    An SQLite-backed store of asset summaries.
+
+    Entries are keyed by asset name and are only returned while the size and modification time of the
+    asset's files are unchanged, or failing that, while their content hash is unchanged. The whole store is
+    cleared when the game build ID changes, and nothing is served until a build ID is known.
+    '''
+    def __init__(self, filename: Union[str, Path], build_id: Optional[str] = None):
+        self.filename = Path(filename)
+        self.build_id: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._known_digests: Dict[str, Tuple[str, str]] = dict()  # assetname -> (fingerprint, digest) hashed this run
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.filename))
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS summaries '
+                        '(assetname TEXT PRIMARY KEY, fingerprint TEXT, digest TEXT, data BLOB)')
+        self.db.commit()
+
+        if build_id is not None:
+            self.set_build_id(build_id)
+
+    def close(self):
+        self.db.close()
+
+    def set_build_id(self, build_id: Optional[str]):
+        '''Set the current game build ID, clearing the store if it differs from the one the store was filled with.'''
+        self.build_id = str(build_id) if build_id is not None else None
+        if self.build_id is None:
+            return
+
+        version = f'{SUMMARY_FORMAT_VERSION}:{self.build_id}'
+        row = self.db.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        if row and row[0] == version:
+            return
+
+        logger.info('Clearing asset summary store for game build %s', self.build_id)
+        with self.db:
+            self.db.execute('DELETE FROM summaries')
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version, ))
+
+    def lookup(self, assetname: str, filenames: Sequence[str]) -> Optional[AssetSummary]:
+        '''Fetch a stored summary if the given source files are unchanged, else None.'''
+        if self.build_id is None:
+            return None
+
+        row = self.db.execute('SELECT fingerprint, digest, data FROM summaries WHERE assetname=?', (assetname, )).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+
+        fingerprint, digest, data = row
+        current_fingerprint = fingerprint_files(filenames)
+        if current_fingerprint != fingerprint:
+            # Files were touched - only accept them if their content is still the same
+            current_digest = hash_files(filenames)
+            if current_digest != digest:
+                # Remember the hash so a following `add` doesn't need to read the files again
+                self._known_digests[assetname] = (current_fingerprint, current_digest)
+                self.misses += 1
+                return None
+
+            with self.db:
+                self.db.execute('UPDATE summaries SET fingerprint=? WHERE assetname=?', (current_fingerprint, assetname))
+
+        self.hits += 1
+        return pickle.loads(data)
+
+    def add(self, summary: AssetSummary, filenames: Sequence[str]):
+        if self.build_id is None:
+            return
+
+        fingerprint = fingerprint_files(filenames)
+        digest = self._find_digest(summary.assetname, fingerprint) or hash_files(filenames)
+
+        data = pickle.dumps(summary, pickle.HIGHEST_PROTOCOL)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO summaries (assetname, fingerprint, digest, data) VALUES (?, ?, ?, ?)',
+                            (summary.assetname, fingerprint, digest, data))
+
+    def _find_digest(self, assetname: str, fingerprint: str) -> Optional[str]:
+        '''Find an already known content hash for files with the given fingerprint, to avoid hashing them again.'''
+        known = self._known_digests.pop(assetname, None)
+        if known and known[0] == fingerprint:
+            return known[1]
+
+        row = self.db.execute('SELECT fingerprint, digest FROM summaries WHERE assetname=?', (assetname, )).fetchone()
+        if row and row[0] == fingerprint:
+            return row[1]
+
+        return None
@@ -0,0 +1,52 @@
+import pytest  # type: ignore
+
+from .properties import BoolProperty, ByteProperty, DummyAsset, FloatProperty, IntProperty, UInt32Property
+from .stream import MemoryStream
+
+
+def test_compact_types():
+    assert FloatProperty._is_compact
+    assert IntProperty._is_compact
+    assert UInt32Property._is_compact
+    assert BoolProperty._is_compact
+    assert not ByteProperty._is_compact
+
+
+def test_compact_fields():
+    prop = FloatProperty.create(0.5)
+    assert not hasattr(prop, '__dict__')
+    assert prop.is_serialised
+    assert prop.value == 0.5
+    assert prop.field_values == dict(value=0.5, raw_data=b'\x00\x00\x00?', rounded='0.5', rounded_value=0.5, textual='0.5')
+    assert str(prop) == '0.5'
+    assert not hasattr(prop, 'missing')
+
+
+def test_compact_field_redefinition():
+    prop = IntProperty.create(5)
+    with pytest.raises(NameError):
+        prop._newField('value', 6)  # pylint: disable=protected-access
+
+
+def test_compact_subclass_requires_slots():
+    with pytest.raises(TypeError):
+
+        class BadProperty(FloatProperty):  # pylint: disable=unused-variable
+            pass
+
+
+def test_compact_lazy_fields():
+    prop = FloatProperty.create(0.1)
+    assert prop.rounded_value == 0.1
+    assert prop.textual == '0.1 (inexact)'
+    assert bytes(prop) == bytes.fromhex('cdcccc3d')
+
+
+def test_float_raw_data_is_detached():
+    data = bytearray(bytes.fromhex('0000003f'))
+    prop = FloatProperty(DummyAsset(asset=None), MemoryStream(memoryview(data)))
+    prop.deserialise()
+    data[:] = bytes(4)
+
+    assert isinstance(prop.raw_data, bytes)
+    assert bytes(prop) == bytes.fromhex('0000003f')
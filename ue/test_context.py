@@ -2,7 +2,7 @@ from typing import Iterable
 
 import pytest  # type: ignore
 
-from .context import DEFAULT_CONTEXT, ParsingContext, get_ctx, ue_parsing_context
+from .context import DEFAULT_CONTEXT, ParsingContext, get_ctx, snapshot_ctx, ue_parsing_context
 
 
 @pytest.fixture(name='ctx')
@@ -80,3 +80,13 @@ def test_multicontext_level_overrides(ctx: ParsingContext):
 
         assert ctx.link == (not DEFAULT_CONTEXT.link)
         verify_defaults(ctx, exclude=['link'])
+
+
+def test_snapshot(ctx: ParsingContext):
+    with ue_parsing_context(lazy_properties=False, property_filter=['Test']):
+        snapshot = snapshot_ctx()
+
+    assert not snapshot.lazy_properties
+    assert snapshot.property_filter == frozenset(['Test'])
+    assert snapshot.context_level == 2
+    verify_defaults(ctx)
@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+
+from pytest import fixture, raises  # type: ignore
+
+from .dependencies import DependencyStore
+from .loader import AssetLoader, AssetNotFound, ModResolver
+
+
+class DummyLoader(ModResolver):
+    def get_name_from_id(self, modid: str) -> str:
+        raise NotImplementedError
+
+    def get_id_from_name(self, name: str) -> str:
+        raise NotImplementedError
+
+
+@fixture
+def loader(tmp_path: Path):
+    return AssetLoader(DummyLoader(), assetpath=tmp_path)
+
+
+def _write_asset(base: Path, name: str, content: bytes):
+    (base / 'Content').mkdir(parents=True, exist_ok=True)
+    (base / 'Content' / f'{name}.uasset').write_bytes(content)
+    (base / 'Content' / f'{name}.uexp').write_bytes(b'exports')
+
+
+def test_record_dependencies(loader: AssetLoader):
+    with loader.record_dependencies() as outer:
+        with loader.record_dependencies() as inner:
+            with raises(AssetNotFound):
+                loader['/Game/Missing']
+        loader.note_dependency('/Game/Other.Other_C')
+
+    assert inner == {'/Game/Missing'}
+    assert outer == {'/Game/Missing', '/Game/Other'}
+    assert not loader.dependency_recorders
+
+
+def test_dependency_store(tmp_path: Path, loader: AssetLoader):
+    _write_asset(tmp_path, 'One', b'one')
+    output = tmp_path / 'output.json'
+    output.write_text('{}')
+
+    def is_current(inputs='inputs'):
+        # A fresh store is needed for each check as asset digests are only read once per run
+        store = DependencyStore(tmp_path / 'deps.sqlite')
+        try:
+            return store.is_current('output', inputs, loader)
+        finally:
+            store.close()
+
+    store = DependencyStore(tmp_path / 'deps.sqlite')
+    assert not store.is_current('output', 'inputs', loader)
+    store.record('output', 'inputs', output, ['/Game/One', '/Game/Two'], loader)
+    store.close()
+
+    assert is_current()
+    assert not is_current('other inputs')
+
+    # Touching a file without changing it is fine
+    stat = os.stat(tmp_path / 'Content' / 'One.uasset')
+    os.utime(tmp_path / 'Content' / 'One.uasset', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert is_current()
+
+    # A missing dependency appearing is a change
+    _write_asset(tmp_path, 'Two', b'two')
+    assert not is_current()
+
+    # Changing the content of a dependency is a change
+    store = DependencyStore(tmp_path / 'deps.sqlite')
+    store.record('output', 'inputs', output, ['/Game/One', '/Game/Two'], loader)
+    store.close()
+    assert is_current()
+    _write_asset(tmp_path, 'One', b'changed')
+    assert not is_current()
+
+    # As is the output going missing
+    store = DependencyStore(tmp_path / 'deps.sqlite')
+    store.record('output', 'inputs', output, ['/Game/One'], loader)
+    store.close()
+    output.unlink()
+    assert not is_current()
@@ -0,0 +1,99 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest  # type: ignore
+
+from . import gathering
+from .asset import ExportTableItem
+from .gathering import GATHERED_PROPERTIES_TABLE, gather_properties
+from .loader import AssetLoader, ModResolver
+from .proxy import UEProxyStructure, ueints
+
+BASE_CLS = '/Script/Test.GatherBase'
+
+# Inheritance chains of the test exports, ordered with the most distant ancestor first
+CHAINS = {
+    'Child': [BASE_CLS, '/Game/A.A_C', '/Game/B.B_C', '/Game/Child.Child_C'],
+    'Sibling': [BASE_CLS, '/Game/A.A_C', '/Game/B.B_C', '/Game/Sibling.Sibling_C'],
+}
+
+# Default properties of each class
+PROPS = {
+    '/Game/A.A_C': dict(First=ueints(1)),
+    '/Game/B.B_C': dict(Second=ueints(2)),
+    '/Game/Child.Child_C': dict(First=ueints(3)),
+    '/Game/Sibling.Sibling_C': dict(Third=ueints(4)),
+}
+
+
+class GatherProxy(UEProxyStructure, uetype=BASE_CLS):
+    First = ueints(0)
+    Second = ueints(0)
+    Third = ueints(0)
+
+
+class DummyResolver(ModResolver):
+    def get_name_from_id(self, modid: str) -> str:
+        raise NotImplementedError
+
+    def get_id_from_name(self, name: str) -> str:
+        raise NotImplementedError
+
+
+@pytest.fixture(name='loader')
+def fixture_loader(tmp_path: Path, mocker):
+    loaded = []
+
+    def get_default_props_for_class(fullname, _):
+        loaded.append(fullname)
+        return PROPS[fullname]
+
+    # Exports only need a name here, as their inheritance and properties are faked
+    mocker.patch.object(gathering, 'discover_inheritance_chain', lambda export: list(CHAINS[export.name]))
+    mocker.patch.object(gathering, 'get_default_props_for_class', get_default_props_for_class)
+
+    loader = AssetLoader(DummyResolver(), assetpath=tmp_path)
+    loader.loaded = loaded
+    return loader
+
+
+def _make_export(loader: AssetLoader, name: str) -> ExportTableItem:
+    export = ExportTableItem.__new__(ExportTableItem)
+    export.asset = SimpleNamespace(loader=loader)
+    export.name = name
+    return export
+
+
+def _values(proxy: GatherProxy):
+    return (proxy.First[0].value, proxy.Second[0].value, proxy.Third[0].value)
+
+
+def test_gather_cache_hit(loader: AssetLoader):
+    child = _make_export(loader, 'Child')
+    assert _values(gather_properties(child)) == (3, 2, 0)
+    assert loader.loaded == ['/Game/A.A_C', '/Game/B.B_C', '/Game/Child.Child_C']
+
+    # Ancestors come from the cache, giving the same result
+    loader.loaded.clear()
+    assert _values(gather_properties(child)) == (3, 2, 0)
+    assert loader.loaded == ['/Game/Child.Child_C']
+
+    loader.loaded.clear()
+    assert _values(gather_properties(_make_export(loader, 'Sibling'))) == (1, 2, 4)
+    assert loader.loaded == ['/Game/Sibling.Sibling_C']
+
+
+def test_gather_cache_isolation(loader: AssetLoader):
+    child = _make_export(loader, 'Child')
+    proxy = gather_properties(child)
+
+    # Changing a result doesn't affect the cached ancestors or later results
+    proxy.update(dict(Second=ueints(99)))
+    assert _values(gather_properties(child)) == (3, 2, 0)
+    assert _values(loader.inheritance.table(GATHERED_PROPERTIES_TABLE)['/Game/B.B_C']) == (1, 2, 0)
+
+
+def test_gather_cache_limit(loader: AssetLoader, mocker):
+    mocker.patch.object(gathering, 'GATHERED_PROPERTIES_LIMIT', 1)
+    gather_properties(_make_export(loader, 'Child'))
+    assert list(loader.inheritance.table(GATHERED_PROPERTIES_TABLE)) == ['/Game/B.B_C']
@@ -1,9 +1,11 @@
 import os.path
 from pathlib import Path
+from types import SimpleNamespace
 
-from pytest import fixture  # type: ignore
+from pytest import fixture, raises  # type: ignore
 
-from .loader import AssetLoader, ModResolver
+from .loader import (PROPERTY_SIZE_MULTIPLIER, AssetLoader, AssetNotFound, InheritanceCache, ModResolver, UsageBasedCacheManager,
+                     estimate_asset_size, load_file_into_memory)
 
 
 class DummyLoader(ModResolver):
@@ -53,3 +55,113 @@ def test_convert_asset_name_to_path(loader):
     assert loader.convert_asset_name_to_path('Game/One/Two') == f'{base}{s}Content{s}One{s}Two.uasset'
     assert loader.convert_asset_name_to_path('Game/One/Two/') == f'{base}{s}Content{s}One{s}Two.uasset'
     assert loader.convert_asset_name_to_path('/Game/One/Two/') == f'{base}{s}Content{s}One{s}Two.uasset'
+
+
+def test_load_file_into_memory_mmap(tmp_path: Path):
+    filename = tmp_path / 'data.bin'
+    filename.write_bytes(b'\x01\x02\x03\x04')
+
+    plain = load_file_into_memory(filename)
+    mapped = load_file_into_memory(filename, use_mmap=True)
+    assert bytes(plain) == bytes(mapped) == b'\x01\x02\x03\x04'
+
+    # Empty files cannot be mapped, but should still load
+    empty = tmp_path / 'empty.bin'
+    empty.write_bytes(b'')
+    assert len(load_file_into_memory(empty, use_mmap=True)) == 0
+
+
+def test_file_index(tmp_path: Path):
+    content = tmp_path / 'Content'
+    (content / 'Sub').mkdir(parents=True)
+    for name in ('One.uasset', 'One.uexp', 'Sub/Two.umap', 'Sub/Two.uexp'):
+        (content / name).write_bytes(b'')
+
+    loader = AssetLoader(DummyLoader(), assetpath=str(tmp_path), use_index=True)
+    assert loader.find_asset_files('/Game/One')[2] == '.uasset'
+    assert loader.find_asset_files('/Game/Sub/Two')[2] == '.umap'
+    assert sorted(loader.find_assetnames('.*', '/Game')) == sorted(
+        AssetLoader(DummyLoader(), assetpath=str(tmp_path)).find_assetnames('.*', '/Game'))
+
+    # New files are not seen until the index is invalidated
+    (content / 'Three.uasset').write_bytes(b'')
+    (content / 'Three.uexp').write_bytes(b'')
+    with raises(AssetNotFound):
+        loader.find_asset_files('/Game/Three')
+    loader.invalidate_file_index('/Game')
+    assert loader.find_asset_files('/Game/Three')[2] == '.uasset'
+
+
+def test_inheritance_cache_wipe():
+    cache = InheritanceCache()
+    parents = cache.table('parents')
+    parents['/Game/Mods/A/Dino.Dino_C'] = '/Game/Core/Base.Base_C'
+    parents['/Game/Core/Base.Base_C'] = None
+    parents['/Game/Core/Other.Other_C'] = '/Game/Mods/A/Thing.Thing_C'
+    results = cache.table('results')
+    results[('/Game/Core/Base.Base_C', '/Game/Mods/A/Dino.Dino_C')] = False
+
+    cache.wipe('/Game/Mods/A')
+    assert cache.table('parents') == {'/Game/Core/Base.Base_C': None}
+    assert not cache.table('results')
+    assert set(cache.index) == {'/Game/Core/Base'}
+
+    # Replaced and removed entries are no longer indexed
+    parents['/Game/Core/Base.Base_C'] = '/Game/Core/Root.Root_C'
+    del parents['/Game/Core/Base.Base_C']
+    assert not cache.index
+
+    cache.wipe()
+    assert not cache.table('parents')
+
+
+def _fake_asset(raw_size: int, ext='.uasset'):
+    return SimpleNamespace(raw_size=raw_size,
+                           raw_export_size=0,
+                           names=(),
+                           imports=(),
+                           exports=(),
+                           has_properties=False,
+                           has_lazy_properties=False,
+                           file_ext=ext)
+
+
+def test_cache_evicts_oldest_over_budget():
+    cache = UsageBasedCacheManager(max_memory=250)
+    cache.add('/Game/A', _fake_asset(100))
+    cache.add('/Game/B', _fake_asset(100))
+    assert cache.lookup('/Game/A')  # A is now the most recently used
+    cache.add('/Game/C', _fake_asset(100))
+
+    assert cache.lookup('/Game/B') is None
+    assert cache.lookup('/Game/A') and cache.lookup('/Game/C')
+    assert cache.total_size == 200
+
+
+def test_cache_pinning_and_weights():
+    cache = UsageBasedCacheManager(max_memory=250, weights={'.umap': 2.0})
+    cache.add('/Game/Map', _fake_asset(100, '.umap'))
+    cache.pin('/Game/Map')
+    assert cache.total_size == 200
+
+    cache.add('/Game/A', _fake_asset(100))
+    assert cache.lookup('/Game/Map')
+    assert cache.lookup('/Game/A') is None
+
+    cache.unpin('/Game/Map')
+    cache.add('/Game/B', _fake_asset(100))
+    assert cache.lookup('/Game/Map') is None
+    assert cache.total_size == 100
+
+
+def test_estimate_asset_size():
+    asset = _fake_asset(100)
+    asset.raw_export_size = 1000
+    assert estimate_asset_size(asset) == 100
+
+    # Only the kept export data counts while properties are parsed lazily
+    asset.has_properties = asset.has_lazy_properties = True
+    assert estimate_asset_size(asset) == 1100
+
+    asset.has_lazy_properties = False
+    assert estimate_asset_size(asset) == 100 + 1000 * PROPERTY_SIZE_MULTIPLIER
@@ -0,0 +1,101 @@
+import struct
+
+from .context import ue_parsing_context
+from .properties import ArrayProperty, DummyAsset, IntProperty, PackedArrayValues, PropertyTable, StringProperty, Vector
+from .stream import MemoryStream
+
+NAMES = ('None', 'IntProperty', 'First', 'Second', 'Third', 'ArrayProperty', 'FloatProperty', 'StructProperty', 'VertexData')
+
+
+class NamedDummyAsset(DummyAsset):
+    def getName(self, index):
+        return StringProperty.create(NAMES[index])
+
+
+def _int_property(name: str, value: int) -> bytes:
+    return struct.pack('<IIIIIIi', NAMES.index(name), 0, NAMES.index('IntProperty'), 0, 4, 0, value)
+
+
+def _make_table(*args) -> PropertyTable:
+    data = b''.join(args) + struct.pack('<II', 0, 0) + b'\0' * 8
+    asset = NamedDummyAsset(is_mobile_asset=False)
+    asset.none_index = 0
+    stream = MemoryStream(data)
+    return PropertyTable(asset, stream)
+
+
+def test_property_table_filter():
+    table = _make_table(_int_property('First', 1), _int_property('Second', 2), _int_property('Third', 3))
+    with ue_parsing_context(link=True):
+        table.deserialise({'Second'})
+        table.link()
+
+    assert table.count == 3
+    assert len(table.field_values['values']) == 1
+
+    assert table.has('First') and table.has('Second')
+    assert not table.has('Missing')
+    assert table.get('Second').value == 2
+    assert table.get('Second', 1) is None
+
+    # Skipped properties are parsed on demand
+    assert table.get_property('First').value == 1
+    assert len(table.field_values['values']) == 2
+
+    # Accessing values parses the rest, in their original order
+    assert [str(prop.header.name) for prop in table.values] == ['First', 'Second', 'Third']
+    assert isinstance(table.values[2].value, IntProperty)
+    assert table.values[2].value.value == 3
+    assert table.as_dict()['Third'][0].value == 3
+    assert table.as_dict()['Missing'][0] is None
+    assert 'Missing' not in table.as_dict()
+
+
+def _array_table(name: str, element_type: str, layout: str, *values) -> PropertyTable:
+    count = len(values) // len(layout)
+    data = struct.pack('<I' + layout * count, count, *values)
+    header = struct.pack('<IIIIIIII', NAMES.index(name), 0, NAMES.index('ArrayProperty'), 0, len(data), 0,
+                         NAMES.index(element_type), 0)
+    return _make_table(header + data)
+
+
+def test_packed_float_array():
+    table = _array_table('First', 'FloatProperty', 'f', 1.5, 2.5, -3.0)
+    table.deserialise()
+    table.link()
+
+    array = table.get_property('First')
+    assert isinstance(array.values, PackedArrayValues)
+    assert list(array.as_numbers()) == [1.5, 2.5, -3.0]
+
+    # Elements are created on access
+    assert array.values[1].value == 2.5
+    assert array.values[-1].value == -3.0
+    assert [element.value for element in array.values] == [1.5, 2.5, -3.0]
+    assert array.format_for_json() == [element.format_for_json() for element in array.values]
+
+
+def test_packed_vector_array():
+    data = struct.pack('<I6f', 2, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0)
+    asset = NamedDummyAsset(is_mobile_asset=False)
+    array = ArrayProperty(asset, MemoryStream(struct.pack('<II', NAMES.index('StructProperty'), 0) + data))
+    array.deserialise(len(data), with_type=Vector)
+    array.link()
+
+    assert isinstance(array.values, PackedArrayValues)
+    assert list(array.iter_vectors()) == [(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)]
+    assert array.values[1].z.value == 6.0
+
+
+def test_packed_array_json_matches_elements():
+    data = struct.pack('<I6f', 2, 1.0, 0.1, -3.5, 4.0, 5.25, 1e-7)
+    asset = NamedDummyAsset(is_mobile_asset=False)
+    array = ArrayProperty(asset, MemoryStream(struct.pack('<II', NAMES.index('StructProperty'), 0) + data))
+    array.deserialise(len(data), with_type=Vector)
+    array.link()
+
+    # Formatting from the numbers doesn't create any elements
+    formatted = array.format_for_json()
+    assert array.values._elements == [None, None]  # pylint: disable=protected-access
+    assert formatted == [element.format_for_json() for element in array.values]
+    assert formatted[0] == 'Vector(1.0, 0.1 (inexact), -3.5)'
@@ -95,3 +95,32 @@ def test_unspecified_fields(simple_proxy):
 
     assert simple_proxy.has_override('OtherField', 0) == True
     assert simple_proxy.has_override('IntField', 1) == False
+
+
+def test_copy(simple_proxy):
+    simple_proxy.update({'OtherField': ueints(3141)})
+    copy = simple_proxy.copy()
+
+    assert type(copy) is type(simple_proxy)
+    assert copy.IntField[0] == 90032221
+    assert copy.has_override('OtherField', 0) == True
+
+    copy.update({'IntField': ueints(42)})
+    assert copy.IntField[0] == 42
+    assert simple_proxy.IntField[0] == 90032221
+    assert simple_proxy.has_override('IntField', 0) == False
+
+
+def test_defaults_are_shared_until_written(simple_proxy):
+    other = proxy_for_type('DummyType1')
+    assert 'IntField' not in vars(simple_proxy)
+    assert simple_proxy.IntField is other.IntField
+
+    with pytest.raises(TypeError):
+        simple_proxy.IntField[0] = 5
+
+    simple_proxy.update({'IntField': ueints(42)})
+    assert simple_proxy.IntField[0] == 42
+    assert other.IntField[0] == 90032221
+    assert 'IntField' in simple_proxy
+    assert 'MissingField' not in simple_proxy
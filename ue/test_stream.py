@@ -0,0 +1,40 @@
+import struct
+
+import pytest  # type: ignore
+
+from .stream import MemoryStream
+
+
+def test_read_primitives():
+    data = struct.pack('<bBhHiIqQfd', -1, 2, -3, 4, -5, 6, -7, 8, 1.5, 2.25)
+    stream = MemoryStream(data)
+    assert stream.readInt8() == -1
+    assert stream.readUInt8() == 2
+    assert stream.readInt16() == -3
+    assert stream.readUInt16() == 4
+    assert stream.readInt32() == -5
+    assert stream.readUInt32() == 6
+    assert stream.readInt64() == -7
+    assert stream.readUInt64() == 8
+    assert stream.readFloat() == 1.5
+    assert stream.readDouble() == 2.25
+    assert stream.offset == len(data)
+
+
+def test_read_struct_and_arrays():
+    data = struct.pack('<IQ3I2f', 1, 2, 3, 4, 5, 0.5, -0.5)
+    stream = MemoryStream(memoryview(data))
+    assert stream.readStruct('IQ') == (1, 2)
+    assert stream.readUInt32Array(3) == (3, 4, 5)
+    assert stream.readFloatArray(2) == (0.5, -0.5)
+    assert stream.offset == len(data)
+
+
+def test_read_past_end():
+    stream = MemoryStream(struct.pack('<II', 1, 2), 0, 6)
+    assert stream.readUInt32() == 1
+    with pytest.raises(EOFError):
+        stream.readUInt32()
+    assert stream.offset == 4
+    with pytest.raises(EOFError):
+        stream.readStruct('II')
@@ -0,0 +1,95 @@
+import os
+
+from . import summary as summary_module
+from .consts import BLUEPRINT_GENERATED_CLASS_CLS
+from .summary import AssetSummary, AssetSummaryStore, ExportSummary
+
+ASSETNAME = '/Game/Test/Asset'
+
+
+def _make_summary():
+    return AssetSummary(assetname=ASSETNAME,
+                        file_ext='.uasset',
+                        names=('None', 'Asset'),
+                        imports=(),
+                        exports=(ExportSummary('Default__Asset_C', '/Game/Test/Asset.Asset_C', None), ),
+                        default_export='Default__Asset_C',
+                        default_class='/Game/Test/Asset.Asset_C',
+                        default_properties={'Value': {0: 1.5}})
+
+
+def _make_files(tmp_path):
+    filenames = (str(tmp_path / 'Asset.uasset'), str(tmp_path / 'Asset.uexp'))
+    for filename in filenames:
+        with open(filename, 'wb') as f:
+            f.write(b'data')
+    return filenames
+
+
+def test_store_roundtrip(tmp_path):
+    filenames = _make_files(tmp_path)
+    store = AssetSummaryStore(tmp_path / 'store.sqlite', build_id='1')
+    store.add(_make_summary(), filenames)
+    assert store.lookup(ASSETNAME, filenames) == _make_summary()
+    store.close()
+
+    # Re-opening with the same build keeps the entries
+    store = AssetSummaryStore(tmp_path / 'store.sqlite', build_id='1')
+    assert store.lookup(ASSETNAME, filenames) == _make_summary()
+
+    # A new build clears them
+    store.set_build_id('2')
+    assert store.lookup(ASSETNAME, filenames) is None
+
+
+def test_store_file_changes(tmp_path):
+    filenames = _make_files(tmp_path)
+    store = AssetSummaryStore(tmp_path / 'store.sqlite', build_id='1')
+    store.add(_make_summary(), filenames)
+
+    # Touched but with the same content is still valid
+    os.utime(filenames[1], ns=(0, 0))
+    assert store.lookup(ASSETNAME, filenames) == _make_summary()
+
+    with open(filenames[1], 'wb') as f:
+        f.write(b'changed')
+    assert store.lookup(ASSETNAME, filenames) is None
+
+
+def test_store_without_build_id(tmp_path):
+    filenames = _make_files(tmp_path)
+    store = AssetSummaryStore(tmp_path / 'store.sqlite')
+    store.add(_make_summary(), filenames)
+    assert store.lookup(ASSETNAME, filenames) is None
+
+
+def test_export_parent():
+    # Blueprint-generated classes are skipped in favour of the super, as in ue.tree.get_parent_fullname
+    bp = ExportSummary('Asset_C', BLUEPRINT_GENERATED_CLASS_CLS, '/Game/Test/Parent.Parent_C')
+    assert bp.parent == '/Game/Test/Parent.Parent_C'
+
+    component = ExportSummary('Component', '/Game/Test/Component.Component_C', None, '/Game/Test/Asset.Default__Asset_C')
+    assert component.parent == '/Game/Test/Component.Component_C'
+
+
+def test_store_reuses_hashes(tmp_path, monkeypatch):
+    filenames = _make_files(tmp_path)
+    store = AssetSummaryStore(tmp_path / 'store.sqlite', build_id='1')
+    store.add(_make_summary(), filenames)
+
+    hashed = []
+    original_hash_files = summary_module.hash_files
+    monkeypatch.setattr(summary_module, 'hash_files', lambda filenames: hashed.append(filenames) or original_hash_files(filenames))
+
+    # Re-adding unchanged files doesn't hash them
+    store.add(_make_summary(), filenames)
+    assert not hashed
+
+    # Nor does adding after a failed lookup, which already hashed the changed files
+    with open(filenames[1], 'wb') as f:
+        f.write(b'changed')
+    assert store.lookup(ASSETNAME, filenames) is None
+    assert len(hashed) == 1
+    store.add(_make_summary(), filenames)
+    assert len(hashed) == 1
+    assert store.lookup(ASSETNAME, filenames) == _make_summary()
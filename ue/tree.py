@@ -1,5 +1,4 @@
-from functools import lru_cache
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .asset import ExportTableItem, ImportTableItem
 from .consts import BLUEPRINT_GENERATED_CLASS_CLS
@@ -8,9 +7,17 @@ from .loader import AssetLoader
 __all__ = [
     'discover_inheritance_chain',
     'get_parent_fullname',
+    'get_inheritance_table',
+    'get_export_key',
     'is_fullname_an_asset',
 ]
 
+# Name of the inheritance cache table holding the parent of each export, by export key
+PARENT_FULLNAME_TABLE = 'parent_fullname'
+
+# Name of the inheritance cache table holding the parent of each class found by full name through `load_class`
+CLASS_PARENT_FULLNAME_TABLE = 'class_parent_fullname'
+
 
 def inherits_from(export: ExportTableItem, klass_name: str) -> bool:
     '''Return true if klass_name appears in the inheritance tree for the given export.'''
@@ -26,16 +33,12 @@ def discover_inheritance_chain(export: ExportTableItem, reverse=False) -> List[s
 
     chain: List[str] = list()
     loader: AssetLoader = export.asset.loader
-    current: ExportTableItem = export
+    class_parents = loader.inheritance.table(CLASS_PARENT_FULLNAME_TABLE)
 
     chain.append(export.fullname)
+    parent_fullname = get_parent_fullname(export)
 
-    while True:
-        # Find the full name of our parent
-        parent_fullname = get_parent_fullname(current)
-        if not parent_fullname:
-            break
-
+    while parent_fullname:
         # Record it
         chain.append(parent_fullname)
 
@@ -43,8 +46,19 @@ def discover_inheritance_chain(export: ExportTableItem, reverse=False) -> List[s
         if not is_fullname_an_asset(parent_fullname):
             break
 
-        # Load this asset and continue up the chain
-        current = loader.load_class(parent_fullname)
+        # Continue up the chain, only loading the class if it hasn't been seen before
+        # Ancestors are only known by name, so are looked up by it
+        fullname = parent_fullname
+        if fullname in class_parents:
+            parent_fullname = class_parents[fullname]
+        else:
+            parent_fullname = class_parents[fullname] = get_parent_fullname(loader.load_class(fullname))
+
+    # Parents found in the inheritance cache weren't loaded, so make sure they still count as dependencies
+    if loader.dependency_recorders:
+        for fullname in chain:
+            if is_fullname_an_asset(fullname):
+                loader.note_dependency(fullname)
 
     if not reverse:
         chain.reverse()
@@ -52,9 +66,34 @@ def discover_inheritance_chain(export: ExportTableItem, reverse=False) -> List[s
     return chain
 
 
-@lru_cache(maxsize=1024)
 def get_parent_fullname(export: ExportTableItem) -> Optional[str]:
     '''Calculate the parent class of the given export.'''
+    parents = get_inheritance_table(export, PARENT_FULLNAME_TABLE)
+    if parents is None:
+        return _find_parent_fullname(export)
+
+    # Export names are not always unique within an asset (e.g. in maps), so exports are keyed by index
+    key = get_export_key(export)
+    if key not in parents:
+        parents[key] = _find_parent_fullname(export)
+    return parents[key]
+
+
+def get_inheritance_table(export: ExportTableItem, name: str) -> Optional[Dict[Any, Any]]:
+    '''Get the named table from the inheritance cache of the export's loader, or None if it cannot be cached.'''
+    loader = getattr(export.asset, 'loader', None)
+    if loader is None or not export.fullname:
+        return None
+    return loader.inheritance.table(name)
+
+
+def get_export_key(export: ExportTableItem) -> Tuple[str, int]:
+    '''Identify an export by its asset name and index, for use as an inheritance cache key.'''
+    assert export.asset.assetname
+    return (export.asset.assetname, export.table_index)
+
+
+def _find_parent_fullname(export: ExportTableItem) -> Optional[str]:
     klass_ref = export.klass and export.klass.value
 
     # Ignore klass if it is /Script/Engine.BlueprintGeneratedClass
@@ -1,5 +1,7 @@
+import hashlib
 import json
-from typing import Optional
+import os
+from typing import Optional, Sequence
 
 from ue.base import UEBase
 
@@ -28,11 +30,32 @@ def get_clean_name(obj: UEBase, fallback: str = None) -> Optional[str]:
 
 
 def get_property(export, name) -> Optional[UEBase]:
-    for prop in export.properties:
-        if str(prop.header.name) == name:
-            return prop.value
+    '''Get the value of the first property of an export with the given name, at any index.'''
+    values = export.properties.get_all(name)
+    return next(iter(values.values()), None)
 
-    return None
+
+# Size of the blocks files are read in when hashing them
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def fingerprint_files(filenames: Sequence[str]) -> str:
+    '''Describe the size and modification time of each file, as a cheap check of whether any have changed.'''
+    parts = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        parts.append(f'{stat.st_size}:{stat.st_mtime_ns}')
+    return ';'.join(parts)
+
+
+def hash_files(filenames: Sequence[str]) -> str:
+    '''Calculate the SHA1 digest of the combined content of the files.'''
+    digest = hashlib.sha1()
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    return digest.hexdigest()
 
 
 def property_serialiser(obj):
@@ -150,3 +150,25 @@ def test_insert_segment():
     # Ensure parent chain extends into segment completely
     assert t['naa'].parent is t['na']
     assert t['segment'].parent is t['b']
+
+
+def test_is_descendant():
+    t = IndexedTree[str]('root')
+    t.add('root', 'a')
+    t.add('root', 'b')
+    t.add('a', 'a1')
+    t.add('a1', 'a11')
+
+    assert t.is_descendant('a11', 'a')
+    assert t.is_descendant('a11', 'root')
+    assert t.is_descendant('a1', 'a')
+    assert not t.is_descendant('a', 'a1')
+    assert not t.is_descendant('b', 'a')
+    assert not t.is_descendant('a', 'a')
+    assert t.is_descendant('a', 'a', include_self=True)
+
+    # Intervals must be updated after modification
+    t.add('b', 'b1')
+    assert t.is_descendant('b1', 'b')
+    assert not t.is_descendant('b1', 'a')
+    assert t.is_descendant('a11', 'a1')
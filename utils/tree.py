@@ -101,6 +101,7 @@ class Node(Generic[T]):
 class IndexedTree(Generic[T]):
     _key_fn: Optional[Callable[[T], str]]
     _lookup: Dict[str, Node[T]]
+    _intervals: Optional[Dict[str, Tuple[int, int]]] = None
     root: Node[T]
 
     def __init__(self, root: T, key_fn: Optional[Callable[[T], str]] = None):
@@ -109,6 +110,7 @@ class IndexedTree(Generic[T]):
         self.clear()
 
     def clear(self):
+        self._intervals = None
         self._lookup = dict()
         self.root = Node[T](self._root_data)
         self._register(self.root)
@@ -121,6 +123,7 @@ class IndexedTree(Generic[T]):
 
         self._register(data)
         parent_node.add(data)
+        self._intervals = None
 
         return data
 
@@ -128,6 +131,41 @@ class IndexedTree(Generic[T]):
         parent_node = self._handle_parent_arg(parent)
         partial_tree.walk(self._register)
         parent_node.add(partial_tree)
+        self._intervals = None
+
+    def is_descendant(self, key: str, ancestor_key: str, include_self=False) -> bool:
+        '''
+        Check if the node with the given key is below another, in constant time.
+        Both keys must be present in the tree.
+
+        Uses pre/post-order numbering that is calculated on first use after the tree is modified.
+        Nodes added directly through `Node.add` are not noticed, so modify the tree through this class.
+        '''
+        intervals = self._intervals or self._calculate_intervals()
+        start, end = intervals[key]
+        ancestor_start, ancestor_end = intervals[ancestor_key]
+        if not include_self and start == ancestor_start:
+            return False
+        return ancestor_start <= start and end <= ancestor_end
+
+    def _calculate_intervals(self) -> Dict[str, Tuple[int, int]]:
+        intervals: Dict[str, Tuple[int, int]] = dict()
+        counter = 0
+        stack: List[Tuple[Node[T], int]] = [(self.root, -1)]
+        while stack:
+            node, start = stack.pop()
+            if start < 0:
+                # Entering the node - revisit it once all of its children are done
+                stack.append((node, counter))
+                stack.extend((child, -1) for child in reversed(node.nodes))
+                counter += 1
+            else:
+                key: str = self._key_fn(node.data) if self._key_fn else node.data  # type: ignore
+                intervals[key] = (start, counter)
+                counter += 1
+
+        self._intervals = intervals
+        return intervals
 
     def keys(self) -> Iterable[str]:
         yield from self._lookup.keys()
@@ -144,6 +182,12 @@ class IndexedTree(Generic[T]):
 
         return self._lookup.get(key, fallback)
 
+    def __getstate__(self):
+        # Intervals are cheap to recalculate and not worth storing
+        state = dict(vars(self))
+        state.pop('_intervals', None)
+        return state
+
     def _register(self, node: Node[T]):
         key: str = self._key_fn(node.data) if self._key_fn else node.data  # type: ignore
         if key in self._lookup: